@@ -0,0 +1,174 @@
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+STATE_DIR = os.path.join(
+    os.environ.get("XDG_STATE_HOME", os.path.join(os.path.expanduser("~"), ".local", "state")),
+    "battle_arena"
+)
+LOG_DIR = os.path.join(STATE_DIR, "logs")
+
+
+class BattleLog:
+    """Battle log with a fixed-size in-memory window and optional spill to disk
+
+    Behaves like the list it replaces (append, len, indexing and slicing such
+    as log[-5:]), but only the last `capacity` messages are kept in memory.
+    With a log_dir, every message is also streamed by a background thread to
+    append-only segment files of `segment_size` lines; at most `max_files`
+    segments are kept. Older messages are paged back in from disk on demand.
+    A segment that cannot be written (e.g. a full disk) is reported once and
+    given up; its messages are then lost rather than held in memory.
+    """
+
+    def __init__(self, capacity=100, log_dir=None, segment_size=10000, max_files=20):
+        self.capacity = capacity
+        self.entries = deque(maxlen=capacity)
+        self.total = 0  # Messages appended since the log was created
+        self.base = 0   # Absolute index of the first message since the last clear()
+        self.log_dir = log_dir
+        self.segment_size = segment_size
+        self.max_files = max_files
+        self.session = f"{int(time.time())}-{os.getpid()}"
+        self._page = (None, [])
+        self._lost = set()  # Segments the writer gave up on
+        self._queue = None
+        self._writer = None
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="battle-log-writer", daemon=True)
+            self._writer.start()
+
+    def append(self, message):
+        self.entries.append(message)
+        self.total += 1
+        if self._queue is not None:
+            self._queue.put(message)
+
+    def clear(self):
+        """Start a fresh view (e.g. a new battle); history stays on disk"""
+        self.entries.clear()
+        self.base = self.total
+
+    def __len__(self):
+        return self.total - self.base
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        length = len(self)
+        if isinstance(key, slice):
+            return [self._get(index) for index in range(*key.indices(length))]
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("battle log index out of range")
+        return self._get(key)
+
+    def _get(self, index):
+        absolute = self.base + index
+        first_in_memory = self.total - len(self.entries)
+        if absolute >= first_in_memory:
+            return self.entries[absolute - first_in_memory]
+        return self.read_history(absolute, absolute + 1)[0]
+
+    def read_history(self, start, stop):
+        """Page messages [start, stop) (absolute indices) back in from the segment files"""
+        if self.log_dir is None:
+            raise IndexError("battle log message is no longer in memory")
+        self.flush()
+        messages = []
+        for absolute in range(start, stop):
+            segment, line = divmod(absolute, self.segment_size)
+            if segment in self._lost:
+                raise IndexError("battle log message could not be written to disk")
+            if self._page[0] != segment or line >= len(self._page[1]):
+                try:
+                    with open(self._segment_path(segment)) as segment_file:
+                        self._page = (segment, [json.loads(text) for text in segment_file])
+                except OSError:
+                    raise IndexError("battle log message was rotated out") from None
+            messages.append(self._page[1][line])
+        return messages
+
+    def flush(self):
+        """Block until every appended message has been written"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+
+    def _segment_path(self, segment):
+        return os.path.join(self.log_dir, f"battle-{self.session}-{segment:06d}.log")
+
+    def _write_loop(self):
+        written = 0
+        output = None
+        while True:
+            message = self._queue.get()
+            try:
+                if message is None:
+                    break
+                segment, line = divmod(written, self.segment_size)
+                written += 1
+                if line == 0 and output is not None:
+                    output = self._close(output, segment - 1)
+                if segment in self._lost:
+                    continue
+                try:
+                    if line == 0:
+                        output = open(self._segment_path(segment), "a")
+                        self._rotate()
+                    output.write(json.dumps(message) + "\n")
+                    if self._queue.empty():
+                        output.flush()
+                except OSError as error:
+                    output = self._give_up(output, segment, error)
+            finally:
+                self._queue.task_done()
+        if output is not None:
+            self._close(output, (written - 1) // self.segment_size)
+
+    def _close(self, output, segment):
+        try:
+            output.close()
+        except OSError as error:
+            self._give_up(None, segment, error)
+        return None
+
+    def _give_up(self, output, segment, error):
+        """Stop writing a segment after an error; its lines would no longer match their indices"""
+        self._lost.add(segment)
+        print(f"Battle log could not be written to {self._segment_path(segment)}: {error}", file=sys.stderr)
+        if output is not None:
+            try:
+                output.close()
+            except OSError:
+                pass
+        return None
+
+    def _rotate(self):
+        files = []
+        for path in glob.glob(os.path.join(self.log_dir, "battle-*.log")):
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # Rotated away by another session in the meantime
+        files.sort()
+        for _, path in files[:-self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Render offscreen; must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+
+def make_cases():
+    """(name, draw call) for every screen and drawing function, on a fixed scene"""
+    from constants import WIDTH, HEIGHT
+    from entities import Character, Enemy
+    from game_state import GameState
+    from ui import (Button, init_fonts, draw_health_bar, draw_character, draw_battle_arena, draw_main_menu,
+                    draw_character_creation, draw_arena_menu, draw_character_stats, draw_game_over,
+                    draw_pre_battle, draw_profiler_overlay, get_font)
+    from ui import drawing
+
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    fonts = init_fonts()
+    player = Character("Hero", {"strength": 5, "agility": 3})
+    player.position[0] = 300
+    player.is_attacking = True
+    player.attack_frame = 3
+    enemy = Enemy("Orc Warrior", 3)
+    enemy.is_hit = True
+    battle_log = [f"Hero hits Orc Warrior for {damage} damage!" for damage in range(8)]
+    button = Button(300, 300, 200, 40, "Start Battle!")
+    hovered = Button(300, 360, 200, 40, "Continue")
+    hovered.is_hovered = True
+    buttons = [button, hovered, Button(300, 420, 200, 40, "Quit")]
+    game_state = GameState()
+    game_state.input_name = "Hero"
+    game_state.current_stats["agility"] = 4
+    profiler_lines = [f"{'section':14} {1.0:6.2f} {2.0:6.2f} {3.0:6.2f}" for _ in range(8)]
+    profiler_font = get_font("Courier New", 14)
+    # A 10-vs-50 team battle
+    team_battle = GameState(teams=(9, 50))
+    team_battle.player = player
+    team_battle.start_battle(0)
+    others = team_battle.other_combatants()
+
+    return [
+        ("ui.drawing.draw_health_bar", lambda: draw_health_bar(surface, 100, 100, 200, 15, 40, 100)),
+        ("ui.drawing.draw_character", lambda: draw_character(surface, player, fonts["small"])),
+        ("ui.drawing.draw_character[enemy]", lambda: draw_character(surface, enemy, fonts["small"])),
+        ("ui.drawing.draw_battle_arena", lambda: draw_battle_arena(surface, player, enemy, battle_log,
+                                                                   "player", fonts, 0.5)),
+        ("ui.drawing.draw_battle_arena[60]", lambda: draw_battle_arena(surface, player, team_battle.enemy, battle_log,
+                                                                       "player", fonts, 0.5, others)),
+        ("ui.drawing.draw_character_creation", lambda: drawing.draw_character_creation(
+            surface, buttons, "Hero", {"strength": 3, "agility": 2, "defense": 1}, 10, fonts)),
+        ("ui.screens.draw_main_menu", lambda: draw_main_menu(surface, buttons, fonts)),
+        ("ui.screens.draw_character_creation", lambda: draw_character_creation(surface, buttons, game_state,
+                                                                               fonts)),
+        ("ui.screens.draw_arena_menu", lambda: draw_arena_menu(surface, player, buttons, 2, fonts)),
+        ("ui.screens.draw_pre_battle", lambda: draw_pre_battle(surface, player, enemy, button, 0, fonts)),
+        ("ui.screens.draw_character_stats", lambda: draw_character_stats(surface, player, button, fonts)),
+        ("ui.screens.draw_game_over", lambda: draw_game_over(surface, player, 3, buttons, fonts)),
+        ("ui.overlay.draw_profiler_overlay", lambda: draw_profiler_overlay(surface, profiler_lines,
+                                                                           profiler_font)),
+        ("ui.button.Button.draw", lambda: button.draw(surface)),
+        ("ui.button.Button.draw[hovered]", lambda: hovered.draw(surface)),
+    ]
+
+
+def clear_caches():
+    from ui import text_cache, invalidate_backgrounds
+    text_cache.clear()
+    invalidate_backgrounds()
+
+
+def measure(draw, repeat, warmup, cold=False):
+    """Latency percentiles (us) and per-call allocations of one draw call
+
+    Timing and allocation tracking run in separate passes because tracemalloc
+    slows every allocation down. Warm runs measure the steady state a frame
+    sees, with the text cache and screen backgrounds filled; cold runs clear
+    them before every call, as on a screen change.
+    """
+    for _ in range(warmup):
+        draw()
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            clear_caches()
+        start = time.perf_counter()
+        draw()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(repeat, 50)):
+            if cold:
+                clear_caches()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            draw()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "p50_us": round(timings[len(timings) // 2], 2),
+        "p95_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "mean_us": round(statistics.fmean(timings), 2),
+        "peak_bytes": int(statistics.median(peaks)),
+        "retained_bytes": int(statistics.median(retained)),
+    }
+
+
+def run(name_filter=None, repeat=200, warmup=20, cold=False):
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    results = {}
+    for name, draw in make_cases():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(draw, repeat, warmup, cold)
+    return results
+
+
+def compare(results, baseline, time_tolerance, alloc_tolerance):
+    """Rows of (name, result, baseline result, regressions) and the number of regressed cases"""
+    rows = []
+    regressed = 0
+    for name, result in results.items():
+        base = baseline.get(name)
+        regressions = []
+        if base is not None:
+            if result["p50_us"] > base["p50_us"] * (1 + time_tolerance):
+                regressions.append("time")
+            # A little slack so tiny allocations do not flap
+            if result["peak_bytes"] > base["peak_bytes"] * (1 + alloc_tolerance) + 256:
+                regressions.append("alloc")
+        regressed += bool(regressions)
+        rows.append((name, result, base, regressions))
+    return rows, regressed
+
+
+def print_report(rows):
+    print(f"{'draw call':40} {'p50 us':>9} {'p95 us':>9} {'peak KiB':>9} {'vs base':>8}")
+    for name, result, base, regressions in rows:
+        change = f"{(result['p50_us'] / base['p50_us'] - 1):+.0%}" if base and base["p50_us"] else "new"
+        flag = f"  REGRESSED ({', '.join(regressions)})" if regressions else ""
+        print(f"{name:40} {result['p50_us']:9.1f} {result['p95_us']:9.1f} "
+              f"{result['peak_bytes'] / 1024:9.1f} {change:>8}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless render benchmarks")
+    parser.add_argument("-k", "--filter", help="only run draw calls whose name contains this")
+    parser.add_argument("-n", "--repeat", type=int, default=200, help="timed calls per draw call")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the text cache and screen backgrounds before every call")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25,
+                        help="allowed p50 slowdown before a call counts as regressed")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.10,
+                        help="allowed growth of peak allocations before a call counts as regressed")
+    args = parser.parse_args()
+
+    mode = "cold" if args.cold else "warm"
+    try:
+        with open(args.baseline) as baseline_file:
+            stored = json.load(baseline_file)
+    except FileNotFoundError:
+        stored = {}
+    results = run(args.filter, args.repeat, args.warmup, args.cold)
+    rows, regressed = compare(results, stored.get(mode, {}), args.time_tolerance, args.alloc_tolerance)
+    print_report(rows)
+
+    if args.update:
+        stored.setdefault(mode, {}).update(results)
+        stored["environment"] = {"python": platform.python_version(), "pygame": pygame.version.ver,
+                                 "machine": platform.machine()}
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(stored, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressed:
+        print(f"{regressed} draw call(s) regressed against {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
 from .character import Character
 from .enemy import Enemy
-from .utils import generate_enemy
\ No newline at end of file
+from .utils import generate_enemy, generate_team
+from .actions import ActionRules, perform_action, rules_for, action_mask, available_actions
+from .outcomes import OutcomeTable, get_outcome_table
+from .arena import Arena, PositionIndex, TurnScheduler, line_up
@@ -0,0 +1,108 @@
+import functools
+import weakref
+from constants import WIDTH
+
+MELEE_RANGE = 100
+
+
+def perform_action(actor, action, target):
+    """Apply an (action, argument) pair to actor and return the result dict
+
+    Actions are ("attack", skill_name), ("move_left", None), ("move_right", None),
+    ("jump", "forward" | "backward") and ("rest", None).
+    """
+    kind, arg = action
+    if kind == "attack":
+        return actor.attack(target, arg)
+    if kind == "move_left":
+        return actor.move_left(target)
+    if kind == "move_right":
+        return actor.move_right(target)
+    if kind == "jump":
+        return actor.jump(arg)
+    return actor.rest()
+
+
+class ActionRules:
+    """When each of a character's actions is available
+
+    actions lists the character's actions in a fixed order (moves, one attack
+    per skill, rest, jumps); bit i of a mask stands for actions[i]. For the
+    player this is the order of the battle buttons. Besides stamina, the rules
+    are those of the battle screen: no stepping forward or resting when it
+    would do nothing, and Leap Attack only toward an opponent in front.
+    """
+
+    def __init__(self, skills, move_cost, jump_cost, max_stamina, facing):
+        self.actions = ([("move_left", None), ("move_right", None)] +
+                        [("attack", name) for name, _ in skills] +
+                        [("rest", None), ("jump", "forward"), ("jump", "backward")])
+        self.bits = {action: 1 << index for index, action in enumerate(self.actions)}
+        self.skill_costs = [cost for _, cost in skills]
+        names = [name for name, _ in skills]
+        self.leap = names.index("Leap Attack") if "Leap Attack" in names else -1
+        self.move_cost = move_cost
+        self.jump_cost = jump_cost
+        self.max_stamina = max_stamina
+        self.facing = facing  # 1 when facing right (player side), -1 when facing left
+
+    def bit(self, action):
+        return self.bits[action]
+
+    def mask(self, stamina, x, is_jumping, target_x):
+        in_range = abs(x - target_x) <= MELEE_RANGE
+        can_move = stamina >= self.move_cost
+        mask = 0
+        if can_move and x > 50 and not (in_range and self.facing < 0):
+            mask |= 1
+        if can_move and x < WIDTH - 50 and not (in_range and self.facing > 0):
+            mask |= 2
+        bit = 4
+        for index, cost in enumerate(self.skill_costs):
+            if stamina >= cost:
+                if index == self.leap:
+                    available = not in_range and (target_x - x) * self.facing > 0
+                else:
+                    available = in_range
+                if available:
+                    mask |= bit
+            bit <<= 1
+        if stamina < self.max_stamina:
+            mask |= bit
+        bit <<= 1
+        if stamina >= self.jump_cost and not is_jumping:
+            if x < WIDTH - 50:
+                mask |= bit
+            if x > 50:
+                mask |= bit << 1
+        return mask
+
+
+@functools.lru_cache(maxsize=256)
+def _rules(skills, move_cost, jump_cost, max_stamina, facing):
+    return ActionRules(skills, move_cost, jump_cost, max_stamina, facing)
+
+
+_character_rules = weakref.WeakKeyDictionary()
+
+
+def rules_for(character):
+    rules = _character_rules.get(character)
+    # Only max stamina changes during a game (on level up)
+    if rules is None or rules.max_stamina != character.max_stamina:
+        skills = tuple((name, skill["stamina_cost"]) for name, skill in character.skills.items())
+        facing = 1 if character.base_position[0] < WIDTH / 2 else -1
+        rules = _character_rules[character] = _rules(skills, character.move_stamina_cost,
+                                                     character.jump_stamina_cost, character.max_stamina, facing)
+    return rules
+
+
+def action_mask(actor, target):
+    """Bitmask of the actions actor can take against target (see ActionRules)"""
+    return rules_for(actor).mask(actor.stamina, actor.position[0], actor.is_jumping, target.position[0])
+
+
+def available_actions(actor, target):
+    rules = rules_for(actor)
+    mask = rules.mask(actor.stamina, actor.position[0], actor.is_jumping, target.position[0])
+    return [action for index, action in enumerate(rules.actions) if mask >> index & 1]
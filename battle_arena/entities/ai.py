@@ -0,0 +1,200 @@
+import time
+from constants import WIDTH
+from .actions import MELEE_RANGE, rules_for
+from .outcomes import get_outcome_table
+WIN_SCORE = 1000.0
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Fighter:
+    """Per-battle constants of one side, precomputed for the search model"""
+
+    def __init__(self, character, opponent):
+        outcomes = get_outcome_table()
+        self.max_health = character.max_health
+        self.max_stamina = character.max_stamina
+        self.rules = rules_for(character)
+        # skill -> (stamina cost, hit chance, damage on hit)
+        self.attacks = {name: (skill["stamina_cost"], outcomes.hit_chance(character, opponent, name),
+                               outcomes.hit_damage(character, opponent, name))
+                        for name, skill in character.skills.items()}
+        self.move_speed = character.move_speed
+        self.move_cost = character.move_stamina_cost
+        self.leap_distance = character.move_speed * 2.5
+        self.jump_cost = character.jump_stamina_cost
+        self.jump_distance = character.jump_distance
+        self.rest_recovery = max(5, character.max_stamina // 10) + character.stamina_stat
+
+
+class ExpectimaxAI:
+    """Lookahead enemy AI
+
+    Searches the real action set a few plies deep on a compact model of the
+    battle: the state is (health, stamina, x) for both sides, attacks branch
+    into hit and miss chance nodes weighted by the real hit chance, and a hit
+    deals the real damage. The opponent is assumed to answer with its best
+    move. Values are memoized in a transposition table keyed on the quantized
+    state, and the search deepens iteratively until max_depth or the
+    per-decision time budget (seconds) runs out, keeping the deepest
+    completed result.
+
+    Jumps are modelled as landing instantly; the game animates them.
+    """
+
+    def __init__(self, max_depth=4, time_budget=0.004, health_step=2, stamina_step=5,
+                 position_step=10, max_entries=200000):
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.health_step = health_step
+        self.stamina_step = stamina_step
+        self.position_step = position_step
+        self.max_entries = max_entries
+        self.table = {}
+        self.fighters = None
+        self.matchup = None
+        self.deadline = 0.0
+        self.nodes = 0
+        self.last_depth = 0
+
+    @classmethod
+    def for_level(cls, level):
+        """Stronger enemies look further ahead, with more time, but always far below a frame"""
+        return cls(max_depth=min(2 + level // 2, 6), time_budget=min(0.001 + 0.0005 * level, 0.005))
+
+    def choose(self, enemy, player):
+        """Best (action, argument) for enemy against player"""
+        # Names and levels rather than id() so snapshots of the same fighters share the table
+        matchup = (enemy.name, enemy.level, player.name, player.level)
+        if matchup != self.matchup:
+            # Fighter constants are baked into the table's values
+            self.matchup = matchup
+            self.fighters = (Fighter(enemy, player), Fighter(player, enemy))
+            self.table.clear()
+        elif len(self.table) > self.max_entries:
+            self.table.clear()
+
+        state = (enemy.health, enemy.stamina, enemy.position[0],
+                 player.health, player.stamina, player.position[0])
+        moves = self._successors(state, 0, enemy.is_jumping)
+        if not moves:
+            return ("rest", None)
+
+        self.deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        best = moves[0][0]
+        self.last_depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                scored = [(sum(probability * self._value(next_state, 1, depth - 1)
+                               for probability, next_state in outcomes), action)
+                          for action, outcomes in moves]
+            except _OutOfTime:
+                break
+            best = max(scored, key=lambda item: item[0])[1]
+            self.last_depth = depth
+            # Search the previous best move first next time
+            moves.sort(key=lambda move: move[0] != best)
+        return best
+
+    def _value(self, state, side, depth):
+        if state[3] <= 0:
+            return WIN_SCORE + depth  # Sooner wins score higher
+        if state[0] <= 0:
+            return -WIN_SCORE - depth
+        if depth == 0:
+            return self._evaluate(state)
+
+        key = (self._quantize(state) << 4 | depth) << 1 | side
+        value = self.table.get(key)
+        if value is not None:
+            return value
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise _OutOfTime
+
+        values = [sum(probability * self._value(next_state, 1 - side, depth - 1)
+                      for probability, next_state in outcomes)
+                  for _, outcomes in self._successors(state, side)]
+        value = max(values) if side == 0 else min(values)
+        self.table[key] = value
+        return value
+
+    def _evaluate(self, state):
+        enemy, player = self.fighters
+        return (state[0] / enemy.max_health - state[3] / player.max_health
+                + 0.1 * (state[1] / enemy.max_stamina - state[4] / player.max_stamina))
+
+    def _quantize(self, state):
+        """The quantized state packed into one int (12 bits per field)
+
+        Int keys keep the table invisible to the garbage collector, whose full
+        collections would otherwise stall decisions once the table is large.
+        """
+        health, stamina, position = self.health_step, self.stamina_step, self.position_step
+        key = 0
+        for value, step in ((state[0], health), (state[1], stamina), (state[2], position),
+                            (state[3], health), (state[4], stamina), (state[5], position)):
+            key = key << 12 | int(value // step)
+        return key
+
+    def _successors(self, state, side, is_jumping=False):
+        """(action, [(probability, next state), ...]) for every action side can take"""
+        fighter = self.fighters[side]
+        mine = 3 * side
+        theirs = 3 - mine
+        health, stamina, x = state[mine:mine + 3]
+        their_health, _, their_x = state[theirs:theirs + 3]
+
+        def after(new_stamina, new_x, new_their_health=their_health):
+            next_state = list(state)
+            next_state[mine + 1] = new_stamina
+            next_state[mine + 2] = new_x
+            next_state[theirs] = new_their_health
+            return tuple(next_state)
+
+        successors = []
+        mask = fighter.rules.mask(stamina, x, is_jumping, their_x)
+        for index, action in enumerate(fighter.rules.actions):
+            if not mask >> index & 1:
+                continue
+            kind, arg = action
+            if kind == "attack":
+                cost, hit_chance, damage = fighter.attacks[arg]
+                new_x = x
+                if arg == "Leap Attack":
+                    if x < their_x:
+                        new_x = min(x + fighter.leap_distance, their_x - MELEE_RANGE, WIDTH - 50)
+                    else:
+                        new_x = max(x - fighter.leap_distance, their_x + MELEE_RANGE, 50)
+                    if abs(new_x - their_x) > MELEE_RANGE:
+                        successors.append((action, [(1.0, after(stamina - cost, new_x))]))
+                        continue
+                successors.append((action, [
+                    (hit_chance, after(stamina - cost, new_x, max(0, their_health - damage))),
+                    (1.0 - hit_chance, after(stamina - cost, new_x)),
+                ]))
+            elif kind == "move_left":
+                new_x = x - fighter.move_speed
+                if x > their_x and new_x < their_x + MELEE_RANGE:
+                    new_x = their_x + MELEE_RANGE
+                else:
+                    new_x = max(50, new_x)
+                successors.append((action, [(1.0, after(stamina - fighter.move_cost, new_x))]))
+            elif kind == "move_right":
+                new_x = x + fighter.move_speed
+                if x < their_x and new_x > their_x - MELEE_RANGE:
+                    new_x = their_x - MELEE_RANGE
+                else:
+                    new_x = min(WIDTH - 50, new_x)
+                successors.append((action, [(1.0, after(stamina - fighter.move_cost, new_x))]))
+            elif kind == "jump":
+                jump = fighter.jump_distance if arg == "forward" else -fighter.jump_distance
+                new_x = max(50, min(WIDTH - 50, x + jump))
+                successors.append((action, [(1.0, after(stamina - fighter.jump_cost, new_x))]))
+            else:
+                recovered = min(fighter.max_stamina, stamina + fighter.rest_recovery)
+                successors.append((action, [(1.0, after(recovered, x))]))
+        return successors
@@ -0,0 +1,230 @@
+import bisect
+import heapq
+import itertools
+
+from .actions import MELEE_RANGE, perform_action
+
+
+class PositionIndex:
+    """Characters kept sorted by x, for range and nearest-neighbour queries
+
+    Queries are a bisect into the sorted positions. A character that moved is
+    re-indexed with update(), which only shifts entries when it passed one of
+    its neighbours; otherwise its position is overwritten in place.
+    """
+
+    def __init__(self, characters=()):
+        self.xs = []
+        self.members = []
+        self.indexed = {}  # character -> x it is indexed at
+        for character in characters:
+            self.add(character)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, character):
+        return character in self.indexed
+
+    def add(self, character):
+        x = character.position[0]
+        index = bisect.bisect_right(self.xs, x)
+        self.xs.insert(index, x)
+        self.members.insert(index, character)
+        self.indexed[character] = x
+
+    def remove(self, character):
+        index = self._slot(character)
+        del self.xs[index]
+        del self.members[index]
+        del self.indexed[character]
+
+    def update(self, character):
+        x = character.position[0]
+        if self.indexed[character] == x:
+            return
+        index = self._slot(character)
+        if ((index == 0 or self.xs[index - 1] <= x) and
+                (index == len(self.xs) - 1 or x <= self.xs[index + 1])):
+            self.xs[index] = x
+            self.indexed[character] = x
+            return
+        self.remove(character)
+        self.add(character)
+
+    def _slot(self, character):
+        index = bisect.bisect_left(self.xs, self.indexed[character])
+        while self.members[index] is not character:
+            index += 1
+        return index
+
+    def within(self, x, radius):
+        """Characters at most radius away from x, left to right"""
+        return self.members[bisect.bisect_left(self.xs, x - radius):bisect.bisect_right(self.xs, x + radius)]
+
+    def nearest(self, x, side=0):
+        """Nearest character to x; side -1 only looks left of x and 1 only right of it"""
+        xs = self.xs
+        if side < 0:
+            index = bisect.bisect_left(xs, x) - 1
+            return self.members[index] if index >= 0 else None
+        if side > 0:
+            index = bisect.bisect_right(xs, x)
+            return self.members[index] if index < len(xs) else None
+        index = bisect.bisect_left(xs, x)
+        if index == len(xs):
+            return self.members[-1] if xs else None
+        if index == 0 or xs[index] - x <= x - xs[index - 1]:
+            return self.members[index]
+        return self.members[index - 1]
+
+
+class TurnScheduler:
+    """Turn order of a battle between teams
+
+    Turns come in rounds. Within a round the teams act one after another, in
+    the order they were given, and within a team the more agile act first;
+    a 1-vs-1 battle therefore alternates like the classic one. Defeated
+    combatants are dropped when their turn comes up.
+    """
+
+    def __init__(self, teams):
+        self.queue = []  # Heap of (round, team, -agility, serial, character)
+        self.dropped = set()
+        self.current = None
+        self.round = 0
+        serial = itertools.count()
+        for team_index, team in enumerate(teams):
+            for character in team:
+                heapq.heappush(self.queue, (0, team_index, -character.agility, next(serial), character))
+
+    def next(self):
+        """Move the turn to the next combatant still in the battle and return it"""
+        while self.queue:
+            entry = heapq.heappop(self.queue)
+            if entry[-1] in self.dropped:
+                continue
+            heapq.heappush(self.queue, (entry[0] + 1,) + entry[1:])
+            self.round = entry[0]
+            self.current = entry[-1]
+            return self.current
+        self.current = None
+        return None
+
+    def remove(self, character):
+        self.dropped.add(character)
+
+
+class Arena:
+    """A battle between any number of teams on the arena floor
+
+    Every team has a PositionIndex of its standing members, so targeting and
+    movement only look at the opponents around a combatant: attacks go to the
+    weakest opponent in melee range, or the nearest one when none is, and
+    moves stop short of the nearest opponent in their direction. Teams take
+    their turns in the order they are given (see TurnScheduler).
+    """
+
+    def __init__(self, teams):
+        self.teams = [list(team) for team in teams]
+        self.combatants = [character for team in self.teams for character in team]
+        self.team_of = {character: index for index, team in enumerate(self.teams) for character in team}
+        self.indexes = [PositionIndex(team) for team in self.teams]
+        self.scheduler = TurnScheduler(self.teams)
+        self.airborne = set()  # Jumping combatants, re-indexed every tick
+
+    def standing(self):
+        return [character for character in self.combatants if character in self.indexes[self.team_of[character]]]
+
+    def defeated(self, team):
+        return not self.indexes[team]
+
+    def _opponents(self, character):
+        team = self.team_of[character]
+        return [index for other, index in enumerate(self.indexes) if other != team]
+
+    def in_range(self, character, radius=MELEE_RANGE):
+        """Opponents at most radius away from character"""
+        x = character.position[0]
+        return [opponent for index in self._opponents(character) for opponent in index.within(x, radius)]
+
+    def nearest(self, character, side=0):
+        """Nearest opponent of character; side -1 only looks to its left and 1 only to its right"""
+        x = character.position[0]
+        best = None
+        for index in self._opponents(character):
+            candidate = index.nearest(x, side)
+            if candidate is not None and (best is None or
+                                          abs(candidate.position[0] - x) < abs(best.position[0] - x)):
+                best = candidate
+        return best
+
+    def target(self, character):
+        """The opponent character attacks: the weakest one in melee range, else the nearest one"""
+        in_range = self.in_range(character)
+        if in_range:
+            x = character.position[0]
+            return min(in_range, key=lambda opponent: (opponent.health, abs(opponent.position[0] - x)))
+        return self.nearest(character)
+
+    def perform(self, actor, action):
+        """Apply actor's (action, argument) choice; returns (target, result)"""
+        target = self.target(actor)
+        kind = action[0]
+        if kind == "move_left":
+            result = perform_action(actor, action, self.nearest(actor, -1))
+        elif kind == "move_right":
+            result = perform_action(actor, action, self.nearest(actor, 1))
+        else:
+            result = perform_action(actor, action, target)
+        self._resolve(actor, target)
+        return target, result
+
+    def take_turn(self, actor):
+        """Let an AI combatant act against its target; returns (target, result)"""
+        target = self.target(actor)
+        # Moving toward the target never passes a nearer opponent, so it is also the blocker
+        result = actor.act(target, None)
+        if not result.get("success", False):
+            # Rather than retrying a failed choice every tick (e.g. a move into a wall), rest
+            result = actor.rest()
+        self._resolve(actor, target)
+        return target, result
+
+    def _resolve(self, actor, target):
+        self.moved(actor)
+        if target is not None and target.health <= 0:
+            self.remove(target)
+
+    def moved(self, character):
+        self.indexes[self.team_of[character]].update(character)
+        if character.is_jumping:
+            self.airborne.add(character)
+
+    def remove(self, character):
+        """Take a defeated combatant out of the battle"""
+        index = self.indexes[self.team_of[character]]
+        if character in index:
+            index.remove(character)
+        self.scheduler.remove(character)
+        self.airborne.discard(character)
+
+    def tick(self):
+        """Advance every standing combatant's animation; True if anyone moved through the air"""
+        for character in self.standing():
+            character.update_animation()
+        if not self.airborne:
+            return False
+        for character in list(self.airborne):
+            self.indexes[self.team_of[character]].update(character)
+            if not character.is_jumping:
+                self.airborne.discard(character)
+        return True
+
+
+def line_up(characters, left, right):
+    """Spread characters evenly between x = left and x = right as their starting positions"""
+    for index, character in enumerate(characters):
+        x = left + (right - left) * (index + 0.5) / len(characters)
+        character.base_position = (int(x), character.base_position[1])
+        character.reset_position()
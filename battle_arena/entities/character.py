@@ -1,10 +1,40 @@
-import pygame
+import functools
+import inspect
 import random
-from constants import RED, GREEN, BLUE, WHITE, BROWN, WIDTH
+from constants import WIDTH
+
+def records_action(action, detail=None):
+    """Tag an action's result dict with the action name, its argument and the stamina it used
+
+    detail is (result key, index of the method argument after self), e.g.
+    ("skill", 1) for attack(enemy, skill_name); the argument may also be
+    passed by keyword.
+    """
+    def decorate(method):
+        if detail is not None:
+            key, index = detail
+            parameter = list(inspect.signature(method).parameters)[index + 1]
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stamina_before = self.stamina
+            result = method(self, *args, **kwargs)
+            result["action"] = action
+            if detail is not None:
+                result[key] = args[index] if index < len(args) else kwargs[parameter]
+            result["stamina_spent"] = stamina_before - self.stamina
+            return result
+        return wrapper
+    return decorate
 
 class Character:
-    def __init__(self, name, stats=None):
+    # Attributes that are runtime-only and not part of a character snapshot
+    TRANSIENT = ("rng",)
+
+    def __init__(self, name, stats=None, rng=None):
         self.name = name
+        # Source of randomness for hit rolls and AI choices; per-battle streams make battles reproducible
+        self.rng = rng if rng is not None else random
         self.level = 1
         self.strength = 5
         self.agility = 5
@@ -42,11 +72,10 @@ class Character:
         self.is_hit = False
         self.hit_frame = 0
         self.base_position = (200, 400)  # Position[1] is bottom of body
-        self.position = list(self.base_position)
+        self.reset_position()
         self.move_speed = 5 + self.agility * 2
         self.move_stamina_cost = 5
         self.color = (50, 100, 200)
-        self.font_small = pygame.font.SysFont('Arial', 18)
         
         self.is_jumping = False
         self.jump_frame = 0
@@ -57,6 +86,7 @@ class Character:
         self.jump_stamina_cost = 15
         self.jump_direction = None  # "forward" or "backward"
 
+    @records_action("attack", detail=("skill", 1))
     def attack(self, enemy, skill_name):
         distance = abs(self.position[0] - enemy.position[0])
         skill = self.skills[skill_name]
@@ -94,14 +124,8 @@ class Character:
         self.is_attacking = True
         self.attack_frame = 0
         
-        hit_chance = skill["accuracy"] * (self.agility / (self.agility + enemy.agility))
-        if random.random() <= hit_chance:
-            weapon_damage = self.weapons[self.equipped_weapon]
-            base_damage = self.strength + weapon_damage
-            skill_modifier = skill["damage"]
-            damage = int(base_damage * skill_modifier)
-            armor_value = enemy.armor_items[enemy.equipped_armor]
-            damage_reduced = max(1, damage - armor_value - (enemy.armor // 2))
+        if self.rng.random() <= self.hit_chance(enemy, skill_name):
+            damage_reduced = self.hit_damage(enemy, skill_name)
             enemy.health = max(0, enemy.health - damage_reduced)
             enemy.is_hit = True
             enemy.hit_frame = 0
@@ -124,11 +148,24 @@ class Character:
             "message": message
         }
 
+    def hit_chance(self, enemy, skill_name):
+        return self.skills[skill_name]["accuracy"] * (self.agility / (self.agility + enemy.agility))
+
+    def hit_damage(self, enemy, skill_name):
+        """Damage dealt to enemy when skill_name hits"""
+        weapon_damage = self.weapons[self.equipped_weapon]
+        base_damage = self.strength + weapon_damage
+        damage = int(base_damage * self.skills[skill_name]["damage"])
+        armor_value = enemy.armor_items[enemy.equipped_armor]
+        return max(1, damage - armor_value - (enemy.armor // 2))
+
+    @records_action("rest")
     def rest(self):
         recovery = max(5, self.max_stamina // 10) + self.stamina_stat
         self.stamina = min(self.max_stamina, self.stamina + recovery)
         return {"success": True, "message": f"{self.name} rests and recovers {recovery} stamina!"}
 
+    @records_action("jump", detail=("direction", 0))
     def jump(self, direction):
         if self.stamina < self.jump_stamina_cost:
             return {"success": False, "message": f"{self.name} is too tired to jump!"}
@@ -170,6 +207,7 @@ class Character:
         self.jump_distance = self.base_jump_distance + (self.agility * 2)
         return f"{self.name} has reached level {self.level}! Attributes increased!"
 
+    @records_action("move_left")
     def move_left(self, enemy=None):
         if self.stamina < self.move_stamina_cost:
             return {"success": False, "message": f"{self.name} is too tired to move!"}
@@ -189,6 +227,7 @@ class Character:
         self.position[0] = max(50, new_position)
         return {"success": True, "message": f"{self.name} moves left!"}
 
+    @records_action("move_right")
     def move_right(self, enemy=None):
         if self.stamina < self.move_stamina_cost:
             return {"success": False, "message": f"{self.name} is too tired to move!"}
@@ -208,7 +247,38 @@ class Character:
         self.position[0] = min(WIDTH - 50, new_position)
         return {"success": True, "message": f"{self.name} moves right!"}
 
+    def to_dict(self):
+        """Plain-data snapshot of the character (stats, inventory, position and animation state)"""
+        data = {key: value for key, value in self.__dict__.items() if key not in self.TRANSIENT}
+        data["base_position"] = list(self.base_position)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        character = cls.__new__(cls)
+        character.__dict__.update(data)
+        character.base_position = tuple(data["base_position"])
+        character.position = list(data["position"])
+        character.previous_position = list(data["previous_position"])
+        character.rng = random
+        return character
+
+    def reset_position(self):
+        self.position = list(self.base_position)
+        self.previous_position = list(self.position)
+
+    def render_position(self, alpha=1.0):
+        """Position interpolated between the last two simulation ticks"""
+        if alpha >= 1.0:
+            return list(self.position)
+        return [previous + (current - previous) * alpha
+                for previous, current in zip(self.previous_position, self.position)]
+
+    def is_animating(self):
+        return self.is_attacking or self.is_hit or self.is_jumping
+
     def update_animation(self):
+        self.previous_position = list(self.position)
         if self.is_attacking:
             self.attack_frame += 1
             if self.attack_frame > 10:
@@ -243,47 +313,3 @@ class Character:
                 self.jump_frame = 0
                 self.jump_direction = None
                 self.position[1] = self.base_position[1]
-
-    def draw(self, surface):
-        color = self.color if not self.is_hit else (RED if self.hit_frame % 2 == 0 else self.color)
-        position = list(self.position)
-        
-        if self.is_attacking:
-            if self.attack_frame < 5:
-                position[0] += self.attack_frame * 5
-            else:
-                position[0] -= (self.attack_frame - 5) * 5
-        
-        # Define character dimensions
-        body_height = 60
-        head_radius = 30
-        
-        # Body bottom is at position[1], head is above it
-        body_bottom = position[1]
-        body_top = body_bottom - body_height
-        head_center_y = body_top - head_radius
-        
-        # Draw body
-        pygame.draw.rect(surface, color, (int(position[0]) - 20, body_top, 40, body_height))
-        # Draw head
-        pygame.draw.circle(surface, color, (int(position[0]), int(head_center_y)), head_radius)
-        
-        # Draw weapon during attack
-        if self.is_attacking:
-            pygame.draw.rect(surface, BROWN, (int(position[0]) + 20, body_top - 10, 40, 10))
-        
-        # Draw health and stamina bars above the head
-        health_width = 60
-        health_percent = self.health / self.max_health
-        pygame.draw.rect(surface, RED, (int(position[0]) - 30, head_center_y - 20, health_width, 10))
-        pygame.draw.rect(surface, GREEN, (int(position[0]) - 30, head_center_y - 20, int(health_width * health_percent), 10))
-        
-        stamina_width = 60
-        stamina_percent = self.stamina / self.max_stamina
-        pygame.draw.rect(surface, (150, 150, 150), (int(position[0]) - 30, head_center_y - 8, stamina_width, 6))
-        pygame.draw.rect(surface, BLUE, (int(position[0]) - 30, head_center_y - 8, int(stamina_width * stamina_percent), 6))
-        
-        # Draw name above everything
-        name_text = self.font_small.render(self.name, True, WHITE)
-        name_rect = name_text.get_rect(center=(int(position[0]), head_center_y - 30))
-        surface.blit(name_text, name_rect)
\ No newline at end of file
@@ -1,11 +1,14 @@
-import random
 from entities.character import Character
+from entities.actions import perform_action
 from constants import WIDTH
 
 class Enemy(Character):
-    def __init__(self, name, level):
+    TRANSIENT = Character.TRANSIENT + ("ai",)
+    ai = None  # Optional decision maker with choose(enemy, player) -> (action, argument)
+    
+    def __init__(self, name, level, rng=None):
         enemy_stats = {'strength': 0, 'agility': 0, 'armor': 0, 'stamina': 0, 'vitality': 0}
-        super().__init__(name, enemy_stats)
+        super().__init__(name, enemy_stats, rng)
         self.level = level
         self.max_health = 50 + (level * 10)
         self.health = self.max_health
@@ -30,12 +33,19 @@ class Enemy(Character):
         self.max_stamina = 80 + (self.agility * 2) + (self.stamina_stat * 5)
         self.stamina = self.max_stamina
         self.base_position = (600, 400)  # Position[1] now represents the bottom of the body
-        self.position = list(self.base_position)
+        self.reset_position()
         self.move_speed = 5 + self.agility * 2
         self.move_stamina_cost = 5
         self.color = (200, 50, 50)
 
     def choose_action(self, player):
+        return self.act(player, self.ai.choose(self, player) if self.ai is not None else None)
+    
+    def act(self, player, action):
+        """Perform an (action, argument) decision; None uses the built-in heuristic"""
+        if action is not None:
+            return perform_action(self, action, player)
+        
         distance = abs(self.position[0] - player.position[0])
         
         if self.stamina < self.skills["Strike"]["stamina_cost"]:
@@ -43,10 +53,10 @@ class Enemy(Character):
         
         if distance > 100:
             if (self.stamina >= self.skills["Leap Attack"]["stamina_cost"] and 
-                random.random() < 0.7):
+                self.rng.random() < 0.7):
                 return self.attack(player, "Leap Attack")
             elif (self.stamina >= self.jump_stamina_cost and 
-                  random.random() < 0.3 and not self.is_jumping):
+                  self.rng.random() < 0.3 and not self.is_jumping):
                 # Jump toward player
                 direction = "forward" if self.position[0] > player.position[0] else "backward"
                 return self.jump(direction)
@@ -57,7 +67,7 @@ class Enemy(Character):
         
         if self.health < self.max_health * 0.3:
             if (self.stamina >= self.jump_stamina_cost and 
-                random.random() < 0.4 and not self.is_jumping):
+                self.rng.random() < 0.4 and not self.is_jumping):
                 # Jump away from player
                 direction = "backward" if self.position[0] > player.position[0] else "forward"
                 return self.jump(direction)
@@ -65,10 +75,10 @@ class Enemy(Character):
                 return self.attack(player, "Fierce Attack")
             return self.attack(player, "Strike")
         else:
-            roll = random.random()
+            roll = self.rng.random()
             if roll < 0.3 and self.stamina >= self.jump_stamina_cost and not self.is_jumping:
                 # Random jump direction
-                direction = "forward" if random.random() < 0.5 else "backward"
+                direction = "forward" if self.rng.random() < 0.5 else "backward"
                 return self.jump(direction)
             elif roll < 0.6:
                 return self.attack(player, "Strike")
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import math
+import os
+from array import array
+
+from .character import Character
+from .enemy import Enemy
+
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "battle_arena"
+)
+# Bump when the hit or damage formulas in Character change
+FORMULA_VERSION = 1
+
+
+class OutcomeTable:
+    """Precomputed attack outcomes for every skill in the game
+
+    Three matrices cover the whole stat range the game reaches:
+      hit chance        by (skill, attacker agility, defender agility)
+      damage per hit    by (skill, attacker power, defender damage reduction)
+      hits to kill      by (damage per hit, defender health)
+    where power is strength + weapon damage and damage reduction is armor
+    item + armor // 2, exactly as in Character.attack. Lookups are O(1) and
+    return the same numbers the game computes; stats outside the tables are
+    computed directly. Tables are cached on disk per ruleset.
+    """
+
+    def __init__(self, skills, max_agility=64, max_power=128, max_reduction=128, max_health=512):
+        # (damage modifier, accuracy) -> skill index; names differ between player and enemies
+        self.skill_index = {}
+        for skill in skills:
+            self.skill_index.setdefault((skill["damage"], skill["accuracy"]), len(self.skill_index))
+        self.max_agility = max_agility
+        self.max_power = max_power
+        self.max_reduction = max_reduction
+        self.max_health = max_health
+        self.hit = None
+        self.damage = None
+        self.hits_to_kill = None
+
+    @property
+    def ruleset(self):
+        """Hash of everything the tables depend on"""
+        rules = [FORMULA_VERSION, sorted(self.skill_index), self.max_agility, self.max_power,
+                 self.max_reduction, self.max_health]
+        return hashlib.sha1(json.dumps(rules).encode()).hexdigest()[:16]
+
+    def build(self):
+        agility_range = range(1, self.max_agility + 1)
+        self.hit = array("d")
+        self.damage = array("H")
+        for damage_mod, accuracy in self.skill_index:
+            for attacker in agility_range:
+                self.hit.extend(accuracy * (attacker / (attacker + defender)) for defender in agility_range)
+            for power in range(self.max_power + 1):
+                damage = int(power * damage_mod)
+                self.damage.extend(max(1, damage - reduction) for reduction in range(self.max_reduction + 1))
+        self.hits_to_kill = array("H")
+        for damage in range(1, self._max_damage() + 1):
+            self.hits_to_kill.extend(-(-health // damage) for health in range(self.max_health + 1))
+        return self
+
+    def _max_damage(self):
+        return max(1, int(self.max_power * max(mod for mod, _ in self.skill_index)))
+
+    def _sizes(self):
+        skills = len(self.skill_index)
+        return (skills * self.max_agility ** 2,
+                skills * (self.max_power + 1) * (self.max_reduction + 1),
+                self._max_damage() * (self.max_health + 1))
+
+    def load(self, path):
+        """Read cached tables; returns False if the file is missing or does not match"""
+        hit, damage, hits_to_kill = array("d"), array("H"), array("H")
+        try:
+            with open(path, "rb") as cache:
+                for table, size in zip((hit, damage, hits_to_kill), self._sizes()):
+                    table.fromfile(cache, size)
+                if cache.read(1):
+                    return False
+        except (OSError, EOFError):
+            return False
+        self.hit, self.damage, self.hits_to_kill = hit, damage, hits_to_kill
+        return True
+
+    def save(self, path):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_file = path + ".tmp"
+            with open(temp_file, "wb") as cache:
+                for table in (self.hit, self.damage, self.hits_to_kill):
+                    table.tofile(cache)
+            os.replace(temp_file, path)
+        except OSError:
+            pass  # The cache only speeds up startup
+
+    def _skill(self, attacker, skill_name):
+        skill = attacker.skills[skill_name]
+        return self.skill_index.get((skill["damage"], skill["accuracy"]))
+
+    def hit_chance(self, attacker, defender, skill_name):
+        index = self._skill(attacker, skill_name)
+        if index is None or not (0 < attacker.agility <= self.max_agility and 0 < defender.agility <= self.max_agility):
+            return attacker.hit_chance(defender, skill_name)
+        return self.hit[(index * self.max_agility + attacker.agility - 1) * self.max_agility + defender.agility - 1]
+
+    def hit_damage(self, attacker, defender, skill_name):
+        index = self._skill(attacker, skill_name)
+        power = attacker.strength + attacker.weapons[attacker.equipped_weapon]
+        reduction = defender.armor_items[defender.equipped_armor] + defender.armor // 2
+        if index is None or not (0 <= power <= self.max_power and 0 <= reduction <= self.max_reduction):
+            return attacker.hit_damage(defender, skill_name)
+        return self.damage[(index * (self.max_power + 1) + power) * (self.max_reduction + 1) + reduction]
+
+    def hits_needed(self, damage, health):
+        if not (0 < damage <= self._max_damage() and 0 <= health <= self.max_health):
+            return math.ceil(health / damage)
+        return self.hits_to_kill[(damage - 1) * (self.max_health + 1) + health]
+
+    def odds(self, attacker, defender, skill_name, health=None):
+        """Exact odds of attacker using skill_name on defender (at `health`, default current)
+
+        expected_attacks is the mean number of attempts to land hits_to_kill hits.
+        """
+        hit_chance = self.hit_chance(attacker, defender, skill_name)
+        damage = self.hit_damage(attacker, defender, skill_name)
+        hits = self.hits_needed(damage, defender.health if health is None else health)
+        return {
+            "hit_chance": hit_chance,
+            "damage": damage,
+            "expected_damage": hit_chance * damage,
+            "hits_to_kill": hits,
+            "expected_attacks": hits / hit_chance if hit_chance > 0 else math.inf,
+        }
+
+
+_outcome_table = None
+
+
+def get_outcome_table():
+    """The shared table for the game's skills, loaded from the disk cache or built on first use"""
+    global _outcome_table
+    if _outcome_table is None:
+        skills = list(Character("template").skills.values()) + list(Enemy("template", 1).skills.values())
+        table = OutcomeTable(skills)
+        path = os.path.join(CACHE_DIR, f"outcomes-{table.ruleset}.bin")
+        if not table.load(path):
+            table.build().save(path)
+        _outcome_table = table
+    return _outcome_table
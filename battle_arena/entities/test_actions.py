@@ -0,0 +1,68 @@
+import random
+
+from constants import WIDTH
+from entities import Character, Enemy, available_actions, rules_for
+from entities.actions import MELEE_RANGE
+
+BUTTONS = ["Move Left", "Move Right", "Quick Strike", "Heavy Strike", "Leap Attack", "Rest", "Jump Fwd", "Jump Bwd"]
+
+
+def legacy_disabled(player, enemy):
+    """The battle buttons' per-label checks from before the action mask, as {label: disabled}"""
+    within_attack_range = abs(player.position[0] - enemy.position[0]) <= MELEE_RANGE
+    x = player.position[0]
+    stamina = player.stamina
+    skills = player.skills
+    return {
+        "Move Left": stamina < player.move_stamina_cost or x <= 50,
+        "Move Right": within_attack_range or stamina < player.move_stamina_cost or x >= WIDTH - 50,
+        "Quick Strike": stamina < skills["Quick Strike"]["stamina_cost"] or not within_attack_range,
+        "Heavy Strike": stamina < skills["Heavy Strike"]["stamina_cost"] or not within_attack_range,
+        "Leap Attack": (within_attack_range or stamina < skills["Leap Attack"]["stamina_cost"] or
+                        x >= enemy.position[0]),
+        "Rest": stamina >= player.max_stamina,
+        "Jump Fwd": stamina < player.jump_stamina_cost or player.is_jumping or x >= WIDTH - 50,
+        "Jump Bwd": stamina < player.jump_stamina_cost or player.is_jumping or x <= 50,
+    }
+
+
+def test_player_actions_are_in_button_order():
+    rules = rules_for(Character("Hero"))
+    assert rules.actions == [("move_left", None), ("move_right", None), ("attack", "Quick Strike"),
+                             ("attack", "Heavy Strike"), ("attack", "Leap Attack"), ("rest", None),
+                             ("jump", "forward"), ("jump", "backward")]
+
+
+def test_mask_matches_legacy_button_rules():
+    rng = random.Random(0)
+    player = Character("Hero")
+    enemy = Enemy("Goblin", 1)
+    rules = rules_for(player)
+    # Include the boundaries the rules compare against: the walls and the edge of melee range
+    special_x = [0, 49, 50, 51, WIDTH - 51, WIDTH - 50, WIDTH - 49, WIDTH]
+    for _ in range(20000):
+        player.position[0] = rng.choice(special_x) if rng.random() < 0.2 else rng.randint(0, WIDTH)
+        if rng.random() < 0.3:
+            offset = rng.choice([-MELEE_RANGE - 1, -MELEE_RANGE, 0, MELEE_RANGE, MELEE_RANGE + 1])
+            enemy.position[0] = player.position[0] + offset
+        else:
+            enemy.position[0] = rng.randint(0, WIDTH)
+        player.stamina = rng.randint(0, player.max_stamina)
+        player.is_jumping = rng.random() < 0.2
+        mask = rules.mask(player.stamina, player.position[0], player.is_jumping, enemy.position[0])
+        disabled = legacy_disabled(player, enemy)
+        assert [not mask >> index & 1 for index in range(len(BUTTONS))] == [disabled[label] for label in BUTTONS]
+
+
+def test_available_actions_follow_the_mask():
+    player = Character("Hero")
+    enemy = Enemy("Goblin", 1)
+    player.position[0], enemy.position[0] = 200, 250
+    player.stamina = player.max_stamina
+    actions = available_actions(player, enemy)
+    assert ("attack", "Quick Strike") in actions
+    assert ("attack", "Leap Attack") not in actions
+    assert ("move_right", None) not in actions
+    assert ("rest", None) not in actions
+    player.stamina = 0
+    assert available_actions(player, enemy) == [("rest", None)]
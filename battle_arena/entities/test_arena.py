@@ -0,0 +1,116 @@
+import random
+
+from entities import PositionIndex, TurnScheduler
+
+
+class Dummy:
+    """Just what PositionIndex and TurnScheduler look at"""
+
+    def __init__(self, x, agility=5):
+        self.position = [x, 400]
+        self.agility = agility
+
+    def __repr__(self):
+        return f"Dummy(x={self.position[0]}, agility={self.agility})"
+
+
+def check_consistent(index, characters):
+    assert index.xs == sorted(index.xs)
+    assert index.xs == [character.position[0] for character in index.members]
+    assert sorted(map(id, index.members)) == sorted(map(id, characters))
+    assert all(index.indexed[character] == character.position[0] for character in characters)
+
+
+def check_queries(index, characters, rng):
+    for _ in range(20):
+        x = rng.randint(-10, 110)
+        radius = rng.randint(0, 30)
+        within = index.within(x, radius)
+        xs = [character.position[0] for character in within]
+        assert xs == sorted(xs)
+        assert sorted(map(id, within)) == sorted(id(character) for character in characters
+                                                 if abs(character.position[0] - x) <= radius)
+        for side, candidates in ((0, characters),
+                                 (-1, [character for character in characters if character.position[0] < x]),
+                                 (1, [character for character in characters if character.position[0] > x])):
+            nearest = index.nearest(x, side)
+            if not candidates:
+                assert nearest is None
+            else:
+                # Ties may go either way; only the distance is fixed
+                distance = min(abs(character.position[0] - x) for character in candidates)
+                assert abs(nearest.position[0] - x) == distance
+                assert nearest in candidates
+
+
+def test_queries_match_brute_force_after_random_moves():
+    rng = random.Random(0)
+    # Few distinct x values, so many characters share a position
+    characters = [Dummy(rng.randrange(0, 100, 5)) for _ in range(40)]
+    index = PositionIndex(characters)
+    check_consistent(index, characters)
+    for step in range(500):
+        character = rng.choice(characters)
+        if step % 2:
+            character.position[0] += rng.choice([-1, 1])  # Usually stays between its neighbours
+        else:
+            character.position[0] = rng.randrange(0, 100, 5)  # Usually passes some of them
+        index.update(character)
+        check_consistent(index, characters)
+        if step % 10 == 0:
+            check_queries(index, characters, rng)
+
+
+def test_update_only_reinserts_when_passing_a_neighbour():
+    characters = [Dummy(x) for x in (10, 20, 20, 30)]
+    index = PositionIndex(characters)
+    removed = []
+    original_remove = index.remove
+    index.remove = lambda character: removed.append(character) or original_remove(character)
+
+    characters[0].position[0] = 15
+    index.update(characters[0])
+    characters[3].position[0] = 20  # Onto a duplicate: still in order
+    index.update(characters[3])
+    assert removed == []
+
+    characters[0].position[0] = 25
+    index.update(characters[0])
+    assert removed == [characters[0]]
+    check_consistent(index, characters)
+    assert index.members[-1] is characters[0]
+
+
+def test_remove_picks_the_right_one_of_equal_positions():
+    characters = [Dummy(50) for _ in range(5)]
+    index = PositionIndex(characters)
+    index.remove(characters[2])
+    assert characters[2] not in index
+    assert len(index) == 4
+    check_consistent(index, characters[:2] + characters[3:])
+    assert index.nearest(40, 1) in characters
+
+
+def test_one_vs_one_turns_alternate():
+    player, enemy = Dummy(100, agility=5), Dummy(700, agility=30)
+    scheduler = TurnScheduler([[player], [enemy]])
+    assert [scheduler.next() for _ in range(6)] == [player, enemy] * 3
+    assert scheduler.round == 2
+
+
+def test_teams_take_turns_in_order_most_agile_first():
+    slow, fast, foe_a, foe_b = Dummy(0, 3), Dummy(0, 9), Dummy(0, 5), Dummy(0, 5)
+    scheduler = TurnScheduler([[slow, fast], [foe_a, foe_b]])
+    assert [scheduler.next() for _ in range(8)] == [fast, slow, foe_a, foe_b] * 2
+
+
+def test_removed_combatants_are_skipped():
+    a, b, c = Dummy(0, 9), Dummy(0, 5), Dummy(0, 1)
+    scheduler = TurnScheduler([[a], [b, c]])
+    assert scheduler.next() is a
+    scheduler.remove(b)  # Removed while its entry is still queued for this round
+    assert [scheduler.next() for _ in range(4)] == [c, a, c, a]
+    scheduler.remove(a)
+    scheduler.remove(c)
+    assert scheduler.next() is None
+    assert scheduler.current is None
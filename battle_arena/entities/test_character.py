@@ -0,0 +1,27 @@
+import random
+
+from entities import Character, Enemy
+
+
+def make_fighters():
+    player = Character("Hero", rng=random.Random(0))
+    enemy = Enemy("Goblin", 1, random.Random(1))
+    player.position[0] = enemy.position[0] - 50
+    return player, enemy
+
+
+def test_results_record_the_action_and_its_argument():
+    player, enemy = make_fighters()
+    result = player.attack(enemy, "Quick Strike")
+    assert (result["action"], result["skill"]) == ("attack", "Quick Strike")
+    assert result["stamina_spent"] == player.skills["Quick Strike"]["stamina_cost"]
+    result = player.jump("backward")
+    assert (result["action"], result["direction"]) == ("jump", "backward")
+    assert player.rest()["action"] == "rest"
+
+
+def test_arguments_may_be_passed_by_keyword():
+    player, enemy = make_fighters()
+    assert player.attack(enemy, skill_name="Heavy Strike")["skill"] == "Heavy Strike"
+    assert player.attack(enemy=enemy, skill_name="Quick Strike")["skill"] == "Quick Strike"
+    assert player.jump(direction="forward")["direction"] == "forward"
@@ -1,15 +1,21 @@
 import random
 from .enemy import Enemy
+from .ai import ExpectimaxAI
 
-def generate_enemy(player_level):
-    """Generate an appropriate enemy based on player level"""
+ALLY_COLOR = (50, 160, 80)
+
+def generate_enemy(player_level, rng=random, ai=None):
+    """Generate an appropriate enemy based on player level
+    
+    ai="expectimax" gives the enemy the lookahead AI instead of the built-in heuristic.
+    """
     enemy_types = [
         "Goblin", "Bandit", "Wolf", "Skeleton", "Orc", 
         "Troll", "Dark Knight", "Shadow Assassin", "Ogre"
     ]
     
     # Choose enemy level based on player level
-    enemy_level = max(1, player_level - 1 + random.randint(-1, 2))
+    enemy_level = max(1, player_level - 1 + rng.randint(-1, 2))
     
     # Choose appropriate enemy type based on level
     if enemy_level <= 3:
@@ -19,11 +25,32 @@ def generate_enemy(player_level):
     else:
         enemy_pool = enemy_types[5:]
     
-    enemy_name = random.choice(enemy_pool)
+    enemy_name = rng.choice(enemy_pool)
     
     # Add suffix for higher level enemies
     if enemy_level > 5:
         suffixes = ["the Strong", "the Fierce", "the Deadly", "the Brutal"]
-        enemy_name += " " + random.choice(suffixes)
+        enemy_name += " " + rng.choice(suffixes)
     
-    return Enemy(enemy_name, enemy_level)
\ No newline at end of file
+    enemy = Enemy(enemy_name, enemy_level, rng)
+    if ai == "expectimax":
+        enemy.ai = ExpectimaxAI.for_level(enemy_level)
+    return enemy
+
+
+def generate_team(player_level, count, rng=random, allied=False):
+    """Generate count enemies for a team battle, numbered where their names repeat
+
+    allied=True makes them fight on the player's side instead.
+    """
+    team = [generate_enemy(player_level, rng) for _ in range(count)]
+    seen = {}
+    for member in team:
+        seen[member.name] = seen.get(member.name, 0) + 1
+        if seen[member.name] > 1:
+            member.name += f" {seen[member.name]}"
+    if allied:
+        for member in team:
+            member.name = f"Allied {member.name}"
+            member.color = ALLY_COLOR
+    return team
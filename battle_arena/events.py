@@ -0,0 +1,152 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class BattleEvent:
+    """One combat action, as recorded for analytics"""
+    turn: int
+    timestamp: float
+    actor: str
+    target: str
+    action: str
+    skill: str
+    success: bool
+    hit: bool
+    damage: int
+    stamina_spent: int
+    actor_position: tuple
+    target_position: tuple
+
+
+def event_from_result(turn, actor, target, result, timestamp=None):
+    """Build a BattleEvent from the result dict of Character.attack/rest/jump/move_*"""
+    return BattleEvent(
+        turn=turn,
+        timestamp=time.time() if timestamp is None else timestamp,
+        actor=actor.name,
+        target=target.name,
+        action=result.get("action", ""),
+        skill=result.get("skill") or result.get("direction") or "",
+        success=bool(result.get("success", False)),
+        hit=bool(result.get("hit", False)),
+        damage=int(result.get("damage", 0)),
+        stamina_spent=int(result.get("stamina_spent", 0)),
+        actor_position=(float(actor.position[0]), float(actor.position[1])),
+        target_position=(float(target.position[0]), float(target.position[1])),
+    )
+
+
+class JsonlSink:
+    """One JSON object per line"""
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, event):
+        self.file.write(json.dumps(asdict(event), separators=(",", ":")) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class BinarySink:
+    """Packed little-endian records
+
+    Strings (names, actions, skills) are interned: the first time one is seen
+    a string record (b"S", id, length, utf-8 bytes) is written, and event
+    records (b"E" + EVENT_FORMAT) refer to it by id. See read_binary_events.
+    """
+
+    STRING_HEADER = struct.Struct("<cHH")
+    EVENT_FORMAT = struct.Struct("<cIdHHHHBhhffff")
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        self.strings = {}
+
+    def _string_id(self, text):
+        string_id = self.strings.get(text)
+        if string_id is None:
+            string_id = self.strings[text] = len(self.strings)
+            data = text.encode("utf-8")
+            self.file.write(self.STRING_HEADER.pack(b"S", string_id, len(data)) + data)
+        return string_id
+
+    def write(self, event):
+        flags = (1 if event.success else 0) | (2 if event.hit else 0)
+        self.file.write(self.EVENT_FORMAT.pack(
+            b"E", event.turn, event.timestamp,
+            self._string_id(event.actor), self._string_id(event.target),
+            self._string_id(event.action), self._string_id(event.skill),
+            flags, event.damage, event.stamina_spent,
+            event.actor_position[0], event.actor_position[1],
+            event.target_position[0], event.target_position[1],
+        ))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_binary_events(path):
+    """Yield the BattleEvents stored by BinarySink (string ids are per file session)"""
+    strings = {}
+    with open(path, "rb") as source:
+        while True:
+            kind = source.read(1)
+            if not kind:
+                return
+            if kind == b"S":
+                string_id, length = struct.unpack("<HH", source.read(4))
+                # A new session appending to the same file restarts the ids from 0
+                strings[string_id] = source.read(length).decode("utf-8")
+                continue
+            fields = BinarySink.EVENT_FORMAT.unpack(kind + source.read(BinarySink.EVENT_FORMAT.size - 1))
+            (_, turn, timestamp, actor, target, action, skill, flags, damage, stamina_spent,
+             actor_x, actor_y, target_x, target_y) = fields
+            yield BattleEvent(turn, timestamp, strings[actor], strings[target], strings[action],
+                              strings[skill], bool(flags & 1), bool(flags & 2), damage, stamina_spent,
+                              (actor_x, actor_y), (target_x, target_y))
+
+
+def open_sink(path):
+    """Binary sink for *.bin paths, JSONL otherwise"""
+    return BinarySink(path) if os.path.splitext(path)[1] == ".bin" else JsonlSink(path)
+
+
+class EventStream:
+    """Queues events and writes them to a sink on a background thread"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="battle-event-writer", daemon=True)
+        self.thread.start()
+
+    def emit(self, event):
+        self.queue.put(event)
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            self.sink.write(event)
+            if self.queue.empty():
+                self.sink.flush()
+        self.sink.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
@@ -1,3 +1,14 @@
+import os
+import random
+import time
+from battle_log import BattleLog
+from constants import WIDTH
+from events import event_from_result
+from entities import Arena, Character, generate_enemy, generate_team, line_up, perform_action, rules_for
+from planner import WAITING
+from replay import Replay
+from sim import recommended_builds
+
 class GameState:
     # Game state constants
     STATE_MAIN_MENU = 0
@@ -7,16 +18,47 @@ class GameState:
     STATE_CHARACTER_STATS = 4
     STATE_GAME_OVER = 5
     STATE_PRE_BATTLE = 6
+    STATE_NAMES = {
+        STATE_MAIN_MENU: "MAIN_MENU",
+        STATE_CHARACTER_CREATION: "CHARACTER_CREATION",
+        STATE_BATTLE: "BATTLE",
+        STATE_ARENA_MENU: "ARENA_MENU",
+        STATE_CHARACTER_STATS: "CHARACTER_STATS",
+        STATE_GAME_OVER: "GAME_OVER",
+        STATE_PRE_BATTLE: "PRE_BATTLE",
+    }
     
-    def __init__(self):
+    def __init__(self, log_dir=None, event_stream=None, replay_dir=None, autosaver=None, enemy_ai=None,
+                 enemy_planner=None, teams=None):
         self.current_state = self.STATE_MAIN_MENU
         self.player = None
-        self.enemy = None
+        self.enemy = None  # In a team battle: the enemy the player currently targets
         self.battles_won = 0
         self.battle_turn = "player"
-        self.battle_log = []
+        self.battle_log = BattleLog(log_dir=log_dir)
         self.battle_action_delay = 0
         self.pre_battle_timer = 0
+        self.turn_number = 0
+        self.event_stream = event_stream
+        
+        # Per-battle seed and tick count; together with the player's actions they make up a replay
+        self.battle_seed = None
+        self.battle_ticks = 0
+        self.replay = None
+        self.replay_dir = replay_dir
+        
+        # The player's available actions (bit i = player_rules.actions[i]), refreshed when the battle changes
+        self.player_rules = None
+        self.action_mask = 0
+        self.autosaver = autosaver
+        self.enemy_ai = enemy_ai  # None for the built-in heuristic, or "expectimax"
+        self.enemy_planner = enemy_planner  # Runs enemy AI searches off the frame loop
+        
+        # (allies, enemies) per battle; anything but (0, 1) is a team battle fought out in an Arena
+        self.teams = tuple(teams) if teams is not None else (0, 1)
+        if len(self.teams) != 2 or self.teams[0] < 0 or self.teams[1] < 1:
+            raise ValueError(f"teams must be (allies >= 0, enemies >= 1), got {self.teams}")
+        self.arena = None
         
         # Character creation variables
         self.input_name = "Hero"
@@ -30,20 +72,280 @@ class GameState:
         }
         
         self.stat_buttons = {}
+        self.recommended_index = -1
     
     def change_state(self, new_state):
         self.current_state = new_state
+        self.autosave()
+    
+    def save_data(self):
+        """The persistent part of the game: the character and progress"""
+        return {"battles_won": self.battles_won, "player": self.player.to_dict()}
+    
+    def restore(self, data):
+        self.player = Character.from_dict(data["player"])
+        self.player.reset_position()
+        self.battles_won = data["battles_won"]
+        self.enemy = None
+        self.arena = None
+        self.change_state(self.STATE_ARENA_MENU)
+    
+    def autosave(self):
+        if self.autosaver is None or self.player is None:
+            return
+        if self.player.health <= 0:
+            self.autosaver.discard()
+        else:
+            self.autosaver.save(self.save_data())
         
     def reset_battle(self):
         self.battle_turn = "player"
-        self.battle_log = []
+        self.battle_log.clear()
         self.battle_action_delay = 0
+        self.turn_number = 0
+        if self.enemy_planner is not None:
+            self.enemy_planner.cancel()
     
     def add_battle_log(self, message):
         self.battle_log.append(message)
     
     def clear_battle_log(self):
-        self.battle_log = []
+        self.battle_log.clear()
+    
+    def record_action(self, actor, target, result):
+        """Count a combat action and send it to the event stream, if one is attached"""
+        self.turn_number += 1
+        if self.event_stream is not None:
+            self.event_stream.emit(event_from_result(self.turn_number, actor, target, result))
+    
+    def start_battle(self, seed=None):
+        """Generate the next enemy from a per-battle seed and move to the pre-battle screen"""
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.battle_seed = seed
+        allies, enemies = self.teams
+        if (allies, enemies) == (0, 1):
+            self.arena = None
+            self.enemy = generate_enemy(self.player.level, random.Random(f"{seed}/enemy"), self.enemy_ai)
+        else:
+            self.arena = self.make_arena(seed, allies, enemies)
+            self.enemy = self.arena.teams[1][0]
+        self.player.rng = random.Random(f"{seed}/player")
+        self.reset_battle()
+        if self.arena is None:
+            self.add_battle_log(f"A {self.enemy.name} (Level {self.enemy.level}) appears!")
+        else:
+            self.add_battle_log(f"{enemies} enemies led by {self.enemy.name} (Level {self.enemy.level}) appear!")
+        self.pre_battle_timer = 0
+        self.change_state(self.STATE_PRE_BATTLE)
+    
+    def make_arena(self, seed, allies, enemies):
+        """Both sides of a team battle, lined up on their halves of the arena
+        
+        Allies and enemies all use the built-in heuristic, whatever enemy_ai is.
+        """
+        level = self.player.level
+        friends = generate_team(level, allies, random.Random(f"{seed}/allies"), allied=True)
+        foes = generate_team(level, enemies, random.Random(f"{seed}/enemy"))
+        if friends:
+            line_up(friends, 50, WIDTH // 2 - 60)
+        line_up(foes, WIDTH // 2 + 60, WIDTH - 50)
+        return Arena([[self.player] + friends, foes])
+    
+    def begin_battle(self, record=True):
+        self.player.reset_position()
+        self.enemy.reset_position()
+        self.battle_ticks = 0
+        self.replay = Replay(self.battle_seed, self.player.to_dict(), teams=self.teams) if record else None
+        self.player_rules = rules_for(self.player)
+        if self.arena is not None:
+            self.arena = Arena(self.arena.teams)  # Index the positions the combatants start from
+            self.next_turn()
+        self.update_action_mask()
+        self.change_state(self.STATE_BATTLE)
+    
+    def update_action_mask(self):
+        player = self.player
+        if self.arena is not None and not self.arena.defeated(1):
+            self.enemy = self.arena.target(player)
+        self.action_mask = self.player_rules.mask(player.stamina, player.position[0], player.is_jumping,
+                                                  self.enemy.position[0])
+    
+    def player_act(self, action):
+        """Perform the player's (action, argument) choice and resolve its consequences"""
+        if self.replay is not None:
+            self.replay.record(self.battle_ticks, action)
+        if self.arena is not None:
+            return self.team_act(self.player, action)
+        result = perform_action(self.player, action, self.enemy)
+        self.record_action(self.player, self.enemy, result)
+        self.battle_log.append(result["message"])
+        if self.enemy.health <= 0:
+            self.battle_log.append(f"{self.enemy.name} has been defeated!")
+            self.win_battle([self.enemy])
+        elif result.get("success", False):
+            self.battle_turn = "enemy"
+            self.battle_action_delay = 30
+            self.update_action_mask()
+            if self.enemy_planner is not None and self.enemy.ai is not None:
+                self.enemy_planner.request(self.enemy, self.player)
+        return result
+    
+    def team_act(self, actor, action):
+        """Perform a team battle turn, action=None letting an AI combatant choose, and resolve its consequences"""
+        if action is None:
+            target, result = self.arena.take_turn(actor)
+        else:
+            target, result = self.arena.perform(actor, action)
+        self.record_action(actor, target, result)
+        self.battle_log.append(result["message"])
+        if target is not None and target.health <= 0:
+            self.battle_log.append(f"{target.name} has been defeated!")
+        if self.player.health <= 0:
+            self.lose_battle()
+        elif self.arena.defeated(1):
+            self.win_battle(self.arena.teams[1])
+        elif result.get("success", False):
+            self.next_turn()
+        self.update_action_mask()
+        return result
+    
+    def next_turn(self):
+        """Hand a team battle to the next combatant in turn order"""
+        actor = self.arena.scheduler.next()
+        if actor is self.player:
+            self.battle_turn = "player"
+            return
+        self.battle_turn = "enemy" if self.arena.team_of[actor] == 1 else "ally"
+        # Short pauses between AI turns, so a round of a crowded battle still takes about a second
+        self.battle_action_delay = max(self.battle_action_delay, min(30, max(2, 60 // len(self.arena.combatants))))
+    
+    def win_battle(self, enemies):
+        exp_reward = sum(enemy.exp_reward for enemy in enemies)
+        gold_reward = sum(enemy.gold_reward for enemy in enemies)
+        self.player.gain_experience(exp_reward)
+        self.player.gold += gold_reward
+        self.battle_log.append(f"You gained {exp_reward} exp and {gold_reward} gold!")
+        self.battles_won += 1
+        self.battle_action_delay = 60
+        self.end_battle("player")
+        self.change_state(self.STATE_ARENA_MENU)
+    
+    def lose_battle(self):
+        self.battle_log.append(f"{self.player.name} has been defeated!")
+        self.battle_action_delay = 60
+        self.end_battle("enemy")
+        self.change_state(self.STATE_GAME_OVER)
+    
+    def other_combatants(self):
+        """Team battle combatants besides the player and its target, one slot each (None once out of the battle)"""
+        if self.arena is None:
+            return ()
+        standing = set(self.arena.standing())
+        return [character if character in standing and character is not self.player and character is not self.enemy
+                else None for character in self.arena.combatants]
+    
+    def battle_outcome(self, winner=None):
+        if self.arena is None:
+            enemies = [self.enemy]
+            enemies_defeated = self.enemy.health <= 0
+        else:
+            enemies = self.arena.teams[1]
+            enemies_defeated = self.arena.defeated(1)
+        if winner is None:
+            winner = "player" if enemies_defeated else "enemy" if self.player.health <= 0 else None
+        return {"winner": winner, "ticks": self.battle_ticks, "turns": self.turn_number,
+                "player_health": self.player.health, "enemy_health": sum(enemy.health for enemy in enemies)}
+    
+    def end_battle(self, winner):
+        self.autosave()
+        if self.replay is None:
+            return
+        self.replay.outcome = self.battle_outcome(winner)
+        if self.replay_dir is not None:
+            self.save_replay()
+    
+    def save_replay(self):
+        """Write the current battle's replay, finished or not (e.g. for a crash report)"""
+        if self.replay is None or self.replay_dir is None:
+            return None
+        os.makedirs(self.replay_dir, exist_ok=True)
+        path = os.path.join(self.replay_dir, f"{int(time.time())}-{self.battle_seed}.replay")
+        self.replay.save(path)
+        return path
+    
+    def tick(self):
+        """Advance the battle by one fixed simulation step (animations, enemy turn, delays)"""
+        if self.current_state != self.STATE_BATTLE:
+            return
+        self.battle_ticks += 1
+        if self.arena is not None:
+            self.team_tick()
+            return
+        moving = self.player.is_jumping or self.enemy.is_jumping
+        self.player.update_animation()
+        self.enemy.update_animation()
+        if moving:
+            self.update_action_mask()
+        
+        if self.battle_turn == "enemy" and self.battle_action_delay <= 0:
+            result = self.enemy_turn()
+        else:
+            result = None
+        if result is not None:
+            self.record_action(self.enemy, self.player, result)
+            self.battle_log.append(result["message"])
+            if self.player.health <= 0:
+                self.lose_battle()
+            elif result.get("success", False):
+                self.battle_turn = "player"
+            self.update_action_mask()
+        
+        if self.battle_action_delay > 0:
+            self.battle_action_delay -= 1
+    
+    def team_tick(self):
+        if self.arena.tick():
+            self.update_action_mask()
+        if self.battle_turn != "player" and self.battle_action_delay <= 0:
+            self.team_act(self.arena.scheduler.current, None)
+        if self.battle_action_delay > 0:
+            self.battle_action_delay -= 1
+    
+    def enemy_turn(self):
+        """Perform the enemy's action; returns None while an off-thread decision is still pending"""
+        if self.enemy.ai is None:
+            return self.enemy.choose_action(self.player)
+        if self.enemy_planner is None:
+            action = self.enemy.ai.choose(self.enemy, self.player)
+        elif self.enemy_planner.pending:
+            action = self.enemy_planner.poll()
+            if action is WAITING:
+                return None
+        else:
+            action = None  # Retrying after a failed action: use the heuristic
+        if self.replay is not None:
+            self.replay.record_enemy(self.battle_ticks, action)
+        return self.enemy.act(self.player, action)
+    
+    def is_animating(self):
+        """True while the battle needs frames: animations, turn delays or a pending enemy turn"""
+        if self.current_state != self.STATE_BATTLE:
+            return False
+        if self.arena is not None:
+            return (any(character.is_animating() for character in self.arena.standing()) or
+                    self.battle_action_delay > 0 or self.battle_turn != "player")
+        return (self.player.is_animating() or self.enemy.is_animating() or
+                self.battle_action_delay > 0 or self.battle_turn == "enemy")
+    
+    def rest(self):
+        """Recover up to half of max health and all stamina between battles"""
+        health_restored = min(self.player.max_health - self.player.health, self.player.max_health // 2)
+        self.player.health += health_restored
+        self.player.stamina = self.player.max_stamina
+        self.clear_battle_log()
+        self.add_battle_log(f"{self.player.name} recovers {health_restored} health and full stamina!")
+        return health_restored
     
     def increment_battles_won(self):
         self.battles_won += 1
@@ -62,4 +364,13 @@ class GameState:
         if self.current_stats[stat_name] > 0:
             self.current_stats[stat_name] -= 1
             return True
-        return False
\ No newline at end of file
+        return False
+    
+    def apply_recommended_build(self):
+        """Fill the stat points with the next recommended build; False if none have been computed"""
+        builds = recommended_builds()
+        if not builds or sum(builds[0]["stats"].values()) != self.stat_points:
+            return False
+        self.recommended_index = (self.recommended_index + 1) % len(builds)
+        self.current_stats = dict(builds[self.recommended_index]["stats"])
+        return True
@@ -1,10 +1,19 @@
+import os
 import pygame
 import sys
+import time
 from constants import *
 from game_state import GameState
-from entities import Character, Enemy, generate_enemy
+from battle_log import LOG_DIR, STATE_DIR
+from events import EventStream, open_sink
+from scheduler import FrameScheduler
+from save import Autosaver
+from planner import EnemyPlanner
+from profiler import profiler
+from entities import Character
 from ui import (
     Button, 
+    init_fonts,
     draw_health_bar,
     draw_main_menu,
     draw_character_creation,
@@ -12,28 +21,54 @@ from ui import (
     draw_battle_arena,
     draw_character_stats,
     draw_game_over,
-    draw_pre_battle
+    draw_pre_battle,
+    DirtyRenderer,
+    invalidate_backgrounds,
+    battle_arena_regions,
+    character_creation_regions,
+    arena_menu_regions,
+    draw_profiler_overlay,
+    PROFILER_OVERLAY_RECT,
+    get_font
 )
 
+def make_main_menu_buttons(can_continue):
+    labels = (["Continue"] if can_continue else []) + ["New Game", "Exit"]
+    return [Button(WIDTH/2 - 100, 250 + 70 * i, 200, 50, label) for i, label in enumerate(labels)]
+
+def parse_teams(value):
+    """(allies, enemies) from a BATTLE_ARENA_TEAMS value such as "2v30"; None (classic battles) if unset or invalid"""
+    if not value:
+        return None
+    allies, separator, enemies = value.strip().lower().partition("v")
+    if separator and allies.isdecimal() and enemies.isdecimal() and int(enemies) >= 1:
+        return int(allies), int(enemies)
+    print(f"Ignoring BATTLE_ARENA_TEAMS={value!r}: expected ALLIESvENEMIES with at least 1 enemy, e.g. 2v30",
+          file=sys.stderr)
+    return None
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Battle Arena")
-    clock = pygame.time.Clock()
+    scheduler = FrameScheduler(60)
     
-    fonts = {
-        'small': pygame.font.SysFont('Arial', 18),
-        'medium': pygame.font.SysFont('Arial', 24),
-        'large': pygame.font.SysFont('Arial', 32),
-        'title': pygame.font.SysFont('Arial', 48, bold=True)
-    }
+    fonts = init_fonts()
     
-    game_state = GameState()
+    # Structured combat events for analytics, e.g. BATTLE_ARENA_EVENTS=events.jsonl (or .bin)
+    events_path = os.environ.get("BATTLE_ARENA_EVENTS")
+    event_stream = EventStream(open_sink(events_path)) if events_path else None
+    autosaver = Autosaver()
+    # BATTLE_ARENA_ENEMY_AI=expectimax switches enemies to the lookahead AI, searched off the frame loop
+    enemy_ai = os.environ.get("BATTLE_ARENA_ENEMY_AI")
+    enemy_planner = EnemyPlanner() if enemy_ai else None
+    # BATTLE_ARENA_TEAMS=2v30 makes every battle a team battle: the player and 2 allies against 30 enemies
+    teams = parse_teams(os.environ.get("BATTLE_ARENA_TEAMS"))
+    game_state = GameState(log_dir=LOG_DIR, event_stream=event_stream,
+                           replay_dir=os.path.join(STATE_DIR, "replays"), autosaver=autosaver,
+                           enemy_ai=enemy_ai, enemy_planner=enemy_planner, teams=teams)
     
-    main_menu_buttons = [
-        Button(WIDTH/2 - 100, 250, 200, 50, "New Game"),
-        Button(WIDTH/2 - 100, 320, 200, 50, "Exit")
-    ]
+    main_menu_buttons = make_main_menu_buttons(autosaver.exists)
     
     char_creation_buttons = []
     y_position = 240
@@ -52,6 +87,7 @@ def main():
     
     pre_battle_button = Button(WIDTH/2 - 100, HEIGHT - 80, 200, 40, "Start Battle!")
     
+    # In the order of the player's actions (ActionRules.actions): button i performs action i
     battle_buttons = [
         # Movement buttons (top row)
         Button(50, 420, 120, 40, "Move Left", color=(0, 120, 200), hover_color=(255, 215, 0), font_size=18),
@@ -74,21 +110,70 @@ def main():
         Button(WIDTH/2 - 100, 470, 200, 50, "Exit")
     ]
     
+    renderer = DirtyRenderer(screen)
+    drawn_state = None
+    shown_action_mask = None
+    
+    # Frame-time profiler: F3 toggles the overlay, F4 writes a CSV and reports the result on the overlay;
+    # BATTLE_ARENA_PROFILE=1 shows it at startup
+    show_profiler = profiler.enabled = bool(os.environ.get("BATTLE_ARENA_PROFILE"))
+    profiler_font = get_font("Courier New", 14)
+    profiler_lines = None
+    profiler_updated = 0
+    profiler_status = None  # Result of the last F4 export, shown on the overlay for a few seconds
+    profiler_status_until = 0
+    
+    def save_crash_replay(exc_type, exc, traceback):
+        # Keep the battle that was in progress so the crash can be reproduced with replay.py
+        if game_state.replay is not None and game_state.replay.outcome is None:
+            print(f"Replay of the interrupted battle saved to {game_state.save_replay()}", file=sys.stderr)
+        sys.__excepthook__(exc_type, exc, traceback)
+    sys.excepthook = save_crash_replay
+    
     running = True
+    active = True
     while running:
+        events = scheduler.next_events(active)
+        ticks = scheduler.ticks()
+        profiler.begin_frame(GameState.STATE_NAMES[game_state.current_state])
         mouse_pos = pygame.mouse.get_pos()
         mouse_clicked = False
         
-        for event in pygame.event.get():
+        # A new screen has to be drawn in full once, with freshly built background layers
+        if game_state.current_state != drawn_state:
+            invalidate_backgrounds()
+            renderer.mark_all()
+            drawn_state = game_state.current_state
+            shown_action_mask = None
+            if drawn_state == GameState.STATE_MAIN_MENU:
+                main_menu_buttons = make_main_menu_buttons(autosaver.exists)
+        
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.mark_all()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     mouse_clicked = True
             if event.type == pygame.KEYDOWN:
-                if game_state.current_state == GameState.STATE_CHARACTER_CREATION:
+                if event.key == pygame.K_F3:
+                    show_profiler = profiler.enabled = not show_profiler
+                elif event.key == pygame.K_F4:
+                    profile_path = os.path.join(STATE_DIR, f"profile-{int(time.time())}.csv")
+                    try:
+                        os.makedirs(STATE_DIR, exist_ok=True)
+                        profiler.export_csv(profile_path)
+                        profiler_status = f"Saved {os.path.basename(profile_path)}"
+                    except OSError as error:
+                        profiler_status = f"Export failed: {error.strerror}"
+                    profiler_status_until = pygame.time.get_ticks() + 3000
+                    profiler_lines = None
+                elif game_state.current_state == GameState.STATE_CHARACTER_CREATION:
                     if event.key == pygame.K_BACKSPACE:
                         game_state.input_name = game_state.input_name[:-1]
+                    elif event.key == pygame.K_TAB:
+                        game_state.apply_recommended_build()
                     elif event.key == pygame.K_RETURN:
                         if game_state.get_remaining_points() == 0 and game_state.input_name:
                             game_state.player = Character(game_state.input_name, game_state.current_stats)
@@ -96,17 +181,40 @@ def main():
                     elif len(game_state.input_name) < 15 and event.unicode.isprintable():
                         game_state.input_name += event.unicode
         
+        profiler.lap("events")
+        
+        status = profiler_status if pygame.time.get_ticks() < profiler_status_until else None
+        show_overlay = show_profiler or status is not None
+        if show_overlay and (profiler_lines is None or pygame.time.get_ticks() - profiler_updated >= 250):
+            # One function line less while the status line is shown, so everything fits the panel
+            lines = (profiler.summary(GameState.STATE_NAMES[game_state.current_state], 3 if status else 4)
+                     if show_profiler else [])
+            profiler_lines = tuple(lines + [status] if status else lines)
+            profiler_updated = pygame.time.get_ticks()
+        renderer.track("profiler", PROFILER_OVERLAY_RECT, profiler_lines if show_overlay else None)
+        
         if game_state.current_state == GameState.STATE_MAIN_MENU:
             for button in main_menu_buttons:
                 button.check_hover(mouse_pos)
                 if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
-                    if button.text == "New Game":
+                    if button.text == "Continue":
+                        try:
+                            saved = autosaver.load()
+                        except (OSError, ValueError) as error:
+                            print(f"Could not load the saved game: {error}", file=sys.stderr)
+                            saved = None
+                        if saved is not None:
+                            game_state.restore(saved)
+                    elif button.text == "New Game":
                         game_state.change_state(GameState.STATE_CHARACTER_CREATION)
                         game_state.input_name = "Hero"
                         game_state.current_stats = {'strength': 0, 'agility': 0, 'defense': 0, 'stamina': 0, 'vitality': 0}
                     elif button.text == "Exit":
                         running = False
-            draw_main_menu(screen, main_menu_buttons, fonts)
+            renderer.track_buttons(main_menu_buttons)
+            profiler.lap("update")
+            if renderer.begin():
+                draw_main_menu(screen, main_menu_buttons, fonts)
                 
         elif game_state.current_state == GameState.STATE_CHARACTER_CREATION:
             for i, button in enumerate(char_creation_buttons):
@@ -123,144 +231,81 @@ def main():
                         game_state.player = Character(game_state.input_name, game_state.current_stats)
                         game_state.change_state(GameState.STATE_ARENA_MENU)
                         game_state.battles_won = 0
-            draw_character_creation(screen, char_creation_buttons, game_state, fonts)
+            for name, rect, value in character_creation_regions(game_state):
+                renderer.track(name, rect, value)
+            renderer.track_buttons(char_creation_buttons)
+            profiler.lap("update")
+            if renderer.begin():
+                draw_character_creation(screen, char_creation_buttons, game_state, fonts)
                 
         elif game_state.current_state == GameState.STATE_ARENA_MENU:
             for button in arena_buttons:
                 button.check_hover(mouse_pos)
                 if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
                     if button.text == "Enter Battle":
-                        game_state.enemy = generate_enemy(game_state.player.level)
-                        game_state.battle_log = [f"A {game_state.enemy.name} (Level {game_state.enemy.level}) appears!"]
-                        game_state.battle_turn = "player"
-                        game_state.battle_action_delay = 0
-                        game_state.pre_battle_timer = 0
-                        game_state.change_state(GameState.STATE_PRE_BATTLE)
+                        game_state.start_battle()
                     elif button.text == "View Stats":
                         game_state.change_state(GameState.STATE_CHARACTER_STATS)
                     elif button.text == "Rest (Heal)":
-                        health_restored = min(game_state.player.max_health - game_state.player.health, game_state.player.max_health // 2)
-                        game_state.player.health += health_restored
-                        game_state.player.stamina = game_state.player.max_stamina
-                        game_state.battle_log = [f"{game_state.player.name} recovers {health_restored} health and full stamina!"]
+                        game_state.rest()
                     elif button.text == "Exit Game":
                         game_state.change_state(GameState.STATE_GAME_OVER)
-            draw_arena_menu(screen, game_state.player, arena_buttons, game_state.battles_won, fonts)
+            for name, rect, value in arena_menu_regions(game_state.player, game_state.battles_won):
+                renderer.track(name, rect, value)
+            renderer.track_buttons(arena_buttons)
+            profiler.lap("update")
+            if renderer.begin():
+                draw_arena_menu(screen, game_state.player, arena_buttons, game_state.battles_won, fonts)
                 
         elif game_state.current_state == GameState.STATE_PRE_BATTLE:
             pre_battle_button.check_hover(mouse_pos)
             if mouse_clicked and pre_battle_button.is_clicked(mouse_pos, mouse_clicked):
-                game_state.player.position = list(game_state.player.base_position)
-                game_state.enemy.position = list(game_state.enemy.base_position)
-                game_state.change_state(GameState.STATE_BATTLE)
-            draw_pre_battle(screen, game_state.player, game_state.enemy, pre_battle_button, game_state.pre_battle_timer, fonts)
+                game_state.begin_battle()
+            renderer.track_buttons([pre_battle_button])
+            profiler.lap("update")
+            if renderer.begin():
+                draw_pre_battle(screen, game_state.player, game_state.enemy, pre_battle_button, game_state.pre_battle_timer, fonts)
                 
         elif game_state.current_state == GameState.STATE_BATTLE:
-            game_state.player.update_animation()
-            game_state.enemy.update_animation()
-            
-            distance = abs(game_state.player.position[0] - game_state.enemy.position[0])
-            within_attack_range = distance <= 100
+            # Animations, the enemy's turn and delays advance in fixed simulation ticks
+            for _ in range(ticks):
+                game_state.tick()
             
             if game_state.battle_turn == "player":
-                for button in battle_buttons:
-                    # Reset button state
-                    button.set_disabled(False)
-                    button.color = button.base_color
-                    
-                    # Disable buttons based on conditions
-                    if button.text == "Move Left":
-                        if game_state.player.stamina < game_state.player.move_stamina_cost or game_state.player.position[0] <= 50:
-                            button.set_disabled(True)
-                    elif button.text == "Move Right":
-                        if (within_attack_range or 
-                            game_state.player.stamina < game_state.player.move_stamina_cost or 
-                            game_state.player.position[0] >= WIDTH - 50):
-                            button.set_disabled(True)
-                    elif button.text == "Quick Strike":
-                        if (game_state.player.stamina < game_state.player.skills["Quick Strike"]["stamina_cost"] or
-                            not within_attack_range):
-                            button.set_disabled(True)
-                    elif button.text == "Heavy Strike":
-                        if (game_state.player.stamina < game_state.player.skills["Heavy Strike"]["stamina_cost"] or
-                            not within_attack_range):
-                            button.set_disabled(True)
-                    elif button.text == "Leap Attack":
-                        if (within_attack_range or 
-                            game_state.player.stamina < game_state.player.skills["Leap Attack"]["stamina_cost"] or 
-                            game_state.player.position[0] >= game_state.enemy.position[0]):
-                            button.set_disabled(True)
-                    elif button.text == "Rest":
-                        if game_state.player.stamina >= game_state.player.max_stamina:
-                            button.set_disabled(True)
-                    elif button.text == "Jump Fwd":
-                        if (game_state.player.stamina < game_state.player.jump_stamina_cost or 
-                            game_state.player.is_jumping or 
-                            game_state.player.position[0] >= WIDTH - 50):
-                            button.set_disabled(True)
-                    elif button.text == "Jump Bwd":
-                        if (game_state.player.stamina < game_state.player.jump_stamina_cost or 
-                            game_state.player.is_jumping or 
-                            game_state.player.position[0] <= 50):
-                            button.set_disabled(True)
-                    
+                # The mask only changes with the battle state; buttons are updated when it does
+                if game_state.action_mask != shown_action_mask:
+                    shown_action_mask = game_state.action_mask
+                    for index, button in enumerate(battle_buttons):
+                        button.set_disabled(not shown_action_mask >> index & 1)
+                for index, button in enumerate(battle_buttons):
                     button.check_hover(mouse_pos)
                     if mouse_clicked and button.is_clicked(mouse_pos, mouse_clicked):
-                        result = None
-                        if button.text == "Move Left":
-                            result = game_state.player.move_left(game_state.enemy)
-                        elif button.text == "Move Right":
-                            result = game_state.player.move_right(game_state.enemy)
-                        elif button.text == "Quick Strike":
-                            result = game_state.player.attack(game_state.enemy, "Quick Strike")
-                        elif button.text == "Heavy Strike":
-                            result = game_state.player.attack(game_state.enemy, "Heavy Strike")
-                        elif button.text == "Leap Attack":
-                            result = game_state.player.attack(game_state.enemy, "Leap Attack")
-                        elif button.text == "Rest":
-                            result = game_state.player.rest()
-                        elif button.text == "Jump Fwd":
-                            result = game_state.player.jump("forward")
-                        elif button.text == "Jump Bwd":
-                            result = game_state.player.jump("backward")
-                        
-                        if result:
-                            game_state.battle_log.append(result["message"])
-                            if game_state.enemy.health <= 0:
-                                game_state.battle_log.append(f"{game_state.enemy.name} has been defeated!")
-                                game_state.player.gain_experience(game_state.enemy.exp_reward)
-                                game_state.player.gold += game_state.enemy.gold_reward
-                                game_state.battle_log.append(f"You gained {game_state.enemy.exp_reward} exp and {game_state.enemy.gold_reward} gold!")
-                                game_state.battles_won += 1
-                                game_state.battle_action_delay = 60
-                                game_state.change_state(GameState.STATE_ARENA_MENU)
-                            elif result.get("success", False):
-                                game_state.battle_turn = "enemy"
-                                game_state.battle_action_delay = 30
-            
-            if game_state.battle_turn == "enemy" and game_state.battle_action_delay <= 0:
-                result = game_state.enemy.choose_action(game_state.player)
-                game_state.battle_log.append(result["message"])
-                if game_state.player.health <= 0:
-                    game_state.battle_log.append(f"{game_state.player.name} has been defeated!")
-                    game_state.battle_action_delay = 60
-                    game_state.change_state(GameState.STATE_GAME_OVER)
-                elif result.get("success", False):
-                    game_state.battle_turn = "player"
+                        game_state.player_act(game_state.player_rules.actions[index])
             
-            if game_state.battle_action_delay > 0:
-                game_state.battle_action_delay -= 1
-            
-            draw_battle_arena(screen, game_state.player, game_state.enemy, game_state.battle_log, game_state.battle_turn, fonts)
-            if game_state.battle_turn == "player":
-                for button in battle_buttons:
-                    button.draw(screen)
+            others = game_state.other_combatants()
+            for name, rect, value in battle_arena_regions(game_state.player, game_state.enemy,
+                                                          game_state.battle_log, game_state.battle_turn, fonts,
+                                                          scheduler.alpha, others):
+                renderer.track(name, rect, value)
+            # Buttons are only shown on the player's turn
+            renderer.track("battle_buttons", pygame.Rect(40, 410, 400, 160), game_state.battle_turn == "player")
+            renderer.track_buttons(battle_buttons)
+            profiler.lap("update")
+            if renderer.begin():
+                draw_battle_arena(screen, game_state.player, game_state.enemy, game_state.battle_log, game_state.battle_turn, fonts,
+                                  scheduler.alpha, others)
+                if game_state.battle_turn == "player":
+                    for button in battle_buttons:
+                        button.draw(screen)
                 
         elif game_state.current_state == GameState.STATE_CHARACTER_STATS:
             stats_back_button.check_hover(mouse_pos)
             if mouse_clicked and stats_back_button.is_clicked(mouse_pos, mouse_clicked):
                 game_state.change_state(GameState.STATE_ARENA_MENU)
-            draw_character_stats(screen, game_state.player, stats_back_button, fonts)
+            renderer.track_buttons([stats_back_button])
+            profiler.lap("update")
+            if renderer.begin():
+                draw_character_stats(screen, game_state.player, stats_back_button, fonts)
             
         elif game_state.current_state == GameState.STATE_GAME_OVER:
             for button in game_over_buttons:
@@ -274,11 +319,26 @@ def main():
                         game_state.current_stats = {'strength': 0, 'agility': 0, 'defense': 0, 'stamina': 0, 'vitality': 0}
                     elif button.text == "Exit":
                         running = False
-            draw_game_over(screen, game_state.player, game_state.battles_won, game_over_buttons, fonts)
+            renderer.track_buttons(game_over_buttons)
+            profiler.lap("update")
+            if renderer.begin():
+                draw_game_over(screen, game_state.player, game_state.battles_won, game_over_buttons, fonts)
+        
+        if show_overlay and renderer.drawing:
+            draw_profiler_overlay(screen, profiler_lines, profiler_font)
         
-        pygame.display.flip()
-        clock.tick(60)
+        # Keep running at full rate while anything is still changing on screen
+        presented = renderer.present()
+        profiler.lap("draw")
+        profiler.end_frame()
+        active = presented or game_state.is_animating() or game_state.current_state != drawn_state
     
+    autosaver.close()
+    if enemy_planner is not None:
+        enemy_planner.close()
+    game_state.battle_log.close()
+    if event_stream is not None:
+        event_stream.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,41 @@
+import argparse
+import os
+import time
+
+from sim.builds import BuildOptimizer, DEFAULT_SETTINGS, STATS, all_builds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find strong stat allocations for character creation")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-s", "--seed", type=int, default=DEFAULT_SETTINGS["seed"])
+    parser.add_argument("-b", "--battles", type=int, default=DEFAULT_SETTINGS["battles"],
+                        help="battles per player level")
+    parser.add_argument("-r", "--runs", type=int, default=DEFAULT_SETTINGS["runs"],
+                        help="arena runs per build for the survival depth")
+    parser.add_argument("--levels", type=int, nargs="+", default=DEFAULT_SETTINGS["levels"])
+    parser.add_argument("--step", type=int, default=4, help="grid step of the initial search")
+    parser.add_argument("--refine", type=int, default=8, help="best builds whose neighbours are searched")
+    parser.add_argument("--exhaustive", action="store_true", help="score every possible build")
+    parser.add_argument("-n", "--top", type=int, default=10, help="builds to print")
+    args = parser.parse_args()
+
+    optimizer = BuildOptimizer({"seed": args.seed, "battles": args.battles, "runs": args.runs,
+                                "levels": args.levels})
+    total = len(all_builds(optimizer.settings["points"]))
+    start = time.perf_counter()
+
+    def progress(known, scored):
+        print(f"{known}/{total} builds scored (+{scored}, {time.perf_counter() - start:.1f}s)")
+
+    optimizer.optimize(args.workers, args.step, args.refine, args.exhaustive, progress)
+    print(f"Scores cached in {optimizer.path}; best builds published to {optimizer.recommended_path}")
+    print(f"{'rank':>4}  " + " ".join(f"{stat[:3].upper():>3}" for stat in STATS) +
+          f"  {'win rate':>8}  {'depth':>5}  {'score':>5}")
+    for rank, (build, (win_rate, depth, score)) in enumerate(optimizer.ranking(args.top), 1):
+        print(f"{rank:4}  " + " ".join(f"{value:3}" for value in build) +
+              f"  {win_rate:8.1%}  {depth:5.2f}  {score:5.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+# poll() result while the decision is still being computed
+WAITING = object()
+
+
+def settled_snapshot(character):
+    """Copy of character as it will be once its running animations have finished"""
+    snapshot = type(character).from_dict(character.to_dict())
+    while snapshot.is_animating():
+        snapshot.update_animation()
+    return snapshot
+
+
+class EnemyPlanner:
+    """Computes enemy AI decisions on a background thread
+
+    request() is made as soon as the enemy's turn is known to be next. The AI
+    searches a snapshot of both fighters, advanced past their running
+    animations, so the decision matches the position the enemy will act from,
+    while the frame loop keeps rendering the turn delay. poll() is called
+    once the delay has expired; if the decision is still missing after
+    `timeout` seconds it gives up and returns None, meaning the enemy falls
+    back to its built-in heuristic.
+    """
+
+    def __init__(self, timeout=0.1, history=1000):
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.request_id = 0
+        self.pending = False
+        self.result = None
+        self.poll_started = None
+        self.latencies = deque(maxlen=history)  # Seconds spent searching per decision
+        self.waits = deque(maxlen=history)      # Seconds the turn waited after its delay expired
+        self.decisions = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name="enemy-planner", daemon=True)
+        self.thread.start()
+
+    def request(self, enemy, player):
+        with self.lock:
+            self.request_id += 1
+            self.result = None
+        self.pending = True
+        self.poll_started = None
+        self.queue.put((self.request_id, enemy.ai, settled_snapshot(enemy), settled_snapshot(player)))
+
+    def cancel(self):
+        with self.lock:
+            self.request_id += 1
+            self.result = None
+        self.pending = False
+
+    def poll(self):
+        """The requested (action, argument), None to fall back to the heuristic, or WAITING"""
+        now = time.perf_counter()
+        if self.poll_started is None:
+            self.poll_started = now
+        with self.lock:
+            result = self.result
+        if result is None and now - self.poll_started < self.timeout:
+            return WAITING
+        self.pending = False
+        self.waits.append(now - self.poll_started)
+        if result is None:
+            self.timeouts += 1
+            self.cancel()
+            return None
+        self.decisions += 1
+        return result[0]
+
+    def stats(self):
+        """Decision latency percentiles (ms) and counters"""
+        latencies = sorted(self.latencies)
+        waits = sorted(self.waits)
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+        return {
+            "decisions": self.decisions,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency_p50_ms": percentile(latencies, 0.5),
+            "latency_p95_ms": percentile(latencies, 0.95),
+            "latency_max_ms": percentile(latencies, 1.0),
+            "wait_p95_ms": percentile(waits, 0.95),
+        }
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            request_id, ai, enemy, player = job
+            start = time.perf_counter()
+            try:
+                action = ai.choose(enemy, player)
+            except Exception:
+                traceback.print_exc()
+                self.errors += 1
+                action = None
+            self.latencies.append(time.perf_counter() - start)
+            with self.lock:
+                if request_id == self.request_id:
+                    self.result = (action,)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
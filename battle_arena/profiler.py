@@ -0,0 +1,106 @@
+import csv
+import functools
+import time
+from collections import defaultdict, deque
+
+# Upper bounds (ms) of the histogram buckets in CSV exports; the last one catches the rest
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 33, 66, float("inf"))
+
+
+class FrameProfiler:
+    """Rolling per-state frame timings
+
+    Each frame is split into laps: lap(name) charges the time since the
+    previous lap (or begin_frame) to `name`, so the main loop can time event
+    handling, update and draw without nesting. Functions wrapped with
+    @profiled add their own time, summed per frame. The last `window` frames
+    of every (state, section) pair are kept for percentiles and histograms.
+    Everything is a no-op while disabled.
+    """
+
+    def __init__(self, window=600):
+        self.enabled = False
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.state = None
+        self.frame = {}
+        self.frame_start = 0.0
+        self.lap_start = 0.0
+
+    def begin_frame(self, state):
+        if not self.enabled:
+            return
+        self.state = state
+        self.frame = {}
+        self.frame_start = self.lap_start = time.perf_counter()
+
+    def lap(self, section):
+        if not self.enabled or self.state is None:
+            return
+        now = time.perf_counter()
+        self.frame[section] = self.frame.get(section, 0.0) + now - self.lap_start
+        self.lap_start = now
+
+    def record(self, section, seconds):
+        if self.state is not None:
+            self.frame[section] = self.frame.get(section, 0.0) + seconds
+
+    def end_frame(self):
+        if not self.enabled or self.state is None:
+            return
+        self.frame["frame"] = time.perf_counter() - self.frame_start
+        for section, seconds in self.frame.items():
+            self.samples[(self.state, section)].append(seconds * 1000)
+        self.state = None
+
+    def percentiles(self, state, section, fractions=(0.5, 0.95, 0.99)):
+        values = sorted(self.samples.get((state, section), ()))
+        if not values:
+            return [0.0 for _ in fractions]
+        return [values[min(len(values) - 1, int(len(values) * fraction))] for fraction in fractions]
+
+    def summary(self, state, functions=4):
+        """Overlay lines for one state: frame and phase percentiles, then the slowest draw functions"""
+        lines = [f"{state[:14]:14} {'p50':>6} {'p95':>6} {'p99':>6}"]
+        sections = ["frame", "events", "update", "draw"]
+        drawn = [section for (sample_state, section) in self.samples
+                 if sample_state == state and section not in sections]
+        drawn.sort(key=lambda section: -self.percentiles(state, section, (0.95,))[0])
+        for section in sections + drawn[:functions]:
+            if (state, section) in self.samples:
+                p50, p95, p99 = self.percentiles(state, section)
+                lines.append(f"{section[:14]:14} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        return lines
+
+    def export_csv(self, path):
+        """Write percentiles and a histogram of the rolling window for every (state, section)"""
+        with open(path, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["state", "section", "samples", "p50_ms", "p95_ms", "p99_ms", "max_ms"] +
+                            [f"le_{bound}ms" for bound in HISTOGRAM_BUCKETS[:-1]] + ["gt_66ms"])
+            for (state, section), values in sorted(self.samples.items()):
+                counts = [0] * len(HISTOGRAM_BUCKETS)
+                for value in values:
+                    counts[next(index for index, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound)] += 1
+                p50, p95, p99 = self.percentiles(state, section)
+                writer.writerow([state, section, len(values), f"{p50:.3f}", f"{p95:.3f}", f"{p99:.3f}",
+                                 f"{max(values):.3f}"] + counts)
+
+
+profiler = FrameProfiler()
+
+
+def profiled(function):
+    """Charge the wrapped function's time to its name in the current profiler frame"""
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - start)
+    return wrapper
@@ -0,0 +1,542 @@
+import argparse
+import json
+import pickle
+import random
+import socket
+import struct
+import time
+from collections import deque
+
+from constants import WIDTH
+from entities import Character, perform_action, rules_for
+from sim.builds import STATS, is_valid_build
+
+TICK_RATE = 60
+# Ticks between snapshots: 20 snapshots per second
+SNAPSHOT_INTERVAL = 3
+# Snapshots the host keeps as delta baselines; older acks get a full snapshot
+HISTORY = 64
+TURN_DELAY = 30  # Ticks after an action before the other side may act, as in GameState
+# A player not heard from for this many ticks has left; an undecided match is forfeited to the other side
+PEER_TIMEOUT = 10 * TICK_RATE
+# Stats of players that do not choose their own: the 20 creation points spread evenly
+DEFAULT_STATS = {stat: 4 for stat in STATS}
+
+SNAPSHOT, INPUT, ACK, HELLO, WELCOME = range(1, 6)
+
+# type, sequence number, sequence number of the baseline (0 for none), host tick
+HEADER = struct.Struct("<BIII")
+INPUT_PACKET = struct.Struct("<BIIB")  # type, acked snapshot, input sequence number, action index
+ACK_PACKET = struct.Struct("<BI")
+LOG_HEADER = struct.Struct("<HB")  # index of the first message, message count
+LENGTH = struct.Struct("<H")
+
+# Fields sent in snapshots, with their wire formats; a snapshot only carries the fields that changed
+MATCH_FIELDS = (("turn", "B"), ("winner", "b"))
+FIGHTER_FIELDS = (("health", "h"), ("stamina", "h"), ("x", "f"), ("y", "f"),
+                  ("is_attacking", "?"), ("attack_frame", "B"), ("is_hit", "?"), ("hit_frame", "B"),
+                  ("is_jumping", "?"), ("jump_frame", "B"), ("input_seq", "I"))
+FIELD_STRUCTS = {format: struct.Struct("<" + format) for _, format in MATCH_FIELDS + FIGHTER_FIELDS}
+MATCH_MASK = struct.Struct("<B")
+FIGHTER_MASK = struct.Struct("<H")
+
+
+def fighter_state(character, input_seq):
+    """Values of FIGHTER_FIELDS for character"""
+    return (character.health, character.stamina, character.position[0], character.position[1],
+            character.is_attacking, character.attack_frame, character.is_hit, character.hit_frame,
+            character.is_jumping, character.jump_frame, input_seq)
+
+
+def apply_fighter_state(character, state):
+    """Copy snapshot values onto a client-side character, e.g. for draw_character"""
+    (character.health, character.stamina, x, y, character.is_attacking, character.attack_frame,
+     character.is_hit, character.hit_frame, character.is_jumping, character.jump_frame, _) = state
+    character.previous_position = list(character.position)
+    character.position = [x, y]
+
+
+def _encode_fields(fields, values, base, mask_struct, out):
+    mask = 0
+    payload = bytearray()
+    for index, ((_, format), value) in enumerate(zip(fields, values)):
+        if base is None or value != base[index]:
+            mask |= 1 << index
+            payload += FIELD_STRUCTS[format].pack(value)
+    out += mask_struct.pack(mask) + payload
+
+
+def _decode_fields(fields, base, mask_struct, data, offset):
+    (mask,) = mask_struct.unpack_from(data, offset)
+    offset += mask_struct.size
+    values = list(base) if base is not None else [None] * len(fields)
+    for index, (_, format) in enumerate(fields):
+        if mask >> index & 1:
+            field = FIELD_STRUCTS[format]
+            (values[index],) = field.unpack_from(data, offset)
+            offset += field.size
+    return tuple(values), offset
+
+
+def encode_snapshot(seq, tick, state, base_seq=0, base=None, log=()):
+    """Snapshot packet with only the fields of `state` that differ from `base`
+
+    state is {"match": values of MATCH_FIELDS, "fighters": two tuples of
+    FIGHTER_FIELDS values, "log": number of battle messages}. Messages the
+    base has not seen are appended, so lost ones are resent until acked.
+    """
+    out = bytearray(HEADER.pack(SNAPSHOT, seq, base_seq if base is not None else 0, tick))
+    _encode_fields(MATCH_FIELDS, state["match"], base and base["match"], MATCH_MASK, out)
+    for side in (0, 1):
+        _encode_fields(FIGHTER_FIELDS, state["fighters"][side], base and base["fighters"][side],
+                       FIGHTER_MASK, out)
+    first = base["log"] if base is not None else 0
+    messages = log[first:state["log"]][-255:]
+    out += LOG_HEADER.pack(state["log"] - len(messages), len(messages))
+    for message in messages:
+        data = message.encode("utf-8")[:65535]
+        out += LENGTH.pack(len(data)) + data
+    return bytes(out)
+
+
+def decode_snapshot(data, bases):
+    """(seq, tick, state, first message index, messages); None if the baseline is unknown"""
+    _, seq, base_seq, tick = HEADER.unpack_from(data)
+    base = None
+    if base_seq:
+        base = bases.get(base_seq)
+        if base is None:
+            return None
+    offset = HEADER.size
+    match, offset = _decode_fields(MATCH_FIELDS, base and base["match"], MATCH_MASK, data, offset)
+    fighters = []
+    for side in (0, 1):
+        fighter, offset = _decode_fields(FIGHTER_FIELDS, base and base["fighters"][side],
+                                         FIGHTER_MASK, data, offset)
+        fighters.append(fighter)
+    first, count = LOG_HEADER.unpack_from(data, offset)
+    offset += LOG_HEADER.size
+    messages = []
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        messages.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    state = {"match": match, "fighters": tuple(fighters), "log": first + count}
+    return seq, tick, state, first, messages
+
+
+class LoopbackTransport:
+    """One end of an in-memory datagram link, a stand-in for UDP in tests and local play
+
+    Packets arrive `latency` receive() calls after they were sent, and are
+    dropped with probability `loss`.
+    """
+
+    def __init__(self, latency=0, loss=0.0, rng=None):
+        self.peer = None
+        self.latency = latency
+        self.loss = loss
+        self.rng = rng if rng is not None else random.Random(0)
+        self.inbox = deque()
+        self.polls = 0
+        self.bytes_sent = 0
+        self.packets_sent = 0
+
+    def send(self, data):
+        self.bytes_sent += len(data)
+        self.packets_sent += 1
+        if self.loss and self.rng.random() < self.loss:
+            return
+        self.peer.inbox.append((self.peer.polls + self.latency, bytes(data)))
+
+    def receive(self):
+        self.polls += 1
+        packets = []
+        while self.inbox and self.inbox[0][0] < self.polls:
+            packets.append(self.inbox.popleft()[1])
+        return packets
+
+    def close(self):
+        pass
+
+
+def loopback_pair(latency=0, loss=0.0, seed=0):
+    """Two connected LoopbackTransports"""
+    first = LoopbackTransport(latency, loss, random.Random(f"{seed}/a"))
+    second = LoopbackTransport(latency, loss, random.Random(f"{seed}/b"))
+    first.peer, second.peer = second, first
+    return first, second
+
+
+class UdpTransport:
+    """Non-blocking UDP datagrams to one peer; the host learns its peer from the first packet"""
+
+    def __init__(self, bind=("0.0.0.0", 0), peer=None):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(bind)
+        self.socket.setblocking(False)
+        self.peer = peer
+        self.bytes_sent = 0
+        self.packets_sent = 0
+
+    def send(self, data):
+        if self.peer is None:
+            return
+        self.bytes_sent += len(data)
+        self.packets_sent += 1
+        try:
+            self.socket.sendto(data, self.peer)
+        except OSError:
+            pass  # Datagrams may be lost anyway
+
+    def receive(self):
+        packets = []
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, ConnectionError):
+                return packets
+            if self.peer is None:
+                self.peer = address
+            if address == self.peer:
+                packets.append(data)
+
+    def close(self):
+        self.socket.close()
+
+
+class PvpHost:
+    """Authoritative two-player match over two transports
+
+    Clients join with HELLO (name and stats) and get WELCOME with both
+    characters; a HELLO whose stats are not a valid creation build is
+    ignored. The host then runs the battle at TICK_RATE with the game's
+    rules: sides alternate turns, an action must be available in the actor's
+    ActionRules mask, and the next turn waits for animations and TURN_DELAY.
+    Every SNAPSHOT_INTERVAL ticks each client gets a snapshot encoded as a
+    delta against the last snapshot it acknowledged.
+    """
+
+    def __init__(self, transports, seed=None, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.transports = transports
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.snapshot_interval = snapshot_interval
+        self.hellos = [None, None]
+        self.fighters = None
+        self.rules = None
+        self.welcome = [None, None]
+        self.acked = [0, 0]
+        self.pending = [None, None]  # Newest (input sequence number, action index) per side
+        self.input_seq = [0, 0]      # Last input applied per side
+        self.history = {}            # seq -> state
+        self.seq = 0
+        self.ticks = 0
+        self.turn = 0
+        self.winner = -1
+        self.final_seq = None  # First snapshot showing the winner
+        self.delay = 0
+        self.log = []
+        self.last_heard = [0, 0]  # Tick of the last packet from each side
+
+    def _start(self):
+        fighters = []
+        for side, hello in enumerate(self.hellos):
+            fighter = Character(str(hello.get("name", f"Player {side + 1}"))[:15], hello["stats"],
+                                random.Random(f"{self.seed}/{side}"))
+            if side == 1:
+                fighter.base_position = (WIDTH - 200, 400)
+                fighter.color = (200, 50, 50)
+                fighter.reset_position()
+            fighters.append(fighter)
+        self.fighters = fighters
+        self.rules = [rules_for(fighter) for fighter in fighters]
+        for side in (0, 1):
+            self.welcome[side] = bytes([WELCOME]) + json.dumps(
+                {"side": side, "fighters": [fighter.to_dict() for fighter in fighters]}).encode()
+        self.log.append(f"{fighters[0].name} and {fighters[1].name} enter the arena!")
+
+    def tick(self):
+        """Advance the match by one tick; returns the winning side once the match is over, else None"""
+        for side, transport in enumerate(self.transports):
+            for packet in transport.receive():
+                self.last_heard[side] = self.ticks
+                self._handle(side, packet)
+        if self.fighters is None:
+            if None in self.hellos:
+                return None
+            self._start()
+            self.last_heard = [self.ticks, self.ticks]
+
+        self.ticks += 1
+        if self.winner < 0:
+            for side in (0, 1):
+                if self.ticks - self.last_heard[side] > PEER_TIMEOUT:
+                    self.log.append(f"{self.fighters[side].name} left the match!")
+                    self.winner = 1 - side
+                    break
+        for side in (0, 1):
+            if self.acked[side] == 0:
+                self.transports[side].send(self.welcome[side])
+        for fighter in self.fighters:
+            fighter.update_animation()
+        if self.winner < 0 and self.delay <= 0 and not any(fighter.is_animating() for fighter in self.fighters):
+            self._act(self.turn)
+        if self.delay > 0:
+            self.delay -= 1
+        if self.ticks % self.snapshot_interval == 0:
+            self._send_snapshots()
+        return self.winner if self.winner >= 0 else None
+
+    def _handle(self, side, packet):
+        if not packet:
+            return  # Stray datagram
+        kind = packet[0]
+        if kind == HELLO and self.hellos[side] is None:
+            try:
+                hello = json.loads(packet[1:])
+            except ValueError:
+                return
+            if isinstance(hello, dict) and is_valid_build(hello.get("stats")):
+                self.hellos[side] = hello
+        elif kind == ACK and len(packet) == ACK_PACKET.size:
+            self.acked[side] = max(self.acked[side], ACK_PACKET.unpack(packet)[1])
+        elif kind == INPUT and len(packet) == INPUT_PACKET.size:
+            _, ack, input_seq, action = INPUT_PACKET.unpack(packet)
+            self.acked[side] = max(self.acked[side], ack)
+            if input_seq > self.input_seq[side] and (self.pending[side] is None or
+                                                     input_seq > self.pending[side][0]):
+                self.pending[side] = (input_seq, action)
+
+    def _act(self, side):
+        if self.pending[side] is None:
+            return
+        input_seq, index = self.pending[side]
+        self.pending[side] = None
+        self.input_seq[side] = input_seq
+        actor, target = self.fighters[side], self.fighters[1 - side]
+        rules = self.rules[side]
+        if index >= len(rules.actions):
+            return
+        mask = rules.mask(actor.stamina, actor.position[0], actor.is_jumping, target.position[0])
+        if not mask >> index & 1:
+            return  # Not available any more; the client sees its input consumed and can pick again
+        result = perform_action(actor, rules.actions[index], target)
+        self.log.append(result["message"])
+        if target.health <= 0:
+            self.log.append(f"{target.name} has been defeated!")
+            self.winner = side
+        elif result.get("success", False):
+            self.turn = 1 - side
+            self.delay = TURN_DELAY
+
+    def state(self):
+        return {"match": (self.turn, self.winner),
+                "fighters": tuple(fighter_state(fighter, self.input_seq[side])
+                                  for side, fighter in enumerate(self.fighters)),
+                "log": len(self.log)}
+
+    def _send_snapshots(self):
+        self.seq += 1
+        state = self.history[self.seq] = self.state()
+        if self.winner >= 0 and self.final_seq is None:
+            self.final_seq = self.seq
+        self.history.pop(self.seq - HISTORY, None)
+        for side, transport in enumerate(self.transports):
+            base = self.history.get(self.acked[side])
+            transport.send(encode_snapshot(self.seq, self.ticks, state, self.acked[side], base, self.log))
+
+    def finished(self):
+        """True once the match is over and each client has acknowledged its final snapshot or gone silent"""
+        if self.final_seq is None:
+            return False
+        return all(acked >= self.final_seq or self.ticks - heard > PEER_TIMEOUT
+                   for acked, heard in zip(self.acked, self.last_heard))
+
+
+class PvpClient:
+    """One player's view of a match, rebuilt from the host's delta snapshots
+
+    fighters holds Characters kept in sync with the snapshots, so the battle
+    screen can draw them; `side` is this player's index into fighters.
+    act() queues an action (by its index in rules.actions, the battle button
+    order), which is resent every poll until a snapshot shows the host took it.
+    """
+
+    def __init__(self, transport, name="Player", stats=None):
+        self.transport = transport
+        self.hello = bytes([HELLO]) + json.dumps({"name": name, "stats": stats or DEFAULT_STATS}).encode()
+        self.side = None
+        self.fighters = None
+        self.rules = None
+        self.states = {}  # seq -> decoded state, the baselines of future deltas
+        self.seq = 0
+        self.state = None
+        self.log = []
+        self.input_seq = 0
+        self.input = None
+        self.bytes_received = 0
+
+    def poll(self):
+        """Process received packets and send acks, inputs or the join request"""
+        for packet in self.transport.receive():
+            self.bytes_received += len(packet)
+            if not packet:
+                continue  # Stray datagram
+            if packet[0] == WELCOME and self.fighters is None:
+                try:
+                    welcome = json.loads(packet[1:])
+                except ValueError:
+                    continue
+                self.side = welcome["side"]
+                self.fighters = [Character.from_dict(data) for data in welcome["fighters"]]
+                self.rules = rules_for(self.fighters[self.side])
+            elif packet[0] == SNAPSHOT and self.fighters is not None:
+                self._apply(packet)
+        if self.fighters is None:
+            self.transport.send(self.hello)
+        elif self.input is not None and self.input[0] > self.acked_input:
+            self.transport.send(INPUT_PACKET.pack(INPUT, self.seq, *self.input))
+        elif self.seq:
+            self.transport.send(ACK_PACKET.pack(ACK, self.seq))
+
+    def _apply(self, packet):
+        try:
+            decoded = decode_snapshot(packet, self.states)
+        except (struct.error, UnicodeDecodeError):
+            return  # Truncated or corrupt; a later snapshot carries the same state
+        if decoded is None:
+            return
+        seq, _, state, first, messages = decoded
+        self.states[seq] = state
+        for old in [old for old in self.states if old <= seq - HISTORY]:
+            del self.states[old]
+        if seq <= self.seq:
+            return  # Late duplicate of an older snapshot
+        self.seq = seq
+        self.state = state
+        for index, message in enumerate(messages, first):
+            if index == len(self.log):
+                self.log.append(message)
+        for fighter, fighter_values in zip(self.fighters, state["fighters"]):
+            apply_fighter_state(fighter, fighter_values)
+
+    @property
+    def acked_input(self):
+        return self.state["fighters"][self.side][-1] if self.state is not None else 0
+
+    @property
+    def my_turn(self):
+        """True when the host will take this player's next action"""
+        if self.state is None or self.winner is not None:
+            return False
+        return self.state["match"][0] == self.side and self.acked_input >= self.input_seq
+
+    @property
+    def winner(self):
+        if self.state is None or self.state["match"][1] < 0:
+            return None
+        return self.state["match"][1]
+
+    def act(self, action):
+        """Queue an action (index into rules.actions, or an (action, argument) pair)"""
+        if not isinstance(action, int):
+            action = self.rules.actions.index(tuple(action))
+        self.input_seq += 1
+        self.input = (self.input_seq, action)
+
+
+def full_state_size(host):
+    """Bytes a pickle of both characters would take, for comparison with the snapshots"""
+    return len(pickle.dumps([fighter.to_dict() for fighter in host.fighters]))
+
+
+def bot_action(client):
+    """The simulator's greedy policy for client's fighter, or its first available action"""
+    from sim.battle import greedy_policy
+    me, opponent = client.fighters[client.side], client.fighters[1 - client.side]
+    mask = client.rules.mask(me.stamina, me.position[0], me.is_jumping, opponent.position[0])
+    action = greedy_policy(me, opponent)
+    if mask & client.rules.bit(action):
+        return action
+    return next((action for index, action in enumerate(client.rules.actions) if mask >> index & 1), action)
+
+
+def play_bots(host, clients, max_ticks=100000, sleep=None):
+    """Run a match where every client is played by bot_action
+
+    Ends once the host has finished the match (see PvpHost.finished) and
+    the given clients have seen the result; returns the winning side.
+    """
+    for _ in range(max_ticks):
+        host.tick()
+        for client in clients:
+            client.poll()
+            if client.my_turn:
+                client.act(bot_action(client))
+        if host.finished() and all(client.winner is not None for client in clients):
+            return host.winner
+        if sleep:
+            time.sleep(sleep)
+    return None
+
+
+def report(host, clients, transports):
+    fighters = host.fighters
+    print(f"{fighters[host.winner].name} wins after {host.ticks} ticks ({host.seq} snapshots)")
+    for side, (client, transport) in enumerate(zip(clients, transports)):
+        if client is not None:
+            print(f"  {fighters[side].name}: {client.bytes_received} bytes received, "
+                  f"{len(client.log)} messages, sees winner {client.winner}")
+        print(f"  host -> side {side}: {transport.bytes_sent} bytes in {transport.packets_sent} packets "
+              f"({transport.bytes_sent / max(1, transport.packets_sent):.1f} bytes/packet)")
+    print(f"  full state pickled every tick would be ~{full_state_size(host) * host.ticks} bytes per side")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-player PvP matches with delta-compressed snapshots")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    loopback = subparsers.add_parser("loopback", help="host and two bot players in one process")
+    loopback.add_argument("--latency", type=int, default=3, help="ticks of one-way latency")
+    loopback.add_argument("--loss", type=float, default=0.05, help="packet loss probability")
+    loopback.add_argument("-s", "--seed", type=int, default=0)
+    host_parser = subparsers.add_parser("host", help="host a match against a bot on the local network")
+    host_parser.add_argument("-p", "--port", type=int, default=8766)
+    host_parser.add_argument("--name", default="Host")
+    join = subparsers.add_parser("join", help="join a hosted match with a bot player")
+    join.add_argument("address", help="HOST:PORT")
+    join.add_argument("--name", default="Guest")
+    args = parser.parse_args()
+
+    if args.mode == "loopback":
+        links = [loopback_pair(args.latency, args.loss, f"{args.seed}/{side}") for side in (0, 1)]
+        host = PvpHost([links[0][0], links[1][0]], seed=args.seed)
+        clients = [PvpClient(links[0][1], "Red"), PvpClient(links[1][1], "Blue")]
+        if play_bots(host, clients) is None:
+            raise SystemExit("match did not finish")
+        report(host, clients, [links[0][0], links[1][0]])
+    elif args.mode == "host":
+        # The host's own player joins over a loopback link; the guest over UDP
+        local, local_end = loopback_pair()
+        remote = UdpTransport(("0.0.0.0", args.port))
+        host = PvpHost([local, remote])
+        clients = [PvpClient(local_end, args.name)]
+        print(f"Waiting for a player on UDP port {args.port}")
+        play_bots(host, clients, max_ticks=10 ** 9, sleep=1 / TICK_RATE)
+        report(host, clients + [None], [local, remote])
+        remote.close()
+    else:
+        address, _, port = args.address.rpartition(":")
+        transport = UdpTransport(peer=(address, int(port)))
+        client = PvpClient(transport, args.name)
+        while client.winner is None:
+            client.poll()
+            if client.my_turn:
+                client.act(bot_action(client))
+            time.sleep(1 / TICK_RATE)
+        print(f"{client.fighters[client.winner].name} wins; {client.bytes_received} bytes received")
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
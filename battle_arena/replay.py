@@ -0,0 +1,155 @@
+import argparse
+import gzip
+import json
+import sys
+
+from entities import Character
+from planner import WAITING
+
+REPLAY_VERSION = 1
+
+
+class Replay:
+    """Everything needed to re-run one battle: its seed, the player's starting
+    snapshot and the player's actions keyed by simulation tick
+
+    Decisions of a searching enemy AI depend on its time budget and on when
+    its background search finished, so they are recorded too (enemy_actions)
+    and played back at the same ticks instead of searched again. teams is
+    the battle's (allies, enemies), see GameState.teams.
+    """
+
+    def __init__(self, seed, player, actions=None, outcome=None, enemy_actions=None, teams=(0, 1)):
+        self.seed = seed
+        self.player = player
+        self.actions = actions if actions is not None else []
+        self.outcome = outcome
+        self.enemy_actions = enemy_actions if enemy_actions is not None else []
+        self.teams = tuple(teams)
+
+    def record(self, tick, action):
+        self.actions.append((tick, action[0], action[1]))
+
+    def record_enemy(self, tick, action):
+        """Record an enemy AI decision; None stands for a fallback to the heuristic"""
+        self.enemy_actions.append((tick,) + (action if action is not None else (None, None)))
+
+    def to_dict(self):
+        return {"version": REPLAY_VERSION, "seed": self.seed, "player": self.player,
+                "actions": self.actions, "enemy_actions": self.enemy_actions, "outcome": self.outcome,
+                "teams": list(self.teams)}
+
+    def save(self, path):
+        with gzip.open(path, "wt", encoding="utf-8") as output:
+            json.dump(self.to_dict(), output, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as source:
+            data = json.load(source)
+        if data.get("version") != REPLAY_VERSION:
+            raise ValueError(f"Unsupported replay version {data.get('version')} in {path}")
+        return cls(data["seed"], data["player"], [tuple(action) for action in data["actions"]], data["outcome"],
+                   [tuple(action) for action in data.get("enemy_actions", [])], data.get("teams", (0, 1)))
+
+
+class ScriptedPlanner:
+    """Stands in for the enemy AI and its EnemyPlanner during a replay
+
+    Hands out the recorded enemy decisions at the ticks they were applied.
+    """
+
+    pending = True
+
+    def __init__(self, actions, game_state):
+        self.actions = actions
+        self.next_action = 0
+        self.game_state = game_state
+
+    def request(self, enemy, player):
+        pass
+
+    def cancel(self):
+        pass
+
+    def poll(self):
+        tick, kind, arg = self.actions[self.next_action]
+        if self.game_state.battle_ticks < tick:
+            return WAITING
+        self.next_action += 1
+        return (kind, arg) if kind is not None else None
+
+
+def replay_battle(replay, on_tick=None, max_ticks=1000000):
+    """Re-run a recorded battle headlessly as fast as possible; returns the outcome dict
+
+    on_tick(game_state) is called after every simulation tick, e.g. to render.
+    """
+    # Imported here because GameState itself records Replays
+    from game_state import GameState
+
+    game_state = GameState(teams=replay.teams)
+    game_state.player = Character.from_dict(replay.player)
+    game_state.start_battle(replay.seed)
+    if replay.enemy_actions:
+        game_state.enemy.ai = game_state.enemy_planner = ScriptedPlanner(replay.enemy_actions, game_state)
+    game_state.begin_battle(record=False)
+    actions = replay.actions
+    next_action = 0
+    while game_state.current_state == GameState.STATE_BATTLE and game_state.battle_ticks < max_ticks:
+        while next_action < len(actions) and actions[next_action][0] <= game_state.battle_ticks:
+            _, kind, arg = actions[next_action]
+            game_state.player_act((kind, arg))
+            next_action += 1
+        if game_state.current_state != GameState.STATE_BATTLE:
+            break
+        game_state.tick()
+        if on_tick is not None:
+            on_tick(game_state)
+    return game_state.battle_outcome()
+
+
+def render_replay(replay, fps=60):
+    """Play a replay back on screen at normal speed"""
+    import pygame
+    from constants import WIDTH, HEIGHT
+    from ui import draw_battle_arena, init_fonts
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Battle Arena - Replay")
+    clock = pygame.time.Clock()
+    fonts = init_fonts()
+
+    def on_tick(game_state):
+        pygame.event.pump()
+        draw_battle_arena(screen, game_state.player, game_state.enemy, game_state.battle_log,
+                          game_state.battle_turn, fonts, others=game_state.other_combatants())
+        pygame.display.flip()
+        clock.tick(fps)
+
+    outcome = replay_battle(replay, on_tick)
+    pygame.quit()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded battles")
+    parser.add_argument("replays", nargs="+", help="replay files")
+    parser.add_argument("--render", action="store_true", help="show the battle instead of running headless")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for path in args.replays:
+        replay = Replay.load(path)
+        outcome = render_replay(replay) if args.render else replay_battle(replay)
+        matches = replay.outcome is None or outcome == replay.outcome
+        mismatches += not matches
+        print(f"{path}: {outcome['winner']} wins after {outcome['ticks']} ticks"
+              f"{'' if matches else ' (MISMATCH, recorded: ' + json.dumps(replay.outcome) + ')'}")
+    print(f"{len(args.replays) - mismatches}/{len(args.replays)} replays reproduced")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
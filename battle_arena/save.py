@@ -0,0 +1,177 @@
+import os
+import queue
+import struct
+import threading
+import zlib
+
+from battle_log import STATE_DIR
+
+SAVE_FILE = os.path.join(STATE_DIR, "save.bin")
+SAVE_MAGIC = b"BASV"
+SAVE_VERSION = 1
+
+# magic, format version, payload length, CRC-32 of the payload
+HEADER = struct.Struct("<4sHII")
+INT = struct.Struct("<q")
+FLOAT = struct.Struct("<d")
+LENGTH = struct.Struct("<H")
+
+
+def _encode(value, out):
+    """Append value to out in a small tagged binary format (None/bool/int/float/str/list/tuple/dict)"""
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        out += b"i" + INT.pack(value)
+    elif isinstance(value, float):
+        out += b"f" + FLOAT.pack(value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out += b"s" + LENGTH.pack(len(data)) + data
+    elif isinstance(value, (list, tuple)):
+        out += (b"l" if isinstance(value, list) else b"t") + LENGTH.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"d" + LENGTH.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Cannot save value of type {type(value).__name__}")
+
+
+def _decode(data, offset):
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return INT.unpack_from(data, offset)[0], offset + INT.size
+    if tag == b"f":
+        return FLOAT.unpack_from(data, offset)[0], offset + FLOAT.size
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if tag == b"s":
+        return data[offset:offset + length].decode("utf-8"), offset + length
+    if tag in (b"l", b"t"):
+        items = []
+        for _ in range(length):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return (items if tag == b"l" else tuple(items)), offset
+    if tag == b"d":
+        items = {}
+        for _ in range(length):
+            key, offset = _decode(data, offset)
+            items[key], offset = _decode(data, offset)
+        return items, offset
+    raise ValueError(f"Corrupt save: unknown tag {tag!r}")
+
+
+def encode_save(data):
+    payload = bytearray()
+    _encode(data, payload)
+    return HEADER.pack(SAVE_MAGIC, SAVE_VERSION, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_save(data):
+    if len(data) < HEADER.size:
+        raise ValueError("Corrupt save: truncated header")
+    magic, version, length, checksum = HEADER.unpack_from(data)
+    if magic != SAVE_MAGIC:
+        raise ValueError("Not a Battle Arena save file")
+    if version != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {version}")
+    payload = memoryview(data)[HEADER.size:HEADER.size + length]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise ValueError("Corrupt save: checksum mismatch")
+    return _decode(payload.tobytes(), 0)[0]
+
+
+def load_save(path=SAVE_FILE):
+    """Saved game data, or None if there is no save"""
+    try:
+        with open(path, "rb") as save_file:
+            data = save_file.read()
+    except FileNotFoundError:
+        return None
+    return decode_save(data)
+
+
+class Autosaver:
+    """Writes saves on a background thread so the frame loop never waits on disk
+
+    save() encodes the snapshot right away (it is small) and queues the bytes.
+    The writer only keeps the newest queued snapshot, writes it to a temporary
+    file and renames it over the save, so a crash never leaves a partial save.
+    """
+
+    def __init__(self, path=SAVE_FILE):
+        self.path = path
+        self.exists = os.path.exists(path)
+        self.pending = None  # Newest snapshot, possibly not on disk yet
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, data):
+        self.pending = encode_save(data)
+        self.exists = True
+        self.queue.put(self.pending)
+
+    def discard(self):
+        """Delete the save, e.g. when the character has died"""
+        if self.exists:
+            self.pending = None
+            self.exists = False
+            self.queue.put(b"")
+
+    def load(self):
+        """Newest saved game, including one still waiting to be written, or None"""
+        if self.pending is not None:
+            return decode_save(self.pending)
+        return load_save(self.path) if self.exists else None
+
+    def _run(self):
+        running = True
+        while running:
+            job = self.queue.get()
+            # Snapshots queued while the last one was written supersede each other
+            while job is not None and not self.queue.empty():
+                newer = self.queue.get_nowait()
+                if newer is None:
+                    running = False
+                    break
+                job = newer
+            if job is None:
+                break
+            try:
+                self._write(job)
+            except OSError:
+                pass  # The next state change retries
+
+    def _write(self, data):
+        if not data:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "wb") as save_file:
+            save_file.write(data)
+            save_file.flush()
+            os.fsync(save_file.fileno())
+        os.replace(temp_file, self.path)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
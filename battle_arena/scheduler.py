@@ -0,0 +1,75 @@
+import pygame
+
+
+class FixedTimestep:
+    """Accumulates real time and hands it out as fixed simulation ticks
+
+    Game timing (attack/jump frames, battle_action_delay) is counted in ticks
+    of 1/tick_rate seconds regardless of the render frame rate. After a slow
+    frame several ticks are run to catch up, at most max_ticks per frame so a
+    long stall cannot snowball. alpha is how far the current time is into the
+    next tick and is used to interpolate positions when rendering.
+    """
+
+    def __init__(self, tick_rate=60, max_ticks=5):
+        self.tick_ms = 1000 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+
+    def advance(self, elapsed_ms):
+        self.accumulator += elapsed_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.tick_ms
+        return ticks
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.tick_ms
+
+
+class FrameScheduler:
+    """Runs the main loop at full frame rate only while something is changing
+
+    While active, frames are paced with Clock.tick like before. When idle the
+    loop blocks in pygame.event.wait until input arrives or idle_timeout
+    milliseconds pass, so static screens use almost no CPU. Simulation time is
+    handed out separately in fixed ticks, see FixedTimestep.
+    """
+
+    def __init__(self, fps=60, idle_timeout=1000, tick_rate=60):
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.clock = pygame.time.Clock()
+        self.timestep = FixedTimestep(tick_rate)
+        self.elapsed = 0
+        self.idle = False
+
+    def next_events(self, active):
+        if active:
+            self.elapsed = self.clock.tick(self.fps)
+            self.idle = False
+            return pygame.event.get()
+        self.idle = True
+        event = pygame.event.wait(self.idle_timeout)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        # Restart frame timing so the wait is not counted as one long frame
+        self.clock.tick()
+        self.elapsed = 0
+        self.timestep.reset()
+        return events
+
+    def ticks(self):
+        """Number of simulation ticks to run for the time since the last frame"""
+        return self.timestep.advance(self.elapsed)
+
+    @property
+    def alpha(self):
+        return self.timestep.alpha
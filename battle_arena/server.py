@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from entities import Character
+from game_state import GameState
+from sim.builds import STATS, is_valid_build
+
+# Longest request line accepted; longer ones close the connection
+MAX_LINE = 64 * 1024
+# A battle that has not handed the turn back after this many ticks is stuck
+MAX_RESOLVE_TICKS = 100000
+
+
+class SessionError(Exception):
+    """A request that cannot be served; sent back to the client as an error"""
+
+
+def describe_fighter(character):
+    if character is None:
+        return None
+    return {"name": character.name, "level": character.level, "health": character.health,
+            "max_health": character.max_health, "stamina": character.stamina,
+            "max_stamina": character.max_stamina, "x": character.position[0]}
+
+
+class Session:
+    """One arena run: a GameState driven by requests instead of clicks
+
+    Battles are resolved headlessly: after the player's action the battle is
+    ticked, through animations, turn delays and the enemy's reply, until it
+    is the player's turn again or the battle is over. Only one request of a
+    session is processed at a time.
+    """
+
+    def __init__(self, session_id, enemy_ai=None):
+        self.id = session_id
+        self.game_state = GameState(enemy_ai=enemy_ai)
+        self.lock = asyncio.Lock()
+        self.last_active = 0.0
+        self.log_seen = 0  # battle_log.total at the last response
+
+    def create(self, name, stats):
+        game_state = self.game_state
+        if not isinstance(name, str) or not 0 < len(name) <= 15:
+            raise SessionError("name must be 1-15 characters")
+        if not is_valid_build(stats, game_state.stat_points):
+            raise SessionError(f"stats must spend exactly {game_state.stat_points} points on {', '.join(STATS)}")
+        game_state.player = Character(name, stats)
+        game_state.battles_won = 0
+        game_state.change_state(GameState.STATE_ARENA_MENU)
+
+    def start_battle(self, seed=None):
+        self._require(GameState.STATE_ARENA_MENU)
+        if seed is not None and not isinstance(seed, int):
+            raise SessionError("seed must be an integer")
+        self.game_state.start_battle(seed)
+        self.game_state.begin_battle(record=False)
+
+    def act(self, action):
+        """Perform the player's action and resolve the battle up to the player's next turn"""
+        game_state = self.game_state
+        self._require(GameState.STATE_BATTLE)
+        rules = game_state.player_rules
+        if type(action) is int and 0 <= action < len(rules.actions):
+            action = rules.actions[action]
+        elif (isinstance(action, list) and len(action) == 2 and isinstance(action[0], str) and
+              (action[1] is None or isinstance(action[1], str))):
+            action = tuple(action)
+        if not isinstance(action, tuple) or action not in rules.bits:
+            raise SessionError(f"unknown action {action!r}")
+        if not game_state.action_mask & rules.bit(action):
+            raise SessionError(f"{action[0]} is not available")
+        game_state.player_act(action)
+        for _ in range(MAX_RESOLVE_TICKS):
+            if not game_state.is_animating():
+                return
+            game_state.tick()
+        raise SessionError("battle did not return the turn to the player")
+
+    def rest(self):
+        self._require(GameState.STATE_ARENA_MENU)
+        self.game_state.rest()
+
+    def _require(self, state):
+        if self.game_state.player is None:
+            raise SessionError("no character; send 'create' first")
+        if self.game_state.current_state != state:
+            raise SessionError(f"not allowed in state {GameState.STATE_NAMES[self.game_state.current_state]}")
+
+    def snapshot(self):
+        """Client view of the session, with the battle log messages added since the last one"""
+        game_state = self.game_state
+        log = game_state.battle_log
+        new = min(log.total - self.log_seen, len(log.entries))
+        self.log_seen = log.total
+        view = {
+            "session": self.id,
+            "state": GameState.STATE_NAMES[game_state.current_state],
+            "battles_won": game_state.battles_won,
+            "player": describe_fighter(game_state.player),
+            "log": list(log.entries)[len(log.entries) - new:],
+        }
+        if game_state.current_state == GameState.STATE_BATTLE:
+            rules = game_state.player_rules
+            view["enemy"] = describe_fighter(game_state.enemy)
+            view["actions"] = [list(action) for index, action in enumerate(rules.actions)
+                               if game_state.action_mask >> index & 1]
+        return view
+
+
+class BattleServer:
+    """Hosts many headless arena sessions behind one asyncio event loop
+
+    The protocol is one JSON object per line in each direction. Requests are
+    {"op": ..., "id": ..., "session": ...} plus arguments; every response
+    echoes "id" and carries "ok" and either the session view or "error".
+    A connection may drive any number of sessions, and sessions outlive
+    connections until they have been idle for `idle_timeout` seconds.
+
+    Combat runs on a single resolver thread so the loop keeps serving I/O
+    while battles are resolved; GameState is not shared between threads.
+    Backpressure is applied at three points: each connection has at most
+    `max_inflight` requests in progress and stops reading beyond that, at
+    most `max_pending` requests wait for the resolver in total, and
+    responses wait for the client to drain its socket buffer. Clients that
+    do not read their responses therefore stop being read from, and TCP
+    flow control slows them down.
+    """
+
+    def __init__(self, max_sessions=10000, idle_timeout=300.0, max_inflight=32, max_pending=1024,
+                 enemy_ai=None):
+        self.sessions = {}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_inflight = max_inflight
+        self.pending = asyncio.Semaphore(max_pending)
+        self.enemy_ai = enemy_ai
+        self.resolver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="battle-resolver")
+        self.evicted = 0
+        self.requests = 0
+        self.servers = []
+        self.clients = set()  # Connection handler tasks
+        self.reaper = None
+
+    async def start(self, host=None, port=None, path=None):
+        if path is not None:
+            self.servers.append(await asyncio.start_unix_server(self.handle_client, path, limit=MAX_LINE))
+        if port is not None:
+            self.servers.append(await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE))
+        self.reaper = asyncio.create_task(self._evict_idle())
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self.servers))
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        if self.reaper is not None:
+            self.reaper.cancel()
+        for client in list(self.clients):
+            client.cancel()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        self.resolver.shutdown(wait=True)
+
+    async def handle_client(self, reader, writer):
+        inflight = asyncio.Semaphore(self.max_inflight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self.clients.add(asyncio.current_task())
+        try:
+            while True:
+                # Stop reading while this connection has too many requests in progress
+                await inflight.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Line over MAX_LINE, or the client went away
+                if not line:
+                    break
+                task = asyncio.create_task(self._serve(line, writer, write_lock, inflight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except asyncio.CancelledError:
+            # The server is closing
+            for task in tasks:
+                task.cancel()
+        finally:
+            self.clients.discard(asyncio.current_task())
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _serve(self, line, writer, write_lock, inflight):
+        try:
+            response = await self.handle_request(line)
+            async with write_lock:
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            inflight.release()
+
+    async def handle_request(self, line):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise SessionError("request is not valid JSON")
+            if not isinstance(request, dict):
+                raise SessionError("request must be a JSON object")
+            request_id = request.get("id")
+            self.requests += 1
+            return {"id": request_id, "ok": True, **await self.dispatch(request)}
+        except SessionError as error:
+            return {"id": request_id, "ok": False, "error": str(error)}
+        except Exception:
+            traceback.print_exc()
+            return {"id": request_id, "ok": False, "error": "internal error"}
+
+    async def dispatch(self, request):
+        op = request.get("op")
+        if op == "stats":
+            return {"sessions": len(self.sessions), "evicted": self.evicted, "requests": self.requests}
+        if op == "create":
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionError("server is full")
+            session = Session(secrets.token_hex(8), self.enemy_ai)
+            self.sessions[session.id] = session
+            try:
+                return await self._run(session, session.create, request.get("name", "Hero"), request.get("stats"))
+            except SessionError:
+                del self.sessions[session.id]
+                raise
+
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise SessionError("unknown or expired session")
+        if op == "state":
+            return await self._run(session, None)
+        if op == "battle":
+            return await self._run(session, session.start_battle, request.get("seed"))
+        if op == "act":
+            return await self._run(session, session.act, request.get("action"))
+        if op == "rest":
+            return await self._run(session, session.rest)
+        if op == "close":
+            self.sessions.pop(session.id, None)
+            return {"session": session.id, "state": "CLOSED"}
+        raise SessionError(f"unknown op {op!r}")
+
+    async def _run(self, session, method, *args):
+        """Apply method to the session on the resolver thread and return the session view"""
+        loop = asyncio.get_running_loop()
+        async with session.lock:
+            session.last_active = loop.time()
+            if method is not None:
+                async with self.pending:
+                    await loop.run_in_executor(self.resolver, method, *args)
+            session.last_active = loop.time()
+            return session.snapshot()
+
+    async def _evict_idle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(0.05, self.idle_timeout / 4))
+            cutoff = loop.time() - self.idle_timeout
+            for session_id in [session.id for session in self.sessions.values()
+                               if session.last_active < cutoff and not session.lock.locked()]:
+                del self.sessions[session_id]
+                self.evicted += 1
+
+
+async def run_server(args):
+    server = BattleServer(args.max_sessions, args.idle_timeout, enemy_ai=args.enemy_ai)
+    await server.start(args.host, args.port, args.unix)
+    where = [f"{args.host or '*'}:{args.port}" if args.port is not None else None, args.unix]
+    print(f"Battle server listening on {', '.join(filter(None, where))}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-session battle server (JSON lines)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=None, help="TCP port")
+    parser.add_argument("-u", "--unix", default=None, help="Unix socket path")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before idle sessions are evicted")
+    parser.add_argument("--enemy-ai", choices=("expectimax",), default=None)
+    args = parser.parse_args()
+    if args.port is None and args.unix is None:
+        args.port = 8765
+    if args.unix is not None and os.path.exists(args.unix):
+        os.remove(args.unix)
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
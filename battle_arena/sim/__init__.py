@@ -0,0 +1,2 @@
+from .battle import play_battle, perform_action, greedy_policy, make_player
+from .builds import BuildOptimizer, recommended_builds, all_builds, is_valid_build, STATS
@@ -0,0 +1,259 @@
+import numpy as np
+
+from constants import WIDTH
+from entities import Enemy
+from entities.actions import MELEE_RANGE
+from sim.battle import make_player, MAX_TURNS
+
+MIN_X = 50
+MAX_X = WIDTH - 50
+ATTACK_RANGE = MELEE_RANGE
+
+
+def skill_table(character):
+    """{skill name: (damage modifier, accuracy, stamina cost)} of a Character"""
+    return {name: (skill["damage"], skill["accuracy"], skill["stamina_cost"])
+            for name, skill in character.skills.items()}
+
+
+class FighterArrays:
+    """Struct-of-arrays view of one side of many concurrent battles
+
+    Skills are the same for every fighter on a side, so they are kept once,
+    in `skills` (see skill_table), rather than as arrays.
+    """
+
+    FIELDS = ("health", "max_health", "stamina", "max_stamina", "position", "strength",
+              "agility", "armor", "stamina_stat", "weapon", "armor_value", "move_speed",
+              "jump_distance", "move_cost", "jump_cost")
+
+    def __init__(self, skills, **arrays):
+        self.skills = skills
+        for name in self.FIELDS:
+            setattr(self, name, np.asarray(arrays[name], dtype=np.float64 if name == "position" else np.int64))
+
+    @classmethod
+    def from_character(cls, character, count):
+        """Broadcast a single Character (or Enemy) across count battles"""
+        return cls(
+            skill_table(character),
+            health=np.full(count, character.health),
+            max_health=np.full(count, character.max_health),
+            stamina=np.full(count, character.stamina),
+            max_stamina=np.full(count, character.max_stamina),
+            position=np.full(count, character.base_position[0]),
+            strength=np.full(count, character.strength),
+            agility=np.full(count, character.agility),
+            armor=np.full(count, character.armor),
+            stamina_stat=np.full(count, character.stamina_stat),
+            weapon=np.full(count, character.weapons[character.equipped_weapon]),
+            armor_value=np.full(count, character.armor_items[character.equipped_armor]),
+            move_speed=np.full(count, character.move_speed),
+            jump_distance=np.full(count, character.jump_distance),
+            move_cost=np.full(count, character.move_stamina_cost),
+            jump_cost=np.full(count, character.jump_stamina_cost),
+        )
+
+    @classmethod
+    def enemies(cls, levels):
+        """Enemies for an array of levels, built from one real Enemy per distinct level"""
+        unique_levels, index = np.unique(np.asarray(levels, dtype=np.int64), return_inverse=True)
+        templates = [cls.from_character(Enemy("", int(level)), 1) for level in unique_levels]
+        return cls(templates[0].skills, **{name: np.concatenate([getattr(template, name) for template in templates])[index]
+                      for name in cls.FIELDS})
+
+
+def _add_histogram(histogram, values):
+    if len(values) == 0:
+        return histogram
+    counts = np.bincount(values, minlength=len(histogram))
+    if len(counts) > len(histogram):
+        counts[:len(histogram)] += histogram
+        return counts
+    histogram += counts
+    return histogram
+
+
+class BattleBatch:
+    """Thousands of player-vs-enemy battles resolved one turn at a time with NumPy
+
+    The formulas mirror Character.attack, rest, jump and move_left/right, and
+    skill modifiers, accuracies and stamina costs are read from the
+    characters, so both engines follow changes to entities/. Jumps are
+    applied as their net displacement, which is what the frame-by-frame
+    animation in update_animation adds up to once it has finished.
+    """
+
+    def __init__(self, player, enemy, rng):
+        self.player = player
+        self.enemy = enemy
+        self.rng = rng
+        self.count = len(player.health)
+        self.done = np.zeros(self.count, dtype=bool)
+        self.won = np.zeros(self.count, dtype=bool)
+        self.turns = np.zeros(self.count, dtype=np.int64)
+        self.player_damage = np.zeros(64, dtype=np.int64)
+        self.enemy_damage = np.zeros(64, dtype=np.int64)
+
+    def attack(self, attacker, defender, mask, damage_mod, accuracy, stamina_cost):
+        """Resolve a non-leap attack for every battle in mask; returns damage dealt"""
+        attacker.stamina[mask] -= stamina_cost[mask]
+        return self._resolve_hit(attacker, defender, mask, damage_mod, accuracy)
+
+    def skill(self, fighter, mask, if_true, if_false):
+        """(damage modifier, accuracy, stamina cost) arrays: skill if_true where mask is set, else if_false"""
+        first, second = fighter.skills[if_true], fighter.skills[if_false]
+        return tuple(np.where(mask, a, b) for a, b in zip(first, second))
+
+    def leap(self, attacker, defender, mask):
+        damage_mod, accuracy, stamina_cost = attacker.skills["Leap Attack"]
+        attacker.stamina[mask] -= stamina_cost
+        leap_distance = attacker.move_speed * 2.5
+        toward_right = attacker.position < defender.position
+        right = np.minimum(np.minimum(attacker.position + leap_distance, defender.position - ATTACK_RANGE), MAX_X)
+        left = np.maximum(MIN_X, np.maximum(attacker.position - leap_distance, defender.position + ATTACK_RANGE))
+        attacker.position = np.where(mask, np.where(toward_right, right, left), attacker.position)
+        in_range = np.abs(attacker.position - defender.position) <= ATTACK_RANGE
+        return self._resolve_hit(attacker, defender, mask & in_range, damage_mod, accuracy)
+
+    def _resolve_hit(self, attacker, defender, mask, damage_mod, accuracy):
+        hit_chance = accuracy * (attacker.agility / (attacker.agility + defender.agility))
+        hit = mask & (self.rng.random(self.count) <= hit_chance)
+        damage = ((attacker.strength + attacker.weapon) * damage_mod).astype(np.int64)
+        reduced = np.maximum(1, damage - defender.armor_value - defender.armor // 2)
+        dealt = np.where(hit, reduced, 0)
+        defender.health = np.maximum(0, defender.health - dealt)
+        return dealt, hit
+
+    def move(self, mover, other, mask, direction):
+        """move_left (direction -1) or move_right (direction +1) with range stops"""
+        if direction < 0:
+            ok = mask & (mover.stamina >= mover.move_cost) & (mover.position > MIN_X)
+            stop = np.where(mover.position > other.position, other.position + ATTACK_RANGE, MIN_X)
+            new_position = np.maximum(mover.position - mover.move_speed, stop)
+        else:
+            ok = mask & (mover.stamina >= mover.move_cost) & (mover.position < MAX_X)
+            stop = np.where(mover.position < other.position, other.position - ATTACK_RANGE, MAX_X)
+            new_position = np.minimum(mover.position + mover.move_speed, stop)
+        mover.stamina[ok] -= mover.move_cost[ok]
+        mover.position = np.where(ok, new_position, mover.position)
+        return ok
+
+    def rest(self, fighter, mask):
+        recovery = np.maximum(5, fighter.max_stamina // 10) + fighter.stamina_stat
+        fighter.stamina = np.where(mask, np.minimum(fighter.max_stamina, fighter.stamina + recovery), fighter.stamina)
+
+    def jump(self, fighter, mask, direction):
+        """Net effect of a completed jump; direction is +1 (forward) or -1 (backward) per battle"""
+        ok = mask & (fighter.stamina >= fighter.jump_cost)
+        fighter.stamina[ok] -= fighter.jump_cost[ok]
+        landed = np.clip(fighter.position + direction * fighter.jump_distance, MIN_X, MAX_X)
+        fighter.position = np.where(ok, landed, fighter.position)
+        return ok
+
+    def player_turn(self, active):
+        """Vectorized sim.battle.greedy_policy"""
+        p, e = self.player, self.enemy
+        cost = {name: skill[2] for name, skill in p.skills.items()}
+        distance = np.abs(p.position - e.position)
+        near = distance <= ATTACK_RANGE
+        heavy = active & near & (p.stamina >= cost["Heavy Strike"])
+        quick = active & near & ~heavy & (p.stamina >= cost["Quick Strike"])
+        leap = active & ~near & (p.stamina >= cost["Leap Attack"]) & (p.position < e.position)
+        can_move = active & ~near & ~leap & (p.stamina >= p.move_cost)
+        right = can_move & (p.position < e.position) & (p.position < MAX_X)
+        left = can_move & ~right & (p.position > e.position) & (p.position > MIN_X)
+        rest = active & ~(heavy | quick | leap | right | left)
+
+        dealt, hit = self.attack(p, e, heavy | quick, *self.skill(p, heavy, "Heavy Strike", "Quick Strike"))
+        self.player_damage = _add_histogram(self.player_damage, dealt[hit])
+        dealt, hit = self.leap(p, e, leap)
+        self.player_damage = _add_histogram(self.player_damage, dealt[hit])
+        self.move(p, e, right, 1)
+        self.move(p, e, left, -1)
+        self.rest(p, rest)
+
+    def enemy_turn(self, active):
+        """Vectorized Enemy.choose_action"""
+        p, e = self.player, self.enemy
+        cost = {name: skill[2] for name, skill in e.skills.items()}
+        distance = np.abs(e.position - p.position)
+        roll, roll2, roll3 = self.rng.random((3, self.count))
+        right_of_player = e.position > p.position
+
+        tired = active & (e.stamina < cost["Strike"])
+        far = active & ~tired & (distance > ATTACK_RANGE)
+        near = active & ~tired & ~far
+
+        far_leap = far & (e.stamina >= cost["Leap Attack"]) & (roll < 0.7)
+        far_jump = far & ~far_leap & (e.stamina >= e.jump_cost) & (roll2 < 0.3)
+        far_move = far & ~far_leap & ~far_jump
+
+        low = near & (e.health < e.max_health * 0.3)
+        low_jump = low & (e.stamina >= e.jump_cost) & (roll2 < 0.4)
+        low_fierce = low & ~low_jump & (e.stamina >= cost["Fierce Attack"])
+        low_strike = low & ~low_jump & ~low_fierce
+
+        healthy = near & ~low
+        rand_jump = healthy & (roll < 0.3) & (e.stamina >= e.jump_cost)
+        strike = healthy & ~rand_jump & (roll < 0.6)
+        fierce = healthy & ~rand_jump & ~strike & (roll < 0.9) & (e.stamina >= cost["Fierce Attack"])
+        strike |= healthy & ~rand_jump & ~fierce
+        strike |= low_strike
+        fierce |= low_fierce
+
+        self.rest(e, tired)
+        dealt, hit = self.leap(e, p, far_leap)
+        self.enemy_damage = _add_histogram(self.enemy_damage, dealt[hit])
+        dealt, hit = self.attack(e, p, strike | fierce, *self.skill(e, fierce, "Fierce Attack", "Strike"))
+        self.enemy_damage = _add_histogram(self.enemy_damage, dealt[hit])
+
+        # Enemy "forward"/"backward" jumps move right/left, exactly as in Enemy.choose_action
+        jump_direction = np.where(far_jump, np.where(right_of_player, 1, -1), 0)
+        jump_direction = np.where(low_jump, np.where(right_of_player, -1, 1), jump_direction)
+        jump_direction = np.where(rand_jump, np.where(roll3 < 0.5, 1, -1), jump_direction)
+        self.jump(e, far_jump | low_jump | rand_jump, jump_direction)
+        self.move(e, p, far_move & right_of_player, -1)
+        self.move(e, p, far_move & ~right_of_player, 1)
+
+    def step(self):
+        """Resolve one full turn (player then enemy) for every unfinished battle"""
+        active = ~self.done
+        self.turns += active
+        self.player_turn(active)
+        won = active & (self.enemy.health <= 0)
+        self.won |= won
+        self.done |= won
+        active &= ~won
+        self.enemy_turn(active)
+        self.done |= active & (self.player.health <= 0)
+
+    def run(self, max_turns=MAX_TURNS):
+        for _ in range(max_turns):
+            if self.done.all():
+                break
+            self.step()
+        return self
+
+
+def run_batch(battles, level=1, stats=None, seed=0):
+    """Vectorized counterpart of simulate.run_chunk; returns the same summary shape"""
+    rng = np.random.default_rng(seed)
+    player = FighterArrays.from_character(make_player(stats=stats, level=level), battles)
+    enemy_levels = np.maximum(1, level - 1 + rng.integers(-1, 3, battles))
+    batch = BattleBatch(player, FighterArrays.enemies(enemy_levels), rng).run()
+
+    rewards = {}
+    for enemy_level in np.unique(enemy_levels[batch.won]):
+        wins = int(np.count_nonzero(batch.won & (enemy_levels == enemy_level)))
+        template = Enemy("", int(enemy_level))
+        rewards[int(enemy_level)] = [wins, wins * template.gold_reward, wins * template.exp_reward]
+    return {
+        "battles": battles,
+        "wins": int(batch.won.sum()),
+        "timeouts": int(np.count_nonzero(~batch.done)),
+        "turns": int(batch.turns.sum()),
+        "player_damage": {value: int(count) for value, count in enumerate(batch.player_damage) if count},
+        "enemy_damage": {value: int(count) for value, count in enumerate(batch.enemy_damage) if count},
+        "rewards": rewards,
+    }
@@ -0,0 +1,66 @@
+from entities import Character, perform_action, rules_for
+
+MAX_TURNS = 300
+
+
+def make_player(name="Hero", stats=None, level=1):
+    """Build a fresh player character at the given level"""
+    player = Character(name, stats)
+    while player.level < level:
+        player.experience = player.exp_to_level
+        player.level_up()
+    return player
+
+
+def greedy_policy(player, enemy):
+    """Simple player policy: close the distance, then hit as hard as stamina allows"""
+    rules = rules_for(player)
+    available = rules.mask(player.stamina, player.position[0], player.is_jumping, enemy.position[0])
+    for action in (("attack", "Heavy Strike"), ("attack", "Quick Strike"), ("attack", "Leap Attack")):
+        if available & rules.bit(action):
+            return action
+    if abs(player.position[0] - enemy.position[0]) > 100:
+        toward = ("move_right", None) if player.position[0] < enemy.position[0] else ("move_left", None)
+        if available & rules.bit(toward):
+            return toward
+    return ("rest", None)
+
+
+def _settle(player, enemy):
+    # Run animations to completion, as the turn delay in main.py does
+    while (player.is_jumping or player.is_attacking or player.is_hit or
+           enemy.is_jumping or enemy.is_attacking or enemy.is_hit):
+        player.update_animation()
+        enemy.update_animation()
+
+
+def play_battle(player, enemy, policy=greedy_policy, max_turns=MAX_TURNS):
+    """Play one battle to completion using the same turn rules as main.py"""
+    player.reset_position()
+    enemy.reset_position()
+    player_hits = []
+    enemy_hits = []
+    turns = 0
+    while turns < max_turns:
+        turns += 1
+        result = perform_action(player, policy(player, enemy), enemy)
+        if result.get("hit"):
+            player_hits.append(result["damage"])
+        _settle(player, enemy)
+        if enemy.health <= 0:
+            return {"won": True, "turns": turns, "player_hits": player_hits, "enemy_hits": enemy_hits}
+        if not result.get("success", False):
+            # main.py keeps the turn with the player; a stuck policy rests instead
+            player.rest()
+
+        # main.py re-asks the enemy each frame until it picks an action that succeeds
+        for _ in range(10):
+            result = enemy.choose_action(player)
+            if result.get("success", False):
+                break
+        if result.get("hit"):
+            enemy_hits.append(result["damage"])
+        _settle(player, enemy)
+        if player.health <= 0:
+            return {"won": False, "turns": turns, "player_hits": player_hits, "enemy_hits": enemy_hits}
+    return {"won": False, "turns": turns, "player_hits": player_hits, "enemy_hits": enemy_hits, "timeout": True}
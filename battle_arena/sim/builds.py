@@ -0,0 +1,252 @@
+import glob
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from entities import generate_enemy
+from entities.outcomes import CACHE_DIR
+from .battle import play_battle, make_player
+
+# Creation screen order (GameState.current_stats)
+STATS = ("strength", "agility", "defense", "stamina", "vitality")
+# Files whose contents decide battle results; any change invalidates cached scores
+RULE_SOURCES = ("constants.py", "entities/*.py", "sim/battle.py")
+DEFAULT_SETTINGS = {
+    "points": 20,        # GameState.stat_points
+    "levels": [1, 3, 5],  # Player levels the win rate is measured at
+    "battles": 16,       # Battles per level
+    "runs": 8,           # Arena runs per build for the survival depth
+    "max_depth": 50,     # Runs stop after this many wins
+    "seed": 0,
+}
+BUILDS_PER_TASK = 25
+# Builds offered on the creation screen, from the latest optimizer run
+RECOMMENDED_NAME = "recommended-builds.json"
+
+
+def all_builds(points, step=1):
+    """Every way to spend exactly `points` on the five stats, in multiples of `step`"""
+    def spread(remaining, slots):
+        if slots == 1:
+            yield (remaining,)
+            return
+        for value in range(0, remaining + 1, step):
+            for rest in spread(remaining - value, slots - 1):
+                yield (value,) + rest
+    if points % step:
+        raise ValueError(f"{points} points cannot be split in steps of {step}")
+    return list(spread(points, len(STATS)))
+
+
+def neighbours(build):
+    """Builds one point away: a point moved from one stat to another"""
+    result = []
+    for source in range(len(build)):
+        if build[source] == 0:
+            continue
+        for target in range(len(build)):
+            if target != source:
+                moved = list(build)
+                moved[source] -= 1
+                moved[target] += 1
+                result.append(tuple(moved))
+    return result
+
+
+def build_stats(build):
+    return dict(zip(STATS, build))
+
+
+def is_valid_build(stats, points=DEFAULT_SETTINGS["points"]):
+    """True if stats is a dict spending exactly `points` on STATS in non-negative whole numbers"""
+    return (isinstance(stats, dict) and not set(stats) - set(STATS) and
+            all(type(value) is int and value >= 0 for value in stats.values()) and
+            sum(stats.values()) == points)
+
+
+def _survival_depth(stats, seed, run, max_depth):
+    """Wins in a row for a fresh character fighting, levelling and resting as in the arena menu"""
+    random.seed(f"{seed}/run/{run}")
+    player = make_player(stats=stats)
+    for depth in range(max_depth):
+        enemy = generate_enemy(player.level)
+        if not play_battle(player, enemy)["won"]:
+            return depth
+        player.gain_experience(enemy.exp_reward)
+        player.health += min(player.max_health - player.health, player.max_health // 2)
+        player.stamina = player.max_stamina
+    return max_depth
+
+
+def score_build(build, settings):
+    """(win rate, mean survival depth, score) of one build
+
+    Every build meets the same enemies and dice rolls (common random numbers:
+    the RNG is seeded by battle, not by build), so differences between builds
+    are not drowned in sampling noise. The score weighs the win rate and the
+    survival depth, as a fraction of max_depth, equally.
+    """
+    stats = build_stats(build)
+    seed = settings["seed"]
+    wins = 0
+    for level in settings["levels"]:
+        for battle in range(settings["battles"]):
+            random.seed(f"{seed}/level/{level}/{battle}")
+            player = make_player(stats=stats, level=level)
+            wins += play_battle(player, generate_enemy(player.level))["won"]
+    win_rate = wins / (len(settings["levels"]) * settings["battles"])
+    depth = sum(_survival_depth(stats, seed, run, settings["max_depth"])
+                for run in range(settings["runs"])) / settings["runs"]
+    return win_rate, depth, 0.5 * win_rate + 0.5 * depth / settings["max_depth"]
+
+
+def score_builds(args):
+    """Score a chunk of builds in a worker process"""
+    builds, settings = args
+    return [(build, score_build(build, settings)) for build in builds]
+
+
+def ruleset_hash(settings=None):
+    """Hash of the game rules and evaluation settings the scores depend on; of the rules alone without settings"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True).encode() if settings is not None else b"")
+    for pattern in RULE_SOURCES:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            if os.path.basename(path).startswith("test_"):
+                continue  # Tests sit next to the code but don't change the rules
+            with open(path, "rb") as source:
+                digest.update(os.path.relpath(path, root).encode() + b"\0" + source.read())
+    return digest.hexdigest()[:16]
+
+
+class BuildOptimizer:
+    """Scores stat allocations by simulated battles, memoized on disk per ruleset
+
+    With 20 points there are 10,626 builds. optimize() scores a coarse grid of
+    them (every stat a multiple of `step`) and then climbs: the neighbours of
+    the best builds are scored until none of them improves the top of the
+    ranking. exhaustive=True scores every build instead. Scores are kept in
+    builds-<ruleset>.json, so later runs reuse them until the rules or
+    settings change. Every optimize() also publishes its best builds to
+    recommended-builds.json in the same cache_dir, which
+    recommended_builds(cache_dir) reads whatever the settings of the run were.
+    """
+
+    def __init__(self, settings=None, cache_dir=CACHE_DIR):
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.ruleset = ruleset_hash(self.settings)
+        self.path = os.path.join(cache_dir, f"builds-{self.ruleset}.json")
+        self.cache_dir = cache_dir
+        self.recommended_path = os.path.join(cache_dir, RECOMMENDED_NAME)
+        self.scores = {}  # build tuple -> (win rate, depth, score)
+
+    def load(self):
+        """Read cached scores; returns False if there are none for this ruleset"""
+        try:
+            with open(self.path) as cache:
+                data = json.load(cache)
+        except (OSError, ValueError):
+            return False
+        self.scores = {tuple(map(int, key.split(","))): tuple(value) for key, value in data["scores"].items()}
+        return True
+
+    def save(self):
+        data = {"ruleset": self.ruleset, "settings": self.settings,
+                "scores": {",".join(map(str, build)): list(score) for build, score in self.scores.items()}}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_file = self.path + ".tmp"
+            with open(temp_file, "w") as cache:
+                json.dump(data, cache)
+            os.replace(temp_file, self.path)
+        except OSError:
+            pass  # Scores are recomputed next time
+
+    def evaluate(self, builds, workers=None):
+        """Score the builds that are not memoized yet, across a process pool"""
+        missing = sorted(set(builds) - set(self.scores))
+        chunks = [(missing[start:start + BUILDS_PER_TASK], self.settings)
+                  for start in range(0, len(missing), BUILDS_PER_TASK)]
+        if workers == 1:
+            for chunk in chunks:
+                self.scores.update(score_builds(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for part in executor.map(score_builds, chunks):
+                    self.scores.update(part)
+        if missing:
+            self.save()
+        return len(missing)
+
+    def optimize(self, workers=None, step=4, refine=8, exhaustive=False, progress=None):
+        """Score the search space and return the number of builds scored in this call"""
+        self.load()
+        scored = self.evaluate(all_builds(self.settings["points"], 1 if exhaustive else step), workers)
+        if progress:
+            progress(len(self.scores), scored)
+        while True:
+            candidates = {neighbour for build, _ in self.ranking(refine) for neighbour in neighbours(build)}
+            new = self.evaluate(candidates, workers)
+            if not new:
+                self.publish()
+                return scored
+            scored += new
+            if progress:
+                progress(len(self.scores), new)
+
+    def publish(self, count=10):
+        """Write the best builds to recommended-builds.json for the creation screen"""
+        data = {"rules": ruleset_hash(), "settings": self.settings,
+                "builds": [{"stats": build_stats(build), "win_rate": win_rate, "depth": depth}
+                           for build, (win_rate, depth, _) in self.ranking(count)]}
+        try:
+            os.makedirs(os.path.dirname(self.recommended_path), exist_ok=True)
+            temp_file = self.recommended_path + ".tmp"
+            with open(temp_file, "w") as output:
+                json.dump(data, output)
+            os.replace(temp_file, self.recommended_path)
+        except OSError:
+            return
+        _recommended.pop(self.cache_dir, None)
+
+    def ranking(self, count=None):
+        """[(build, (win rate, depth, score)), ...] best first"""
+        ranked = sorted(self.scores.items(), key=lambda item: (-item[1][2], item[0]))
+        return ranked if count is None else ranked[:count]
+
+
+_recommended = {}  # cache_dir -> published builds
+
+
+def _is_published_build(build):
+    return (isinstance(build, dict) and is_valid_build(build.get("stats")) and
+            all(isinstance(build.get(key), (int, float)) for key in ("win_rate", "depth")))
+
+
+def recommended_builds(count=3, cache_dir=CACHE_DIR):
+    """Builds of the latest optimizer run as [{"stats", "win_rate", "depth"}, ...], best first
+
+    Never simulates, so it is safe to call from the frame loop; empty until
+    the optimizer (optimize.py) has been run with this cache_dir for the
+    current rules and number of creation points.
+    """
+    builds = _recommended.get(cache_dir)
+    if builds is None:
+        try:
+            with open(os.path.join(cache_dir, RECOMMENDED_NAME)) as source:
+                data = json.load(source)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        settings = data.get("settings")
+        builds = data.get("builds")
+        # A hand-edited or partial file counts as no recommendations
+        if (data.get("rules") != ruleset_hash() or not isinstance(settings, dict) or
+                settings.get("points") != DEFAULT_SETTINGS["points"] or not isinstance(builds, list) or
+                not all(map(_is_published_build, builds))):
+            builds = []
+        _recommended[cache_dir] = builds
+    return builds[:count]
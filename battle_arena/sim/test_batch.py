@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from entities import Enemy
+from sim.batch import FighterArrays, run_batch
+from sim.battle import make_player
+from simulate import run_chunk
+
+SCALAR_BATTLES = 1000
+BATCH_BATTLES = 20000
+
+
+@pytest.mark.parametrize("level, stats", [
+    (1, None),
+    (3, {"strength": 10, "agility": 10}),
+    (5, {"vitality": 20}),
+])
+def test_batch_win_rate_matches_scalar_engine(level, stats):
+    scalar = run_chunk((0, SCALAR_BATTLES, level, stats))
+    batch = run_batch(BATCH_BATTLES, level, stats, seed=0)
+    scalar_rate = scalar["wins"] / scalar["battles"]
+    batch_rate = batch["wins"] / batch["battles"]
+    # Four standard errors of the scalar estimate
+    tolerance = 4 * max(scalar_rate * (1 - scalar_rate), 0.01) ** 0.5 / SCALAR_BATTLES ** 0.5
+    assert abs(scalar_rate - batch_rate) <= tolerance
+    assert abs(scalar["turns"] / scalar["battles"] - batch["turns"] / batch["battles"]) < 5
+
+
+def test_rewards_match_enemy_rewards():
+    batch = run_batch(2000, level=3, seed=1)
+    for level, (wins, gold, exp) in batch["rewards"].items():
+        enemy = Enemy("", level)
+        assert (gold, exp) == (wins * enemy.gold_reward, wins * enemy.exp_reward)
+
+
+def test_arrays_follow_character_constants():
+    player = make_player()
+    player.skills["Heavy Strike"] = {"damage": 2.5, "accuracy": 0.5, "stamina_cost": 33}
+    player.move_stamina_cost = 7
+    player.jump_stamina_cost = 21
+    arrays = FighterArrays.from_character(player, 4)
+    assert arrays.skills["Heavy Strike"] == (2.5, 0.5, 33)
+    assert list(arrays.move_cost) == [7] * 4
+    assert list(arrays.jump_cost) == [21] * 4
+
+    enemies = FighterArrays.enemies([1, 4, 4, 9])
+    assert enemies.skills == {name: (skill["damage"], skill["accuracy"], skill["stamina_cost"])
+                              for name, skill in Enemy("", 1).skills.items()}
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from sim.builds import RECOMMENDED_NAME, BuildOptimizer, build_stats, recommended_builds, ruleset_hash
+
+
+def test_published_builds_are_read_from_the_same_cache_dir(tmp_path):
+    optimizer = BuildOptimizer(cache_dir=str(tmp_path))
+    assert recommended_builds(cache_dir=str(tmp_path)) == []
+    optimizer.scores = {(4, 4, 4, 4, 4): (0.5, 2.0, 0.6), (20, 0, 0, 0, 0): (0.9, 3.5, 0.95),
+                        (0, 0, 0, 0, 20): (0.1, 0.5, 0.1)}
+    optimizer.publish()
+    builds = recommended_builds(2, cache_dir=str(tmp_path))
+    assert builds == [{"stats": build_stats((20, 0, 0, 0, 0)), "win_rate": 0.9, "depth": 3.5},
+                      {"stats": build_stats((4, 4, 4, 4, 4)), "win_rate": 0.5, "depth": 2.0}]
+
+
+@pytest.mark.parametrize("data", [
+    {"rules": None},
+    {"builds": []},
+    [1, 2],
+    {"settings": "20", "builds": []},
+    {"settings": {}, "builds": []},
+    {"settings": {"points": 20}, "builds": [{"stats": {"strength": 20}}]},
+    {"settings": {"points": 20}, "builds": [{"stats": {"strength": 19}, "win_rate": 0.5, "depth": 1}]},
+    {"settings": {"points": 30}, "builds": []},
+])
+def test_partial_or_hand_edited_files_give_no_builds(tmp_path, data):
+    if isinstance(data, dict) and "rules" not in data:
+        data = dict(data, rules=ruleset_hash())
+    (tmp_path / RECOMMENDED_NAME).write_text(json.dumps(data))
+    assert recommended_builds(cache_dir=str(tmp_path)) == []
@@ -0,0 +1,175 @@
+import argparse
+import os
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from entities import Enemy, generate_enemy, get_outcome_table
+from sim import play_battle, make_player
+
+CHUNK_SIZE = 500
+BATCH_CHUNK_SIZE = 100000
+
+
+def run_chunk(args):
+    """Play a chunk of battles in a worker process with its own seeded RNG"""
+    seed, battles, level, stats = args
+    random.seed(seed)
+    summary = {
+        "battles": 0,
+        "wins": 0,
+        "timeouts": 0,
+        "turns": 0,
+        "player_damage": Counter(),
+        "enemy_damage": Counter(),
+        "rewards": defaultdict(lambda: [0, 0, 0]),  # enemy level -> [wins, gold, exp]
+    }
+    for _ in range(battles):
+        player = make_player(stats=stats, level=level)
+        enemy = generate_enemy(player.level)
+        result = play_battle(player, enemy)
+        summary["battles"] += 1
+        summary["turns"] += result["turns"]
+        summary["player_damage"].update(result["player_hits"])
+        summary["enemy_damage"].update(result["enemy_hits"])
+        if result.get("timeout"):
+            summary["timeouts"] += 1
+        if result["won"]:
+            summary["wins"] += 1
+            reward = summary["rewards"][enemy.level]
+            reward[0] += 1
+            reward[1] += enemy.gold_reward
+            reward[2] += enemy.exp_reward
+    summary["rewards"] = dict(summary["rewards"])
+    return summary
+
+
+def run_batch_chunk(args):
+    """Play a chunk of battles with the vectorized NumPy engine"""
+    # Imported lazily so the scalar engine does not require NumPy
+    from sim.batch import run_batch
+    seed, battles, level, stats = args
+    return run_batch(battles, level, stats, seed)
+
+
+def merge(total, part):
+    for key in ("battles", "wins", "timeouts", "turns"):
+        total[key] += part[key]
+    total["player_damage"].update(part["player_damage"])
+    total["enemy_damage"].update(part["enemy_damage"])
+    for level, (wins, gold, exp) in part["rewards"].items():
+        reward = total["rewards"].setdefault(level, [0, 0, 0])
+        reward[0] += wins
+        reward[1] += gold
+        reward[2] += exp
+    return total
+
+
+def simulate(battles, workers=None, seed=0, level=1, stats=None, chunk_size=None, engine="scalar"):
+    """Play battles across a process pool and return the merged summary"""
+    worker = run_batch_chunk if engine == "numpy" else run_chunk
+    if chunk_size is None:
+        chunk_size = BATCH_CHUNK_SIZE if engine == "numpy" else CHUNK_SIZE
+    chunks = []
+    remaining = battles
+    index = 0
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        # Seeds are derived from the chunk index so results don't depend on worker count
+        chunks.append((seed * 1000003 + index, size, level, stats))
+        remaining -= size
+        index += 1
+
+    total = {"battles": 0, "wins": 0, "timeouts": 0, "turns": 0,
+             "player_damage": Counter(), "enemy_damage": Counter(), "rewards": {}}
+    if workers == 1:
+        for chunk in chunks:
+            merge(total, worker(chunk))
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for part in executor.map(worker, chunks):
+            merge(total, part)
+    return total
+
+
+def describe_damage(counter):
+    if not counter:
+        return "no hits"
+    values = sorted(counter.elements())
+    quantiles = statistics.quantiles(values, n=10) if len(values) > 1 else [values[0]] * 9
+    return (f"hits={len(values)} mean={statistics.fmean(values):.2f} "
+            f"p10={quantiles[0]:.0f} p50={quantiles[4]:.0f} p90={quantiles[8]:.0f} max={values[-1]}")
+
+
+def print_report(total, elapsed):
+    battles = total["battles"]
+    print(f"Battles: {battles} in {elapsed:.2f}s ({battles / elapsed:.0f} battles/s)")
+    print(f"Win rate: {total['wins'] / battles:.2%}  (timeouts: {total['timeouts']})")
+    print(f"Mean turns: {total['turns'] / battles:.2f}")
+    print(f"Player damage per hit: {describe_damage(total['player_damage'])}")
+    print(f"Enemy damage per hit:  {describe_damage(total['enemy_damage'])}")
+    print("Rewards per enemy level (wins, mean gold, mean exp):")
+    for level in sorted(total["rewards"]):
+        wins, gold, exp = total["rewards"][level]
+        print(f"  Level {level}: {wins} wins, {gold / wins:.1f} gold, {exp / wins:.1f} exp")
+
+
+def print_odds(level, stats):
+    """Exact per-skill odds against every enemy level the player can meet, without sampling"""
+    outcomes = get_outcome_table()
+    player = make_player("Hero", stats, level)
+    for enemy_level in range(max(1, level - 2), level + 2):
+        enemy = Enemy("Enemy", enemy_level)
+        print(f"Level {enemy_level} enemy ({enemy.max_health} health) vs player ({player.max_health} health):")
+        for attacker, defender, side in ((player, enemy, "player"), (enemy, player, "enemy")):
+            for skill_name in attacker.skills:
+                odds = outcomes.odds(attacker, defender, skill_name)
+                print(f"  {side:6} {skill_name:13} hit {odds['hit_chance']:6.1%}  damage {odds['damage']:3}  "
+                      f"expected {odds['expected_damage']:5.2f}  hits to kill {odds['hits_to_kill']:3}  "
+                      f"expected attacks {odds['expected_attacks']:6.1f}")
+
+
+def parse_stats(values):
+    stats = {}
+    for value in values or []:
+        name, _, amount = value.partition("=")
+        stats[name] = int(amount)
+    return stats
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo battle simulator")
+    parser.add_argument("-n", "--battles", type=positive_int, default=10000)
+    parser.add_argument("-w", "--workers", type=positive_int, default=os.cpu_count())
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-l", "--level", type=int, default=1, help="player level")
+    parser.add_argument("--stat", action="append", metavar="NAME=POINTS",
+                        help="extra stat points, e.g. --stat strength=10")
+    parser.add_argument("--chunk-size", type=positive_int, default=None)
+    parser.add_argument("--engine", choices=("scalar", "numpy"), default="scalar",
+                        help="per-object engine or the vectorized NumPy batch engine")
+    parser.add_argument("--odds", action="store_true",
+                        help="print exact per-skill odds from the outcome tables instead of simulating")
+    args = parser.parse_args()
+
+    if args.odds:
+        print_odds(args.level, parse_stats(args.stat))
+        return
+
+    start = time.perf_counter()
+    total = simulate(args.battles, args.workers, args.seed, args.level,
+                     parse_stats(args.stat), args.chunk_size, args.engine)
+    print_report(total, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import pytest
+
+import battle_log
+from battle_log import BattleLog
+
+
+def test_in_memory_window_behaves_like_a_list():
+    log = BattleLog(capacity=10)
+    for index in range(5):
+        log.append(f"message {index}")
+    assert len(log) == 5
+    assert log[0] == "message 0"
+    assert log[-1] == "message 4"
+    assert log[-2:] == ["message 3", "message 4"]
+    assert list(log) == [f"message {index}" for index in range(5)]
+
+
+def test_old_messages_without_log_dir_are_gone():
+    log = BattleLog(capacity=3)
+    for index in range(5):
+        log.append(index)
+    assert log[-3:] == [2, 3, 4]
+    with pytest.raises(IndexError):
+        log[0]
+
+
+def test_pages_old_messages_back_in_across_segments(tmp_path):
+    log = BattleLog(capacity=4, log_dir=str(tmp_path), segment_size=7)
+    try:
+        for index in range(30):
+            log.append(f"message {index}")
+        assert len(log.entries) == 4
+        assert log[0] == "message 0"
+        assert log[13] == "message 13"
+        assert log[5:16] == [f"message {index}" for index in range(5, 16)]
+        assert log[-6:] == [f"message {index}" for index in range(24, 30)]
+        assert len(list(tmp_path.glob("battle-*.log"))) == 5
+    finally:
+        log.close()
+
+
+def test_clear_starts_a_new_view_over_the_same_history(tmp_path):
+    log = BattleLog(capacity=4, log_dir=str(tmp_path), segment_size=5)
+    try:
+        for index in range(8):
+            log.append(index)
+        log.clear()
+        for index in range(8, 14):
+            log.append(index)
+        assert len(log) == 6
+        assert log[:] == list(range(8, 14))
+        assert log.read_history(0, 3) == [0, 1, 2]
+    finally:
+        log.close()
+
+
+def test_rotated_out_segments_raise_index_error(tmp_path):
+    log = BattleLog(capacity=2, log_dir=str(tmp_path), segment_size=3, max_files=2)
+    try:
+        for index in range(12):
+            log.append(index)
+        log.flush()
+        assert len(list(tmp_path.glob("battle-*.log"))) == 2
+        with pytest.raises(IndexError):
+            log[0]
+        assert log[7] == 7
+    finally:
+        log.close()
+
+
+def test_write_errors_do_not_stop_the_writer(tmp_path, monkeypatch, capsys):
+    log = BattleLog(capacity=2, log_dir=str(tmp_path), segment_size=3)
+    real_open = open
+
+    def open_failing_first_segment(path, *args, **kwargs):
+        if path.endswith("-000000.log"):
+            raise OSError(28, "No space left on device")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(battle_log, "open", open_failing_first_segment, raising=False)
+    try:
+        for index in range(7):
+            log.append(index)
+        log.flush()  # Would hang if the writer thread had died
+        assert "No space left on device" in capsys.readouterr().err
+        with pytest.raises(IndexError):
+            log[1]
+        assert log[3:5] == [3, 4]
+    finally:
+        log.close()
@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+from pvp import (HEADER, SNAPSHOT, PvpClient, PvpHost, decode_snapshot, encode_snapshot, loopback_pair,
+                 play_bots)
+
+
+def make_match(latency, loss, seed):
+    links = [loopback_pair(latency, loss, f"{seed}/{side}") for side in (0, 1)]
+    host = PvpHost([links[0][0], links[1][0]], seed=seed)
+    clients = [PvpClient(links[0][1], "Red"), PvpClient(links[1][1], "Blue")]
+    return host, clients, links
+
+
+@pytest.mark.parametrize("latency, loss", [(0, 0.0), (3, 0.05), (6, 0.2)])
+def test_clients_end_in_the_host_state(latency, loss):
+    host, clients, _ = make_match(latency, loss, seed=5)
+    winner = play_bots(host, clients)
+    assert winner is not None
+    for client in clients:
+        assert client.winner == host.winner
+        assert client.log == host.log
+        for fighter, host_fighter in zip(client.fighters, host.fighters):
+            assert (fighter.health, fighter.stamina) == (host_fighter.health, host_fighter.stamina)
+
+
+def test_stray_and_truncated_packets_are_ignored():
+    host, clients, links = make_match(0, 0.0, seed=1)
+    for _, client_end in links:
+        client_end.send(b"")
+    host.tick()
+    for host_end, _ in links:
+        host_end.send(b"")
+        host_end.send(bytes([SNAPSHOT]) + b"\0\0")
+    for client in clients:
+        client.poll()
+    assert play_bots(host, clients) is not None
+
+
+STATE = {"match": (0, -1),
+         "fighters": ((100, 50, 200.0, 400.0, False, 0, False, 0, False, 0, 3),
+                      (90, 45, 600.0, 400.0, True, 2, False, 0, False, 0, 1)),
+         "log": 2}
+LOG = ["Red and Blue enter the arena!", "Blue uses Quick Strike!"]
+
+
+def test_full_snapshot_round_trip():
+    packet = encode_snapshot(7, 21, STATE, log=LOG)
+    assert decode_snapshot(packet, {}) == (7, 21, STATE, 0, LOG)
+
+
+def test_delta_snapshot_round_trip():
+    state = {"match": (1, -1),
+             "fighters": (STATE["fighters"][0], (80, 25, 590.0, 400.0, True, 3, False, 0, False, 0, 2)),
+             "log": 3}
+    log = LOG + ["Blue uses Heavy Strike!"]
+    packet = encode_snapshot(8, 24, state, 7, STATE, log)
+    assert len(packet) < len(encode_snapshot(8, 24, state, log=log))
+    # Only the message the baseline has not seen is sent
+    assert decode_snapshot(packet, {7: STATE}) == (8, 24, state, 2, log[2:])
+    assert decode_snapshot(packet, {}) is None  # Unknown baseline
+    with pytest.raises(struct.error):
+        decode_snapshot(packet[:HEADER.size + 1], {7: STATE})
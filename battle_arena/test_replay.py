@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+
+from entities import Character
+from game_state import GameState
+from replay import REPLAY_VERSION, Replay, replay_battle
+
+MAX_TICKS = 20000
+
+
+def choose(game_state):
+    """A simple player: attack when possible, otherwise close in, otherwise rest"""
+    actions = [action for index, action in enumerate(game_state.player_rules.actions)
+               if game_state.action_mask >> index & 1]
+    for kind in ("attack", "move_right", "rest"):
+        for action in actions:
+            if action[0] == kind:
+                return action
+    return actions[0] if actions else None
+
+
+def play_battle(game_state, seed):
+    game_state.start_battle(seed)
+    game_state.begin_battle()
+    while game_state.current_state == GameState.STATE_BATTLE and game_state.battle_ticks < MAX_TICKS:
+        if game_state.battle_turn == "player" and not game_state.player.is_animating():
+            action = choose(game_state)
+            if action is not None:
+                game_state.player_act(action)
+                if game_state.current_state != GameState.STATE_BATTLE:
+                    break
+        game_state.tick()
+    assert game_state.current_state != GameState.STATE_BATTLE, "battle did not finish"
+    return game_state.battle_outcome()
+
+
+@pytest.mark.parametrize("seed, teams", [(1, None), (7, None), (3, (2, 3))])
+def test_saved_replay_reproduces_the_battle(tmp_path, seed, teams):
+    game_state = GameState(replay_dir=str(tmp_path), teams=teams)
+    game_state.player = Character("Hero")
+    outcome = play_battle(game_state, seed)
+    assert game_state.replay.outcome == outcome
+    assert game_state.replay.actions
+
+    paths = list(tmp_path.glob("*.replay"))
+    assert len(paths) == 1
+    replay = Replay.load(str(paths[0]))
+    # JSON has no tuples, so compare both replays as JSON
+    assert json.dumps(replay.to_dict()) == json.dumps(game_state.replay.to_dict())
+    assert replay_battle(replay) == outcome
+
+
+def test_unknown_version_is_rejected(tmp_path):
+    data = Replay(1, Character("Hero").to_dict()).to_dict()
+    data["version"] = REPLAY_VERSION + 1
+    path = str(tmp_path / "future.replay")
+    with gzip.open(path, "wt", encoding="utf-8") as output:
+        json.dump(data, output)
+    with pytest.raises(ValueError):
+        Replay.load(path)
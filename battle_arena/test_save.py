@@ -0,0 +1,68 @@
+import pytest
+
+from entities import Character
+from game_state import GameState
+from save import HEADER, Autosaver, decode_save, encode_save, load_save
+
+SAMPLE = {"none": None, "flags": [True, False], "count": -3, "ratio": 0.25, "name": "Héro",
+          "position": (1, 2), "nested": {"items": [{"gold": 10}], 7: "seven"}}
+
+
+def test_round_trip_keeps_values_and_types():
+    assert decode_save(encode_save(SAMPLE)) == SAMPLE
+    assert type(decode_save(encode_save(SAMPLE))["position"]) is tuple
+
+
+def test_game_state_round_trip():
+    game_state = GameState()
+    game_state.player = Character("Hero", {"strength": 8, "vitality": 12})
+    game_state.player.gain_experience(150)
+    game_state.player.gold = 42
+    game_state.battles_won = 3
+    data = decode_save(encode_save(game_state.save_data()))
+
+    restored = GameState()
+    restored.restore(data)
+    assert restored.battles_won == 3
+    assert restored.player.to_dict() == game_state.player.to_dict()
+
+
+@pytest.mark.parametrize("offset", [HEADER.size, HEADER.size + 5, -1])
+def test_corrupted_payload_fails_the_checksum(offset):
+    data = bytearray(encode_save(SAMPLE))
+    data[offset] ^= 0x40
+    with pytest.raises(ValueError, match="checksum"):
+        decode_save(bytes(data))
+
+
+def test_truncated_or_foreign_files_are_rejected():
+    data = encode_save(SAMPLE)
+    with pytest.raises(ValueError, match="truncated"):
+        decode_save(data[:HEADER.size - 1])
+    with pytest.raises(ValueError, match="checksum"):
+        decode_save(data[:-1])
+    with pytest.raises(ValueError, match="Not a Battle Arena save"):
+        decode_save(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match="version"):
+        decode_save(data[:4] + b"\xff\xff" + data[6:])
+
+
+def test_unsupported_values_are_refused():
+    with pytest.raises(TypeError):
+        encode_save({"items": {1, 2}})
+
+
+def test_autosaver_writes_the_newest_snapshot(tmp_path):
+    path = str(tmp_path / "save.bin")
+    autosaver = Autosaver(path)
+    assert autosaver.load() is None
+    for gold in range(5):
+        autosaver.save({"gold": gold})
+    assert autosaver.load() == {"gold": 4}
+    autosaver.close()
+    assert load_save(path) == {"gold": 4}
+
+    autosaver = Autosaver(path)
+    autosaver.discard()
+    autosaver.close()
+    assert load_save(path) is None
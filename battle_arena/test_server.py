@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from server import BattleServer
+from sim.builds import STATS
+
+BUILD = {stat: 4 for stat in STATS}
+
+
+class Client:
+    """JSON-lines client over the server's Unix socket"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    async def send_line(self, line):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def request(self, op, **arguments):
+        self.next_id += 1
+        response = await self.send_line(json.dumps({"op": op, "id": self.next_id, **arguments}))
+        assert response["id"] == self.next_id
+        return response
+
+
+def run_with_server(tmp_path, scenario, **options):
+    async def run():
+        server = BattleServer(**options)
+        path = str(tmp_path / "arena.sock")
+        await server.start(path=path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        try:
+            return await scenario(Client(reader, writer), server)
+        finally:
+            writer.close()
+            await server.close()
+    return asyncio.run(run())
+
+
+def pick_action(actions):
+    """Attack when possible, otherwise close in, otherwise whatever is available"""
+    for kind in ("attack", "move_right", "rest"):
+        for action in actions:
+            if action[0] == kind:
+                return action
+    return actions[0]
+
+
+def test_battle_runs_to_the_end(tmp_path):
+    async def scenario(client, server):
+        created = await client.request("create", name="Hero", stats=BUILD)
+        assert created["ok"] and created["state"] == "ARENA_MENU"
+        session = created["session"]
+        view = await client.request("battle", session=session, seed=42)
+        assert view["ok"] and view["state"] == "BATTLE"
+        assert view["enemy"]["health"] > 0
+        for _ in range(500):
+            view = await client.request("act", session=session, action=pick_action(view["actions"]))
+            assert view["ok"], view
+            if view["state"] != "BATTLE":
+                break
+        assert view["state"] in ("ARENA_MENU", "GAME_OVER")
+        assert view["battles_won"] == (view["state"] == "ARENA_MENU")
+        stats = await client.request("stats")
+        assert stats["sessions"] == 1
+    run_with_server(tmp_path, scenario)
+
+
+def test_malformed_requests_get_errors(tmp_path):
+    async def scenario(client, server):
+        response = await client.send_line("[1,2]")
+        assert response["ok"] is False
+        response = await client.send_line("{not json")
+        assert response["ok"] is False
+        bool_stats = dict(BUILD, strength=True, agility=7)  # Sums to 20 with True counted as 1
+        response = await client.request("create", name="Hero", stats=bool_stats)
+        assert response["ok"] is False and "stats" in response["error"]
+        assert (await client.request("stats"))["sessions"] == 0
+
+        session = (await client.request("create", name="Hero", stats=BUILD))["session"]
+        response = await client.request("act", session=session, action=0)
+        assert response["ok"] is False  # No battle yet
+        await client.request("battle", session=session, seed=1)
+        for action in ([[1], 2], [1, 2], True, -1, 99, ["attack", "Fireball"], "rest"):
+            response = await client.request("act", session=session, action=action)
+            assert response["ok"] is False and "unknown action" in response["error"], action
+        response = await client.request("fly", session=session)
+        assert response["ok"] is False
+        # The session survives bad requests
+        assert (await client.request("state", session=session))["state"] == "BATTLE"
+    run_with_server(tmp_path, scenario)
+
+
+def test_idle_sessions_expire(tmp_path):
+    async def scenario(client, server):
+        session = (await client.request("create", name="Hero", stats=BUILD))["session"]
+        assert (await client.request("state", session=session))["ok"]
+        await asyncio.sleep(0.5)
+        response = await client.request("state", session=session)
+        assert response == {"id": client.next_id, "ok": False, "error": "unknown or expired session"}
+        assert server.evicted == 1
+    run_with_server(tmp_path, scenario, idle_timeout=0.2)
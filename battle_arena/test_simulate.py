@@ -0,0 +1,49 @@
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+import simulate
+from entities import Enemy
+from sim import make_player, play_battle
+from simulate import merge, run_chunk
+
+
+def test_battle_ends_with_one_side_down():
+    random.seed(3)
+    player, enemy = make_player(level=3), Enemy("Goblin", 3)
+    result = play_battle(player, enemy)
+    assert 0 < result["turns"] <= 300
+    assert result["won"] == (enemy.health <= 0)
+    assert result.get("timeout") or result["won"] or player.health <= 0
+    assert all(damage > 0 for damage in result["player_hits"] + result["enemy_hits"])
+
+
+def test_seeded_chunks_give_identical_summaries():
+    chunks = [(seed, 60, 2, {"strength": 5}) for seed in (11, 12)]
+    totals = []
+    for _ in range(2):
+        total = {"battles": 0, "wins": 0, "timeouts": 0, "turns": 0,
+                 "player_damage": Counter(), "enemy_damage": Counter(), "rewards": {}}
+        for chunk in chunks:
+            merge(total, run_chunk(chunk))
+        totals.append(total)
+    assert totals[0] == totals[1]
+    assert totals[0]["battles"] == 120
+    assert sum(wins for wins, _, _ in totals[0]["rewards"].values()) == totals[0]["wins"]
+
+
+def test_results_do_not_depend_on_workers_or_chunking():
+    single = simulate.simulate(250, workers=1, seed=4, chunk_size=100)
+    assert single == simulate.simulate(250, workers=2, seed=4, chunk_size=100)
+    assert single["battles"] == 250
+
+
+@pytest.mark.parametrize("argv", [["-n", "0"], ["--battles", "-5"], ["--chunk-size", "0"], ["-w", "0"]])
+def test_non_positive_counts_are_rejected(monkeypatch, capsys, argv):
+    monkeypatch.setattr(sys, "argv", ["simulate.py"] + argv)
+    with pytest.raises(SystemExit) as exit_info:
+        simulate.main()
+    assert exit_info.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err
@@ -1,10 +1,18 @@
 from .button import Button
-from .drawing import draw_health_bar, draw_battle_arena
+from .drawing import init_fonts, draw_health_bar, draw_character, draw_battle_arena, battle_arena_regions
 from .screens import (
     draw_main_menu,
     draw_character_creation,
     draw_arena_menu,
     draw_character_stats,
     draw_game_over,
-    draw_pre_battle  # Add the new pre-battle screen function
-)
\ No newline at end of file
+    draw_pre_battle,  # Add the new pre-battle screen function
+    character_creation_regions,
+    arena_menu_regions
+)
+from .text_cache import TextCache, text_cache, render_text
+from .dirty import DirtyRenderer
+from .layers import ScreenLayers, invalidate_backgrounds
+from .fonts import FontRegistry, FontSet, font_registry, get_font
+from .overlay import draw_profiler_overlay, PROFILER_OVERLAY_RECT
+from .sprites import SpriteAtlas, sprite_atlas
@@ -1,5 +1,7 @@
 import pygame
 from constants import BLACK, WHITE, BLUE, GRAY, GOLD
+from ui.text_cache import render_text
+from ui.fonts import get_font
 
 class Button:
     def __init__(self, x, y, width, height, text, color=BLUE, hover_color=GOLD, disabled_color=(100, 100, 100), font_size=20):
@@ -12,20 +14,30 @@ class Button:
         self.is_hovered = False
         self.is_disabled = False
         # Use a more thematic font (replace with a custom font if available)
-        self.font = pygame.font.SysFont('Times New Roman', font_size, bold=True)
+        self.font = get_font('Times New Roman', font_size, bold=True)
         self.scale = 1.0  # For hover animation
         self.alpha = 255  # For click feedback
+        # Pre-rendered surfaces per (hovered, disabled, alpha) state
+        self._surfaces = {}
+        self._surfaces_signature = None
 
-    def draw(self, surface):
-        # Adjust color based on state
-        if self.is_disabled:
+    def _signature(self):
+        return (self.text, self.base_color, self.hover_color, self.disabled_color, self.rect.size, self.font)
+
+    def invalidate(self):
+        """Drop the pre-rendered state surfaces; they are rebuilt on the next draw"""
+        self._surfaces = {}
+        self._surfaces_signature = self._signature()
+
+    def _render_state(self, hovered, disabled, alpha):
+        """Render one visual state; returns the surface and its offset from rect.topleft"""
+        if disabled:
             color = self.disabled_color
         else:
-            color = self.hover_color if self.is_hovered else self.base_color
+            color = self.hover_color if hovered else self.base_color
 
         # Create a temporary surface for the button
         button_surface = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
-        button_surface.set_alpha(self.alpha)
 
         # Draw rounded rectangle with gradient effect
         pygame.draw.rect(button_surface, color, (0, 0, self.rect.width, self.rect.height), border_radius=10)
@@ -34,24 +46,45 @@ class Button:
         pygame.draw.rect(button_surface, WHITE, (0, 0, self.rect.width, self.rect.height), 2, border_radius=10)
 
         # Add a shadow effect when hovered
-        if self.is_hovered and not self.is_disabled:
+        if hovered and not disabled:
             shadow_color = (min(color[0] + 50, 255), min(color[1] + 50, 255), min(color[2] + 50, 255))
             pygame.draw.rect(button_surface, shadow_color, (2, 2, self.rect.width - 4, self.rect.height - 4), border_radius=8)
 
         # Render text
-        text_surface = self.font.render(self.text, True, WHITE)
+        text_surface = render_text(self.font, self.text, True, WHITE)
         text_rect = text_surface.get_rect(center=(self.rect.width // 2, self.rect.height // 2))
         button_surface.blit(text_surface, text_rect)
 
+        offset = (0, 0)
         # Scale for hover effect
-        if self.is_hovered and not self.is_disabled:
+        if hovered and not disabled:
             scale = 1.05
             scaled_size = (int(self.rect.width * scale), int(self.rect.height * scale))
             button_surface = pygame.transform.smoothscale(button_surface, scaled_size)
-            scaled_rect = button_surface.get_rect(center=self.rect.center)
-            surface.blit(button_surface, scaled_rect.topleft)
-        else:
-            surface.blit(button_surface, self.rect.topleft)
+            offset = (self.rect.width // 2 - scaled_size[0] // 2, self.rect.height // 2 - scaled_size[1] // 2)
+
+        # Pressed state: brief transparency for click feedback
+        if alpha != 255:
+            button_surface.set_alpha(alpha)
+        return button_surface, offset
+
+    @property
+    def bounds(self):
+        """Area the button may cover, including the enlarged hover state"""
+        return self.rect.inflate(self.rect.width // 10 + 2, self.rect.height // 10 + 2)
+
+    def draw_state(self):
+        return (self.is_hovered and not self.is_disabled, self.is_disabled, self.alpha, self._signature())
+
+    def draw(self, surface):
+        if self._surfaces_signature != self._signature():
+            self.invalidate()
+        key = (self.is_hovered and not self.is_disabled, self.is_disabled, self.alpha)
+        cached = self._surfaces.get(key)
+        if cached is None:
+            cached = self._surfaces[key] = self._render_state(*key)
+        button_surface, (dx, dy) = cached
+        surface.blit(button_surface, (self.rect.x + dx, self.rect.y + dy))
 
     def check_hover(self, mouse_pos):
         self.is_hovered = self.rect.collidepoint(mouse_pos)
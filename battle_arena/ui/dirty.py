@@ -0,0 +1,58 @@
+import pygame
+
+
+class DirtyRenderer:
+    """Collects changed screen regions and pushes only those to the display
+
+    Screens report regions with track(), passing a value that describes what
+    is drawn there; a region is dirty when its value or position changed since
+    the previous frame. When nothing is dirty the frame is skipped entirely.
+    """
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.rects = []
+        self.full = True
+        self.regions = {}
+        self.drawing = False  # Whether the current frame is being drawn (begin() returned True)
+
+    def mark_all(self):
+        self.full = True
+
+    def mark(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def track(self, name, rect, value):
+        rect = pygame.Rect(rect)
+        previous = self.regions.get(name)
+        if previous is None or previous[0] != rect or previous[1] != value:
+            self.mark(rect)
+            if previous is not None and previous[0] != rect:
+                self.mark(previous[0])
+        self.regions[name] = (rect, value)
+
+    def track_buttons(self, buttons):
+        for button in buttons:
+            self.track(("button", id(button)), button.bounds, button.draw_state())
+
+    def begin(self):
+        """Clip drawing to the dirty area; returns False when the frame can be skipped"""
+        if self.full:
+            self.surface.set_clip(None)
+        elif self.rects:
+            self.surface.set_clip(self.rects[0].unionall(self.rects[1:]))
+        self.drawing = self.full or bool(self.rects)
+        return self.drawing
+
+    def present(self):
+        """Push dirty regions to the display; returns True if anything was shown"""
+        presented = self.full or bool(self.rects)
+        if self.full:
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(self.rects)
+        self.surface.set_clip(None)
+        self.rects = []
+        self.full = False
+        self.drawing = False
+        return presented
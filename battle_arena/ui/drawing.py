@@ -1,17 +1,23 @@
 # ui/drawing.py
 import pygame
-from constants import BLACK, RED, GREEN, BROWN, BLUE, GOLD, WHITE, WIDTH, HEIGHT
+from constants import BLACK, RED, GREEN, BROWN, BLUE, GOLD, WHITE, GRAY, WIDTH, HEIGHT
+from ui.text_cache import render_text
+from ui.layers import ScreenLayers
+from profiler import profiled
+from ui.fonts import FontSet
+from ui.sprites import sprite_atlas, SPRITE_LEFT, SPRITE_TOP
 
 # Initialize fonts
 def init_fonts():
-    fonts = {
-        'small': pygame.font.SysFont('Arial', 18),
-        'medium': pygame.font.SysFont('Arial', 24),
-        'large': pygame.font.SysFont('Arial', 32),
-        'title': pygame.font.SysFont('Arial', 48, bold=True)
-    }
+    fonts = FontSet({
+        'small': ('Arial', 18),
+        'medium': ('Arial', 24),
+        'large': ('Arial', 32),
+        'title': ('Arial', 48, True)
+    })
     return fonts
 
+@profiled
 def draw_health_bar(surface, x, y, width, height, value, max_value, border_color=BLACK, back_color=RED, fill_color=GREEN):
     """Draw a health or stamina bar with border"""
     # Draw background
@@ -24,22 +30,88 @@ def draw_health_bar(surface, x, y, width, height, value, max_value, border_color
     # Draw border
     pygame.draw.rect(surface, border_color, (x, y, width, height), 2)
 
-def draw_battle_arena(surface, player, enemy, battle_log, battle_turn, fonts):
-    """Draw the battle arena screen with improved HUD showing health and stamina bars"""
+@profiled
+def draw_character(surface, character, font, alpha=1.0):
+    """Draw a character or enemy with its health and stamina bars, from the sprite atlas"""
+    position = character.render_position(alpha)
+    x = int(position[0])
+    if character.is_attacking:
+        x += character.attack_frame * 5 if character.attack_frame < 5 else -(character.attack_frame - 5) * 5
+    bottom = int(position[1])
+    hit_flash = character.is_hit and character.hit_frame % 2 == 0
+    
+    sheet, area = sprite_atlas.pose(character, hit_flash, character.is_attacking)
+    surface.blit(sheet, (x + SPRITE_LEFT, bottom + SPRITE_TOP), area)
+    # Bars and name sit above the head, whose centre is 90px above the body's bottom
+    overlay, (dx, dy) = sprite_atlas.overlay(character, font)
+    surface.blit(overlay, (x + dx, bottom - 90 + dy))
+
+def character_bounds(character, font, alpha=1.0):
+    """Screen area covered by draw_character for the character's current pose"""
+    position = character.render_position(alpha)
+    x = int(position[0])
+    if character.is_attacking:
+        x += character.attack_frame * 5 if character.attack_frame < 5 else -(character.attack_frame - 5) * 5
+    bottom = int(position[1])
+    head_center_y = bottom - 60 - 30
+    name_width, name_height = font.size(character.name)
+    left = min(x - 30, x - name_width // 2) - 1
+    right = max(x + 60, x + name_width // 2) + 1
+    top = head_center_y - 30 - name_height // 2 - 1
+    return pygame.Rect(left, top, right - left, bottom - top + 1)
+
+def battle_arena_regions(player, enemy, battle_log, battle_turn, fonts, alpha=1.0, others=()):
+    """Regions of draw_battle_arena as (name, rect, value) for dirty-rect tracking"""
+    regions = []
+    sprites = [("player", player), ("enemy", enemy)]
+    sprites.extend((f"combatant_{slot}", character) for slot, character in enumerate(others))
+    for key, character in sprites:
+        if character is None:
+            regions.append((f"{key}_sprite", pygame.Rect(0, 0, 0, 0), None))
+            continue
+        regions.append((f"{key}_sprite", character_bounds(character, fonts['small'], alpha),
+                        (tuple(character.render_position(alpha)), character.is_attacking, character.attack_frame,
+                         character.is_hit, character.hit_frame, character.health, character.stamina)))
+    regions.append(("player_hud", pygame.Rect(20, 70, 220, 100).inflate(4, 4),
+                    (player.name, player.level, player.health, player.max_health,
+                     player.stamina, player.max_stamina, battle_turn)))
+    regions.append(("enemy_hud", pygame.Rect(WIDTH - 240, 70, 220, 100).inflate(4, 4),
+                    (enemy.name, enemy.level, enemy.health, enemy.max_health,
+                     enemy.stamina, enemy.max_stamina, battle_turn)))
+    regions.append(("turn", pygame.Rect(WIDTH/2 - 100, 70, 200, 30), battle_turn))
+    regions.append(("log", pygame.Rect(50, HEIGHT - 220, WIDTH - 100, 120), (len(battle_log), tuple(battle_log[-5:]))))
+    return regions
+
+def _draw_battle_arena_background(surface, fonts):
     # Background
     surface.fill((50, 50, 100))  # Dark blue background for arena
     
     # Ground
     pygame.draw.rect(surface, BROWN, (0, 400, WIDTH, 200))
     
-    # Draw characters
-    player.draw(surface)
-    enemy.draw(surface)
-    
-    # Draw battle HUD
-    title_text = fonts['large'].render("BATTLE", True, WHITE)
+    # Battle title
+    title_text = render_text(fonts['large'], "BATTLE", True, WHITE)
     title_rect = title_text.get_rect(midtop=(WIDTH/2, 20))
     surface.blit(title_text, title_rect)
+
+BATTLE_ARENA_LAYERS = ScreenLayers("battle_arena", _draw_battle_arena_background)
+
+@profiled
+def draw_battle_arena(surface, player, enemy, battle_log, battle_turn, fonts, alpha=1.0, others=()):
+    """Draw the battle arena screen with improved HUD showing health and stamina bars
+    
+    others are the rest of a team battle's combatants; None entries are skipped.
+    """
+    BATTLE_ARENA_LAYERS.draw_background(surface, fonts)
+    
+    # Draw characters at positions interpolated between simulation ticks
+    for character in others:
+        if character is not None:
+            draw_character(surface, character, fonts['small'], alpha)
+    draw_character(surface, player, fonts['small'], alpha)
+    draw_character(surface, enemy, fonts['small'], alpha)
+    
+    # Draw battle HUD
     
     # Player HUD - Left side
     player_hud_rect = pygame.Rect(20, 70, 220, 100)
@@ -52,17 +124,17 @@ def draw_battle_arena(surface, player, enemy, battle_log, battle_turn, fonts):
         pygame.draw.rect(surface, WHITE, player_hud_rect, 2)
     
     # Player name and level
-    player_name = fonts['medium'].render(f"{player.name} Lvl:{player.level}", True, WHITE)
+    player_name = render_text(fonts['medium'], f"{player.name} Lvl:{player.level}", True, WHITE)
     surface.blit(player_name, (player_hud_rect.x + 10, player_hud_rect.y + 10))
     
     # Player health bar
-    health_label = fonts['small'].render(f"HP: {player.health}/{player.max_health}", True, WHITE)
+    health_label = render_text(fonts['small'], f"HP: {player.health}/{player.max_health}", True, WHITE)
     surface.blit(health_label, (player_hud_rect.x + 10, player_hud_rect.y + 40))
     draw_health_bar(surface, player_hud_rect.x + 10, player_hud_rect.y + 60, 
                     200, 10, player.health, player.max_health)
     
     # Player stamina bar
-    stamina_label = fonts['small'].render(f"SP: {player.stamina}/{player.max_stamina}", True, WHITE)
+    stamina_label = render_text(fonts['small'], f"SP: {player.stamina}/{player.max_stamina}", True, WHITE)
     surface.blit(stamina_label, (player_hud_rect.x + 10, player_hud_rect.y + 75))
     draw_health_bar(surface, player_hud_rect.x + 10, player_hud_rect.y + 95, 
                     200, 10, player.stamina, player.max_stamina, fill_color=BLUE)
@@ -78,24 +150,24 @@ def draw_battle_arena(surface, player, enemy, battle_log, battle_turn, fonts):
         pygame.draw.rect(surface, WHITE, enemy_hud_rect, 2)
     
     # Enemy name and level
-    enemy_name = fonts['medium'].render(f"{enemy.name} Lvl:{enemy.level}", True, WHITE)
+    enemy_name = render_text(fonts['medium'], f"{enemy.name} Lvl:{enemy.level}", True, WHITE)
     enemy_name_rect = enemy_name.get_rect(topleft=(enemy_hud_rect.x + 10, enemy_hud_rect.y + 10))
     surface.blit(enemy_name, enemy_name_rect)
     
     # Enemy health bar
-    enemy_health = fonts['small'].render(f"HP: {enemy.health}/{enemy.max_health}", True, WHITE)
+    enemy_health = render_text(fonts['small'], f"HP: {enemy.health}/{enemy.max_health}", True, WHITE)
     surface.blit(enemy_health, (enemy_hud_rect.x + 10, enemy_hud_rect.y + 40))
     draw_health_bar(surface, enemy_hud_rect.x + 10, enemy_hud_rect.y + 60, 
                     200, 10, enemy.health, enemy.max_health)
     
     # Enemy stamina bar
-    enemy_stamina = fonts['small'].render(f"SP: {enemy.stamina}/{enemy.max_stamina}", True, WHITE)
+    enemy_stamina = render_text(fonts['small'], f"SP: {enemy.stamina}/{enemy.max_stamina}", True, WHITE)
     surface.blit(enemy_stamina, (enemy_hud_rect.x + 10, enemy_hud_rect.y + 75))
     draw_health_bar(surface, enemy_hud_rect.x + 10, enemy_hud_rect.y + 95, 
                     200, 10, enemy.stamina, enemy.max_stamina, fill_color=BLUE)
     
     # Turn indicator text
-    turn_text = fonts['medium'].render(f"{battle_turn.capitalize()}'s Turn", True, GOLD)
+    turn_text = render_text(fonts['medium'], f"{battle_turn.capitalize()}'s Turn", True, GOLD)
     turn_rect = turn_text.get_rect(center=(WIDTH/2, 85))
     surface.blit(turn_text, turn_rect)
     
@@ -107,7 +179,7 @@ def draw_battle_arena(surface, player, enemy, battle_log, battle_turn, fonts):
     
     # Display the log messages
     for i, msg in enumerate(battle_log[-5:]):
-        text = fonts['small'].render(msg, True, WHITE)
+        text = render_text(fonts['small'], msg, True, WHITE)
         surface.blit(text, (log_rect.x + 10, log_rect.y + 10 + i * 25))
     
 # Modified version of CHARACTER CREATION in ui/screens.py
@@ -117,17 +189,17 @@ def draw_character_creation(surface, buttons, input_name, current_stats, total_p
     surface.fill((30, 30, 50))
     
     # Title
-    title_text = fonts['title'].render("CHARACTER CREATION", True, WHITE)
+    title_text = render_text(fonts['title'], "CHARACTER CREATION", True, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH/2, 60))
     surface.blit(title_text, title_rect)
     
     # Name input box
     pygame.draw.rect(surface, WHITE, (WIDTH/2 - 150, 140, 300, 40), 2)
-    name_label = fonts['medium'].render("Character Name:", True, WHITE)
+    name_label = render_text(fonts['medium'], "Character Name:", True, WHITE)
     surface.blit(name_label, (WIDTH/2 - 150, 110))
     
     # Display entered name
-    name_text = fonts['medium'].render(input_name, True, WHITE)
+    name_text = render_text(fonts['medium'], input_name, True, WHITE)
     surface.blit(name_text, (WIDTH/2 - 140, 150))
     
     # Calculate remaining points
@@ -135,7 +207,7 @@ def draw_character_creation(surface, buttons, input_name, current_stats, total_p
     remaining_points = total_points - used_points
     
     # Stat distribution title
-    stat_title = fonts['medium'].render(f"Distribute Stat Points: {remaining_points} remaining", True, WHITE)
+    stat_title = render_text(fonts['medium'], f"Distribute Stat Points: {remaining_points} remaining", True, WHITE)
     surface.blit(stat_title, (WIDTH/2 - 150, 200))
     
     # Stat explanations
@@ -149,32 +221,32 @@ def draw_character_creation(surface, buttons, input_name, current_stats, total_p
     y_position = 240
     for i, (stat, value) in enumerate(current_stats.items()):
         # Stat name and value
-        stat_text = fonts['medium'].render(f"{stat.capitalize()}: {value}", True, GOLD)
+        stat_text = render_text(fonts['medium'], f"{stat.capitalize()}: {value}", True, GOLD)
         surface.blit(stat_text, (WIDTH/2 - 150, y_position))
         
         # + and - buttons
         # Minus button (only enabled if value > 0)
         minus_color = RED if value > 0 else GRAY
         pygame.draw.rect(surface, minus_color, (WIDTH/2 - 180, y_position, 25, 25))
-        minus_text = fonts['medium'].render("-", True, WHITE)
+        minus_text = render_text(fonts['medium'], "-", True, WHITE)
         minus_rect = minus_text.get_rect(center=(WIDTH/2 - 167, y_position + 12))
         surface.blit(minus_text, minus_rect)
         
         # Plus button (only enabled if remaining points > 0)
         plus_color = GREEN if remaining_points > 0 else GRAY
         pygame.draw.rect(surface, plus_color, (WIDTH/2 + 20, y_position, 25, 25))
-        plus_text = fonts['medium'].render("+", True, WHITE)
+        plus_text = render_text(fonts['medium'], "+", True, WHITE)
         plus_rect = plus_text.get_rect(center=(WIDTH/2 + 32, y_position + 12))
         surface.blit(plus_text, plus_rect)
         
         # Stat explanation
-        explanation = fonts['small'].render(stat_explanations[stat], True, WHITE)
+        explanation = render_text(fonts['small'], stat_explanations[stat], True, WHITE)
         surface.blit(explanation, (WIDTH/2 + 50, y_position))
         
         y_position += 50
     
     # Stat point info
-    points_text = fonts['medium'].render(
+    points_text = render_text(fonts['medium'], 
         f"You have {remaining_points} points remaining", 
         True, 
         WHITE if remaining_points > 0 else RED
@@ -187,6 +259,6 @@ def draw_character_creation(surface, buttons, input_name, current_stats, total_p
     pygame.draw.rect(surface, button_color, create_button)
     pygame.draw.rect(surface, BLACK, create_button, 2)  # Border
     
-    create_text = fonts['medium'].render("Create Character", True, WHITE)
+    create_text = render_text(fonts['medium'], "Create Character", True, WHITE)
     create_rect = create_text.get_rect(center=create_button.center)
     surface.blit(create_text, create_rect)
\ No newline at end of file
@@ -0,0 +1,102 @@
+import json
+import os
+from collections.abc import Mapping
+
+import pygame
+
+CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "battle_arena", "fonts.json"
+)
+
+
+class FontRegistry:
+    """Process-wide font registry
+
+    Each (face, size, bold) font is created once, on first use. The font file
+    that pygame's system font lookup resolves for a (face, bold) pair is kept in
+    an on-disk cache, so later runs open the file directly instead of scanning
+    the system fonts again.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.fonts = {}
+        self.paths = None
+
+    def get(self, face, size, bold=False):
+        key = (face, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = self._load(face, size, bold)
+        return font
+
+    def _load(self, face, size, bold):
+        if not pygame.font.get_init():
+            pygame.font.init()
+        if self.paths is None:
+            self.paths = self._read_cache()
+        path_key = f"{face}|{int(bold)}"
+        cached = self.paths.get(path_key)
+        if cached is not None:
+            path, synthetic_bold = cached
+            if path is None or os.path.exists(path):
+                return self._construct(path, size, synthetic_bold)
+
+        resolved = []
+
+        def constructor(path, size, set_bold, set_italic):
+            resolved.append((path, set_bold))
+            return self._construct(path, size, set_bold)
+
+        font = pygame.font.SysFont(face, size, bold, False, constructor)
+        self.paths[path_key] = list(resolved[0])
+        self._write_cache()
+        return font
+
+    @staticmethod
+    def _construct(path, size, synthetic_bold):
+        font = pygame.font.Font(path, size)
+        if synthetic_bold:
+            font.set_bold(True)
+        return font
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_file) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_file = self.cache_file + ".tmp"
+            with open(temp_file, "w") as cache:
+                json.dump(self.paths, cache)
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass  # The cache only speeds up startup
+
+
+font_registry = FontRegistry()
+
+
+def get_font(face, size, bold=False):
+    return font_registry.get(face, size, bold)
+
+
+class FontSet(Mapping):
+    """Named fonts (e.g. 'small', 'title') resolved through the registry on first access"""
+
+    def __init__(self, specs):
+        self.specs = specs
+
+    def __getitem__(self, name):
+        return get_font(*self.specs[name])
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
@@ -0,0 +1,33 @@
+import pygame
+
+
+class ScreenLayers:
+    """Static background layer of a screen, rendered once and reused
+
+    render(surface, *args) draws everything on the screen that does not change
+    while the screen is shown. The result is kept until invalidate() is called;
+    dynamic overlays are drawn by the screen function on top of it each frame.
+    """
+
+    instances = []
+
+    def __init__(self, name, render):
+        self.name = name
+        self.render = render
+        self.background = None
+        ScreenLayers.instances.append(self)
+
+    def invalidate(self):
+        self.background = None
+
+    def draw_background(self, surface, *args):
+        if self.background is None or self.background.get_size() != surface.get_size():
+            self.background = pygame.Surface(surface.get_size(), 0, surface)
+            self.render(self.background, *args)
+        surface.blit(self.background, (0, 0))
+
+
+def invalidate_backgrounds():
+    """Drop every cached background, e.g. when the displayed data changes screen"""
+    for layers in ScreenLayers.instances:
+        layers.invalidate()
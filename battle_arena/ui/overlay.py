@@ -0,0 +1,16 @@
+import pygame
+from constants import WHITE, WIDTH
+from ui.text_cache import render_text
+
+PROFILER_OVERLAY_RECT = pygame.Rect(WIDTH - 290, 5, 285, 160)
+
+
+def draw_profiler_overlay(surface, lines, font):
+    """Frame-time summary in a translucent panel in the top-right corner"""
+    panel = pygame.Surface(PROFILER_OVERLAY_RECT.size, pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 180))
+    y = 5
+    for line in lines:
+        panel.blit(render_text(font, line, True, WHITE), (8, y))
+        y += font.get_linesize()
+    surface.blit(panel, PROFILER_OVERLAY_RECT)
@@ -1,29 +1,40 @@
 import pygame
 from constants import WHITE, GOLD, BLACK, RED, BLUE, WIDTH, HEIGHT
 from ui.drawing import draw_health_bar, draw_battle_arena
+from ui.text_cache import render_text
+from ui.layers import ScreenLayers
+from profiler import profiled
+from entities import get_outcome_table
+from sim import recommended_builds
 
-def draw_main_menu(surface, buttons, fonts):
+def _draw_main_menu_background(surface, fonts):
     surface.fill((30, 30, 50))
-    title_text = fonts['title'].render("BATTLE ARENA", True, GOLD)
+    title_text = render_text(fonts['title'], "BATTLE ARENA", True, GOLD)
     title_rect = title_text.get_rect(center=(WIDTH/2, 100))
     surface.blit(title_text, title_rect)
+
+MAIN_MENU_LAYERS = ScreenLayers("main_menu", _draw_main_menu_background)
+
+@profiled
+def draw_main_menu(surface, buttons, fonts):
+    MAIN_MENU_LAYERS.draw_background(surface, fonts)
     for button in buttons:
         button.draw(surface)
         
-def draw_pre_battle(surface, player, enemy, button, battle_timer, fonts):
+def _draw_pre_battle_background(surface, player, enemy, fonts):
     surface.fill((30, 30, 80))
-    title_text = fonts['title'].render("BATTLE PREPARATION", True, GOLD)
+    title_text = render_text(fonts['title'], "BATTLE PREPARATION", True, GOLD)
     title_rect = title_text.get_rect(center=(WIDTH/2, 50))
     surface.blit(title_text, title_rect)
-    instruction_text = fonts['medium'].render("Review stats and click 'Start Battle!' when ready", True, WHITE)
+    instruction_text = render_text(fonts['medium'], "Review stats and click 'Start Battle!' when ready", True, WHITE)
     instruction_rect = instruction_text.get_rect(center=(WIDTH/2, HEIGHT - 120))
     surface.blit(instruction_text, instruction_rect)
-    player_title = fonts['large'].render(f"{player.name} (Level {player.level})", True, BLUE)
+    player_title = render_text(fonts['large'], f"{player.name} (Level {player.level})", True, BLUE)
     surface.blit(player_title, (100, 120))
-    enemy_title = fonts['large'].render(f"{enemy.name} (Level {enemy.level})", True, RED)
+    enemy_title = render_text(fonts['large'], f"{enemy.name} (Level {enemy.level})", True, RED)
     enemy_title_rect = enemy_title.get_rect(topright=(WIDTH - 100, 120))
     surface.blit(enemy_title, enemy_title_rect)
-    vs_text = fonts['title'].render("VS", True, GOLD)
+    vs_text = render_text(fonts['title'], "VS", True, GOLD)
     vs_rect = vs_text.get_rect(center=(WIDTH/2, 120))
     surface.blit(vs_text, vs_rect)
     stats = [
@@ -37,59 +48,99 @@ def draw_pre_battle(surface, player, enemy, button, battle_timer, fonts):
     ]
     y_pos = 180
     for stat_name, p_val, p_max, e_val, e_max in stats:
-        stat_text = fonts['medium'].render(stat_name, True, WHITE)
+        stat_text = render_text(fonts['medium'], stat_name, True, WHITE)
         stat_rect = stat_text.get_rect(center=(WIDTH/2, y_pos))
         surface.blit(stat_text, stat_rect)
         if stat_name in ["Health", "Stamina"]:
-            p_text = fonts['medium'].render(f"{p_val}/{p_max}", True, WHITE)
+            p_text = render_text(fonts['medium'], f"{p_val}/{p_max}", True, WHITE)
             draw_health_bar(surface, 100, y_pos + 25, 200, 15, p_val, p_max)
         else:
-            p_text = fonts['medium'].render(f"{p_val}", True, WHITE)
+            p_text = render_text(fonts['medium'], f"{p_val}", True, WHITE)
         p_rect = p_text.get_rect(topleft=(100, y_pos))
         surface.blit(p_text, p_rect)
         if stat_name in ["Health", "Stamina"]:
-            e_text = fonts['medium'].render(f"{e_val}/{e_max}", True, WHITE)
+            e_text = render_text(fonts['medium'], f"{e_val}/{e_max}", True, WHITE)
             e_rect = e_text.get_rect(topright=(WIDTH - 100, y_pos))
             surface.blit(e_text, e_rect)
             draw_health_bar(surface, WIDTH - 300, y_pos + 25, 200, 15, e_val, e_max)
         else:
-            e_text = fonts['medium'].render(f"{e_val}", True, WHITE)
+            e_text = render_text(fonts['medium'], f"{e_val}", True, WHITE)
             e_rect = e_text.get_rect(topright=(WIDTH - 100, y_pos))
             surface.blit(e_text, e_rect)
         y_pos += 40  # Adjusted spacing to fit vitality
-    tip_text = fonts['small'].render("Tip: Assess your opponent's strengths and weaknesses before planning your attack!", True, GOLD)
+    # Exact odds of each skill against the opponent: hit chance, damage per hit, attacks needed to win
+    outcomes = get_outcome_table()
+    for attacker, defender, x, color in ((player, enemy, 130, BLUE), (enemy, player, WIDTH - 130, RED)):
+        y_pos = 300
+        for skill_name in attacker.skills:
+            odds = outcomes.odds(attacker, defender, skill_name)
+            odds_text = render_text(fonts['small'], f"{skill_name}: {odds['hit_chance']:.0%} x {odds['damage']} "
+                                    f"(~{odds['expected_attacks']:.0f} to win)", True, color)
+            if attacker is player:
+                odds_rect = odds_text.get_rect(topleft=(x, y_pos))
+            else:
+                odds_rect = odds_text.get_rect(topright=(x, y_pos))
+            surface.blit(odds_text, odds_rect)
+            y_pos += 40
+    tip_text = render_text(fonts['small'], "Tip: Assess your opponent's strengths and weaknesses before planning your attack!", True, GOLD)
     tip_rect = tip_text.get_rect(center=(WIDTH/2, HEIGHT - 150))
     surface.blit(tip_text, tip_rect)
+
+PRE_BATTLE_LAYERS = ScreenLayers("pre_battle", _draw_pre_battle_background)
+
+@profiled
+def draw_pre_battle(surface, player, enemy, button, battle_timer, fonts):
+    PRE_BATTLE_LAYERS.draw_background(surface, player, enemy, fonts)
     if button:
         button.draw(surface)
         
-def draw_character_creation(surface, buttons, game_state, fonts):
+STAT_EXPLANATIONS = {
+        'strength': "Increases damage",
+        'agility': "Improves accuracy and move speed",
+        'defense': "Reduces damage taken",
+        'stamina': "Boosts max stamina and regeneration",
+        'vitality': "Increases max health"  # Added vitality
+}
+
+def _draw_character_creation_background(surface, game_state, fonts):
     surface.fill((30, 30, 50))
-    title_text = fonts['title'].render("CHARACTER CREATION", True, WHITE)
+    title_text = render_text(fonts['title'], "CHARACTER CREATION", True, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH/2, 60))
     surface.blit(title_text, title_rect)
     pygame.draw.rect(surface, WHITE, (WIDTH/2 - 150, 140, 300, 40), 2)
-    name_label = fonts['medium'].render("Character Name:", True, WHITE)
+    name_label = render_text(fonts['medium'], "Character Name:", True, WHITE)
     surface.blit(name_label, (WIDTH/2 - 150, 110))
-    name_text = fonts['medium'].render(game_state.input_name, True, WHITE)
+    y_position = 240
+    for stat in game_state.current_stats:
+        explanation = render_text(fonts['small'], STAT_EXPLANATIONS[stat], True, WHITE)
+        surface.blit(explanation, (WIDTH/2 + 50, y_position))
+        y_position += 40
+    # Strongest builds found by the optimizer (optimize.py), if it has been run for these rules
+    builds = recommended_builds()
+    if builds:
+        title = render_text(fonts['small'], "Recommended builds (press Tab to apply):", True, GOLD)
+        surface.blit(title, title.get_rect(center=(WIDTH/2, 510)))
+        for i, build in enumerate(builds):
+            stats = " ".join(f"{stat[:3].upper()} {value}" for stat, value in build['stats'].items())
+            line = render_text(fonts['small'], f"{stats}  -  {build['win_rate']:.0%} wins, "
+                               f"{build['depth']:.1f} battles survived", True, WHITE)
+            surface.blit(line, line.get_rect(center=(WIDTH/2, 532 + i * 20)))
+
+CHARACTER_CREATION_LAYERS = ScreenLayers("character_creation", _draw_character_creation_background)
+
+@profiled
+def draw_character_creation(surface, buttons, game_state, fonts):
+    CHARACTER_CREATION_LAYERS.draw_background(surface, game_state, fonts)
+    name_text = render_text(fonts['medium'], game_state.input_name, True, WHITE)
     surface.blit(name_text, (WIDTH/2 - 140, 150))
-    stat_title = fonts['medium'].render(f"Distribute Stat Points: {game_state.get_remaining_points()} remaining", True, WHITE)
+    stat_title = render_text(fonts['medium'], f"Distribute Stat Points: {game_state.get_remaining_points()} remaining", True, WHITE)
     surface.blit(stat_title, (WIDTH/2 - 150, 200))
-    stat_explanations = {
-        'strength': "Increases damage",
-        'agility': "Improves accuracy and move speed",
-        'defense': "Reduces damage taken",
-        'stamina': "Boosts max stamina and regeneration",
-        'vitality': "Increases max health"  # Added vitality
-    }
     y_position = 240
     for i, (stat, value) in enumerate(game_state.current_stats.items()):
-        stat_text = fonts['medium'].render(f"{stat.capitalize()}: {value}", True, GOLD)
+        stat_text = render_text(fonts['medium'], f"{stat.capitalize()}: {value}", True, GOLD)
         surface.blit(stat_text, (WIDTH/2 - 150, y_position))
-        explanation = fonts['small'].render(stat_explanations[stat], True, WHITE)
-        surface.blit(explanation, (WIDTH/2 + 50, y_position))
         y_position += 40  # Adjusted spacing
-    points_text = fonts['medium'].render(
+    points_text = render_text(fonts['medium'], 
         f"You have {game_state.get_remaining_points()} points remaining", 
         True, 
         WHITE if game_state.get_remaining_points() > 0 else RED
@@ -98,36 +149,54 @@ def draw_character_creation(surface, buttons, game_state, fonts):
     for button in buttons:
         button.draw(surface)
 
-def draw_arena_menu(surface, player, buttons, battles_won, fonts):
+def character_creation_regions(game_state):
+    """Regions of draw_character_creation as (name, rect, value) for dirty-rect tracking"""
+    # Down to the bottom of the "points remaining" line drawn at y=440
+    return [("creation", pygame.Rect(0, 100, WIDTH, 372),
+             (game_state.input_name, tuple(game_state.current_stats.items())))]
+
+def arena_menu_regions(player, battles_won):
+    """Regions of draw_arena_menu as (name, rect, value) for dirty-rect tracking"""
+    return [("arena_info", pygame.Rect(0, 100, WIDTH, 190),
+             (player.name, player.level, player.gold, battles_won,
+              player.health, player.max_health, player.stamina, player.max_stamina))]
+
+def _draw_arena_menu_background(surface, fonts):
     surface.fill((50, 30, 30))
-    title_text = fonts['title'].render("ARENA MENU", True, WHITE)
+    title_text = render_text(fonts['title'], "ARENA MENU", True, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH/2, 60))
     surface.blit(title_text, title_rect)
-    info_text = fonts['medium'].render(f"{player.name} (Level {player.level}) - Gold: {player.gold}", True, GOLD)
+
+ARENA_MENU_LAYERS = ScreenLayers("arena_menu", _draw_arena_menu_background)
+
+@profiled
+def draw_arena_menu(surface, player, buttons, battles_won, fonts):
+    ARENA_MENU_LAYERS.draw_background(surface, fonts)
+    info_text = render_text(fonts['medium'], f"{player.name} (Level {player.level}) - Gold: {player.gold}", True, GOLD)
     info_rect = info_text.get_rect(center=(WIDTH/2, 120))
     surface.blit(info_text, info_rect)
-    battles_text = fonts['medium'].render(f"Battles Won: {battles_won}", True, WHITE)
+    battles_text = render_text(fonts['medium'], f"Battles Won: {battles_won}", True, WHITE)
     battles_rect = battles_text.get_rect(center=(WIDTH/2, 160))
     surface.blit(battles_text, battles_rect)
     bar_width = 300
     bar_height = 20
-    health_label = fonts['small'].render(f"Health: {player.health}/{player.max_health}", True, WHITE)
+    health_label = render_text(fonts['small'], f"Health: {player.health}/{player.max_health}", True, WHITE)
     surface.blit(health_label, (WIDTH/2 - bar_width/2, 190))
     draw_health_bar(surface, WIDTH/2 - bar_width/2, 210, bar_width, bar_height, 
                    player.health, player.max_health)
-    stamina_label = fonts['small'].render(f"Stamina: {player.stamina}/{player.max_stamina}", True, WHITE)
+    stamina_label = render_text(fonts['small'], f"Stamina: {player.stamina}/{player.max_stamina}", True, WHITE)
     surface.blit(stamina_label, (WIDTH/2 - bar_width/2, 240))
     draw_health_bar(surface, WIDTH/2 - bar_width/2, 260, bar_width, bar_height, 
                    player.stamina, player.max_stamina, fill_color=BLUE)
     for button in buttons:
         button.draw(surface)
 
-def draw_character_stats(surface, player, button, fonts):
+def _draw_character_stats_background(surface, player, fonts):
     surface.fill((30, 50, 30))
-    title_text = fonts['title'].render("CHARACTER STATS", True, WHITE)
+    title_text = render_text(fonts['title'], "CHARACTER STATS", True, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH/2, 50))
     surface.blit(title_text, title_rect)
-    info_text = fonts['large'].render(f"{player.name}", True, GOLD)
+    info_text = render_text(fonts['large'], f"{player.name}", True, GOLD)
     info_rect = info_text.get_rect(center=(WIDTH/2, 100))
     surface.blit(info_text, info_rect)
     stats = [
@@ -145,13 +214,13 @@ def draw_character_stats(surface, player, button, fonts):
         f"Armor: {player.equipped_armor} (Protection: {player.armor_items[player.equipped_armor]})"
     ]
     for i, stat in enumerate(stats):
-        stat_text = fonts['medium'].render(stat, True, WHITE)
+        stat_text = render_text(fonts['medium'], stat, True, WHITE)
         surface.blit(stat_text, (WIDTH/2 - 150, 150 + i * 30))
-    skill_title = fonts['large'].render("Skills:", True, GOLD)
+    skill_title = render_text(fonts['large'], "Skills:", True, GOLD)
     surface.blit(skill_title, (WIDTH/2 - 150, 450))
     y_offset = 490
     for skill_name, skill_info in player.skills.items():
-        skill_text = fonts['medium'].render(
+        skill_text = render_text(fonts['medium'], 
             f"{skill_name}: Damage x{skill_info['damage']}, "
             f"Accuracy {int(skill_info['accuracy']*100)}%, "
             f"Cost {skill_info['stamina_cost']} stamina", 
@@ -159,11 +228,17 @@ def draw_character_stats(surface, player, button, fonts):
         )
         surface.blit(skill_text, (WIDTH/2 - 150, y_offset))
         y_offset += 30
+
+CHARACTER_STATS_LAYERS = ScreenLayers("character_stats", _draw_character_stats_background)
+
+@profiled
+def draw_character_stats(surface, player, button, fonts):
+    CHARACTER_STATS_LAYERS.draw_background(surface, player, fonts)
     button.draw(surface)
 
-def draw_game_over(surface, player, battles_won, buttons, fonts):
+def _draw_game_over_background(surface, player, battles_won, fonts):
     surface.fill((10, 10, 10))
-    title_text = fonts['title'].render("GAME OVER", True, RED)
+    title_text = render_text(fonts['title'], "GAME OVER", True, RED)
     title_rect = title_text.get_rect(center=(WIDTH/2, 100))
     surface.blit(title_text, title_rect)
     stats_text = [
@@ -173,9 +248,15 @@ def draw_game_over(surface, player, battles_won, buttons, fonts):
         f"Gold Earned: {player.gold}"
     ]
     for i, text in enumerate(stats_text):
-        stat = fonts['medium'].render(text, True, WHITE)
+        stat = render_text(fonts['medium'], text, True, WHITE)
         stat_rect = stat.get_rect(center=(WIDTH/2, 200 + i * 40))
         surface.blit(stat, stat_rect)
+
+GAME_OVER_LAYERS = ScreenLayers("game_over", _draw_game_over_background)
+
+@profiled
+def draw_game_over(surface, player, battles_won, buttons, fonts):
+    GAME_OVER_LAYERS.draw_background(surface, player, battles_won, fonts)
     for button in buttons:
         button.draw(surface)
 
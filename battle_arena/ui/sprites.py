@@ -0,0 +1,88 @@
+import pygame
+from constants import RED, GREEN, BROWN, BLUE, WHITE
+from ui.text_cache import render_text
+
+# Sprite geometry relative to (x, bottom) of a character: body, head above it, weapon to the right
+SPRITE_LEFT = -30
+SPRITE_TOP = -120
+SPRITE_SIZE = (90, 120)
+BAR_WIDTH = 60
+# Transparent white, so antialiased white text keeps its colour when blended into an overlay
+CLEAR = (255, 255, 255, 0)
+
+
+class SpriteAtlas:
+    """Pre-rendered character sprites, so drawing a character is a couple of blits
+
+    Each character colour gets one sheet with every distinct pose side by
+    side: body and head in that colour or in the red hit flash, each with
+    and without the attack weapon. Attack lunges and jumps only move the
+    sprite, so they are offsets at blit time rather than extra frames. The
+    health and stamina bars and the name label form a second overlay, which
+    is rendered again only when the bar values change.
+    """
+
+    POSES = ((False, False), (False, True), (True, False), (True, True))  # (hit flash, weapon)
+
+    def __init__(self, max_entities=256):
+        self.max_entities = max_entities
+        self.sheets = {}
+        self.overlays = {}
+
+    def pose(self, character, hit_flash, weapon):
+        """(sheet surface, area) of one pose of character"""
+        key = character.color
+        sheet = self.sheets.get(key)
+        if sheet is None:
+            if len(self.sheets) >= self.max_entities:
+                self.sheets.clear()
+            sheet = self.sheets[key] = self._render_sheet(character.color)
+        index = self.POSES.index((hit_flash, weapon))
+        width, height = SPRITE_SIZE
+        return sheet, pygame.Rect(index * width, 0, width, height)
+
+    def _render_sheet(self, color):
+        width, height = SPRITE_SIZE
+        sheet = pygame.Surface((width * len(self.POSES), height), pygame.SRCALPHA)
+        for index, (hit_flash, weapon) in enumerate(self.POSES):
+            body_color = RED if hit_flash else color
+            x = index * width - SPRITE_LEFT
+            bottom = -SPRITE_TOP
+            pygame.draw.rect(sheet, body_color, (x - 20, bottom - 60, 40, 60))
+            pygame.draw.circle(sheet, body_color, (x, bottom - 90), 30)
+            if weapon:
+                pygame.draw.rect(sheet, BROWN, (x + 20, bottom - 70, 40, 10))
+        return sheet
+
+    def overlay(self, character, font):
+        """(surface, offset from (x, head centre)) of the bars and name label above character"""
+        key = (character.name, character.color, font)
+        values = (character.health, character.max_health, character.stamina, character.max_stamina)
+        cached = self.overlays.get(key)
+        if cached is not None and cached[0] == values:
+            return cached[1], cached[2]
+        if cached is None and len(self.overlays) >= self.max_entities:
+            self.overlays.clear()
+
+        name_text = render_text(font, character.name, True, WHITE)
+        name_rect = name_text.get_rect(center=(0, -30))
+        area = name_rect.union(pygame.Rect(-BAR_WIDTH // 2, -20, BAR_WIDTH, 18))
+        surface = pygame.Surface(area.size, pygame.SRCALPHA)
+        surface.fill(CLEAR)
+        left, top = -BAR_WIDTH // 2 - area.x, -area.y
+        health_percent = character.health / character.max_health
+        pygame.draw.rect(surface, RED, (left, top - 20, BAR_WIDTH, 10))
+        pygame.draw.rect(surface, GREEN, (left, top - 20, int(BAR_WIDTH * health_percent), 10))
+        stamina_percent = character.stamina / character.max_stamina
+        pygame.draw.rect(surface, (150, 150, 150), (left, top - 8, BAR_WIDTH, 6))
+        pygame.draw.rect(surface, BLUE, (left, top - 8, int(BAR_WIDTH * stamina_percent), 6))
+        surface.blit(name_text, name_rect.move(-area.x, -area.y))
+        self.overlays[key] = (values, surface, area.topleft)
+        return surface, area.topleft
+
+    def clear(self):
+        self.sheets.clear()
+        self.overlays.clear()
+
+
+sprite_atlas = SpriteAtlas()